@@ -6,8 +6,31 @@ Single-file implementation with all components included
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-from datetime import datetime, timedelta
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+import bisect
+import csv
+import io
+import itertools
+import json
+import mmap
+import queue
+import random
+import re
+import select
+import sqlite3
+import statistics
+import string
+import subprocess
+import tempfile
+import threading
+import time
 import sys
 import os
 
@@ -36,22 +59,38 @@ except ImportError:
     WARNING = "warning"
     INFO = "info"
 
+try:
+    import psycopg2
+
+    HAS_PSYCOPG2 = True
+except ImportError:
+    HAS_PSYCOPG2 = False
+
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 
 # ============================================================================
-# MOCK DATABASE FOR DEMONSTRATION
+# DATABASE LAYER
 # ============================================================================
 
-class MockDatabase:
-    class DatabaseConnection:
-        def __init__(self):
-            self.config = {
-                'host': 'localhost',
-                'user': 'postgressql',
-                'password': 'ADMIN123',  # Change this
-                'database': 'smartlibrary',
-                'port': 5432  # Default MySQL port
-            }
-    """Mock database for demonstration purposes"""
+# Connection settings for the PostgreSQL backend (see postgres.sql).
+# Every key can be overridden with a SMARTLIBRARY_DB_<KEY> environment variable.
+DB_CONFIG = {
+    'host': os.environ.get('SMARTLIBRARY_DB_HOST', 'localhost'),
+    'user': os.environ.get('SMARTLIBRARY_DB_USER', 'postgressql'),
+    'password': os.environ.get('SMARTLIBRARY_DB_PASSWORD', 'ADMIN123'),  # Change this
+    'database': os.environ.get('SMARTLIBRARY_DB_DATABASE', 'smartlibrary'),
+    'port': int(os.environ.get('SMARTLIBRARY_DB_PORT', 5432))  # Default PostgreSQL port
+}
+
+
+class SampleData:
+    """Demonstration data used to seed the SQLite stand-in database"""
 
     # Sample data for demonstration
     SAMPLE_BOOKS = [
@@ -143,58 +182,3322 @@ class MockDatabase:
 
     ]
 
+    SAMPLE_RETURNED_LOANS = [
+        (301, "Sapiens", "Charlie Wilson", "2025-10-10", "2025-10-24", "Returned", "$0.00"),
+        (302, "Atomic Habits", "Diana Miller", "2025-10-15", "2025-10-29", "Returned", "$0.00"),
+        (301, "Mathematics", "Charlie Wilson", "2025-10-10", "2025-10-24", "Returned", "$0.00"),
+        (303, "Atomical", "Diana Miller", "2025-10-15", "2025-10-29", "Returned", "$0.00"),
+        (303, "Sapien", "Charlie Wilson", "2025-10-10", "2025-10-24", "Returned", "$0.00"),
+        (304, "Habits", "Diana Miller", "2025-10-15", "2025-10-29", "Returned", "$0.00"),
+        (306, "Sapians", "Charlie Wilson", "2025-10-10", "2025-10-24", "Returned", "$0.00"),
+        (300, "Database", "Diana Miller", "2025-10-15", "2025-10-29", "Returned", "$0.00"),
+    ]
+
+
+class PoolError(Exception):
+    """Raised when the connection pool cannot hand out a connection"""
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no connection became available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe bounded pool of DB-API connections
+
+    Connections are created lazily up to ``max_size`` and reused LIFO, so the
+    least recently used ones age out and are closed by idle reaping once the
+    pool holds more than ``min_size``. A connection that has been idle for
+    longer than ``health_check_after`` seconds is pinged before it is handed
+    out; broken connections are discarded and replaced transparently.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=5, timeout=10.0,
+                 max_idle=300.0, health_check_after=1.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, returned_at), oldest on the left
+        self._in_use = set()
+        self._size = 0
+        self._closed = False
+
+    def warm(self):
+        """Open connections until the pool holds at least min_size"""
+        opened = []
+        try:
+            while True:
+                with self._cond:
+                    if self._closed or self._size >= self.min_size:
+                        break
+                    self._size += 1
+                try:
+                    opened.append(self._factory())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                    raise
+        finally:
+            now = time.monotonic()
+            with self._cond:
+                self._idle.extend((conn, now) for conn in opened)
+                self._cond.notify_all()
+
+    def get_connection(self, timeout=None):
+        """Check out a healthy connection, waiting up to timeout seconds"""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+
+        while True:
+            candidate = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.timeout:.1f}s "
+                            f"({self._size} in use)"
+                        )
+                    self._cond.wait(remaining)
+
+            if candidate is None:
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                conn, returned_at = candidate
+                if (time.monotonic() - returned_at > self.health_check_after
+                        and not self._is_healthy(conn)):
+                    self._discard(conn)
+                    continue
+
+            with self._cond:
+                self._in_use.add(conn)
+            self.reap_idle()
+            return conn
+
+    def return_connection(self, conn, discard=False):
+        """Give a checked-out connection back to the pool"""
+        with self._cond:
+            if conn not in self._in_use:
+                return
+            self._in_use.discard(conn)
+
+        if not discard:
+            try:
+                # Never hand out a connection with an open transaction
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if not discard and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+
+        self._discard(conn)
+
+    def reap_idle(self):
+        """Close connections idle for longer than max_idle, keeping min_size"""
+        expired = []
+        cutoff = time.monotonic() - self.max_idle
+        with self._cond:
+            while (self._idle and self._size - len(expired) > self.min_size
+                   and self._idle[0][1] < cutoff):
+                expired.append(self._idle.popleft()[0])
+            self._size -= len(expired)
+        for conn in expired:
+            self._close_quietly(conn)
+        return len(expired)
+
+    def close_all(self):
+        """Close idle connections; checked-out ones are closed when returned"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        """Return a snapshot of the pool occupancy"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'max_size': self.max_size,
+            }
+
+    def _is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class LoanError(Exception):
+    """Raised when a loan cannot be issued or returned"""
+
+
+class QueryCancelledError(Exception):
+    """Raised when a query is cancelled before it starts"""
+
+
+class QueryCancel:
+    """Cancellation handle for a query running on a worker thread
+
+    The repository attaches the connection while the statement runs;
+    ``cancel()`` interrupts it server-side so a superseded query stops using
+    the connection instead of running to completion.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = None
+        self.cancelled = False
+
+    def attach(self, db, conn):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelledError("Query was cancelled")
+            self._running = (db, conn)
+
+    def detach(self):
+        with self._lock:
+            self._running = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._running is not None:
+                db, conn = self._running
+                db.interrupt(conn)
+
+
+class PooledDatabase:
+    """Base class for databases handing out pooled connections
+
+    Queries are written with ``%s`` placeholders (psycopg2 style) and passed
+    through ``adapt()`` so the same SQL runs against every backend.
+    """
+
+    dialect = None
+
+    def __init__(self, **pool_options):
+        self.pool = ConnectionPool(self._connect, **pool_options)
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def get_connection(self):
+        return self.pool.get_connection()
+
+    def dedicated_connection(self):
+        """A connection outside the pool, for long-lived sessions such as LISTEN"""
+        return self._connect()
+
+    def return_connection(self, conn, discard=False):
+        self.pool.return_connection(conn, discard=discard)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in"""
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            self.return_connection(conn)
+
+    def adapt(self, query):
+        return query
+
+    def interrupt(self, conn):
+        """Abort the statement conn is running (called from another thread)"""
+        raise NotImplementedError
+
+    def close(self):
+        self.pool.close_all()
+
+
+class PostgresDatabase(PooledDatabase):
+    """PostgreSQL backend using the schema in postgres.sql"""
+
+    dialect = "postgresql"
+
+    def __init__(self, config=None, **pool_options):
+        if not HAS_PSYCOPG2:
+            raise RuntimeError("psycopg2 is required for the PostgreSQL backend")
+        self.config = dict(DB_CONFIG, **(config or {}))
+        super().__init__(**pool_options)
+
+    def _connect(self):
+        return psycopg2.connect(**self.config)
+
+    def interrupt(self, conn):
+        conn.cancel()
+
+
+# SQLite translation of the tables, indexes and views in postgres.sql
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title VARCHAR(255) NOT NULL,
+    author VARCHAR(255) NOT NULL,
+    isbn VARCHAR(20) UNIQUE,
+    category VARCHAR(100),
+    publisher VARCHAR(255),
+    publication_year INTEGER,
+    total_copies INTEGER DEFAULT 1,
+    available_copies INTEGER DEFAULT 1,
+    location_code VARCHAR(50),
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT positive_copies CHECK (total_copies >= 0 AND available_copies >= 0)
+);
+
+CREATE INDEX IF NOT EXISTS idx_books_title ON books(title);
+CREATE INDEX IF NOT EXISTS idx_books_author ON books(author);
+CREATE INDEX IF NOT EXISTS idx_books_category ON books(category);
+CREATE INDEX IF NOT EXISTS idx_books_isbn ON books(isbn);
+CREATE INDEX IF NOT EXISTS idx_books_available ON books(book_id) WHERE available_copies > 0;
+
+CREATE TABLE IF NOT EXISTS members (
+    member_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name VARCHAR(100) NOT NULL,
+    last_name VARCHAR(100) NOT NULL,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    phone VARCHAR(20),
+    address TEXT,
+    membership_number VARCHAR(50) UNIQUE,
+    membership_type VARCHAR(20) DEFAULT 'Standard',
+    membership_date DATE DEFAULT CURRENT_DATE,
+    status VARCHAR(20) DEFAULT 'Active',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT valid_membership_type CHECK (membership_type IN ('Standard', 'Premium', 'Student')),
+    CONSTRAINT valid_status CHECK (status IN ('Active', 'Inactive', 'Suspended'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_members_name ON members(first_name, last_name);
+CREATE INDEX IF NOT EXISTS idx_members_email ON members(email);
+CREATE INDEX IF NOT EXISTS idx_members_membership_number ON members(membership_number);
+CREATE INDEX IF NOT EXISTS idx_members_status ON members(status);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(50) UNIQUE NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    full_name VARCHAR(255),
+    email VARCHAR(255) UNIQUE,
+    role VARCHAR(20) DEFAULT 'Staff',
+    last_login TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT valid_role CHECK (role IN ('Admin', 'Librarian', 'Staff'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+
+CREATE TABLE IF NOT EXISTS borrowed_books (
+    borrow_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    book_id INTEGER NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
+    member_id INTEGER NOT NULL REFERENCES members(member_id) ON DELETE CASCADE,
+    borrowed_by INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
+    borrow_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    due_date DATE NOT NULL,
+    return_date DATE,
+    actual_return_date DATE,
+    condition_before VARCHAR(50),
+    condition_after VARCHAR(50),
+    status VARCHAR(20) DEFAULT 'Borrowed',
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT valid_status_borrowed CHECK (status IN ('Borrowed', 'Returned', 'Overdue', 'Lost')),
+    CONSTRAINT dates_check CHECK (due_date >= borrow_date AND (return_date IS NULL OR return_date >= borrow_date))
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS unique_active_borrow
+    ON borrowed_books(book_id, member_id) WHERE status = 'Borrowed';
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_book_status ON borrowed_books(book_id, status);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_member_status ON borrowed_books(member_id, status);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_due_date ON borrowed_books(due_date);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_open_due
+    ON borrowed_books(due_date, borrow_id) WHERE status IN ('Borrowed', 'Overdue');
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_status ON borrowed_books(status);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_dates ON borrowed_books(borrow_date, due_date, return_date);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_history
+    ON borrowed_books(status, borrow_date, borrow_id);
+
+-- SQLite has no partitioning: archived loans are moved into this table
+CREATE TABLE IF NOT EXISTS borrowed_books_archive (
+    borrow_id INTEGER PRIMARY KEY,
+    book_id INTEGER NOT NULL,
+    member_id INTEGER NOT NULL,
+    borrowed_by INTEGER,
+    borrow_date DATE NOT NULL,
+    due_date DATE NOT NULL,
+    return_date DATE,
+    actual_return_date DATE,
+    condition_before VARCHAR(50),
+    condition_after VARCHAR(50),
+    status VARCHAR(20),
+    notes TEXT,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_archive_history
+    ON borrowed_books_archive(status, borrow_date, borrow_id);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_archive_book_id ON borrowed_books_archive(book_id);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_archive_member_id ON borrowed_books_archive(member_id);
+
+CREATE TABLE IF NOT EXISTS fines (
+    fine_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    borrow_id INTEGER,
+    member_id INTEGER NOT NULL REFERENCES members(member_id) ON DELETE CASCADE,
+    amount DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+    reason VARCHAR(255),
+    fine_date DATE DEFAULT CURRENT_DATE,
+    due_date DATE NOT NULL,
+    payment_date DATE,
+    status VARCHAR(20) DEFAULT 'Pending',
+    payment_method VARCHAR(50),
+    transaction_id VARCHAR(100),
+    waived_by INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
+    waived_reason TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT positive_amount CHECK (amount >= 0),
+    CONSTRAINT valid_fine_status CHECK (status IN ('Pending', 'Paid', 'Waived', 'Cancelled')),
+    CONSTRAINT dates_fine_check CHECK (due_date >= fine_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_fines_member_status ON fines(member_id, status, amount);
+CREATE INDEX IF NOT EXISTS idx_fines_borrow_id ON fines(borrow_id);
+CREATE INDEX IF NOT EXISTS idx_fines_status ON fines(status);
+CREATE INDEX IF NOT EXISTS idx_fines_due_date ON fines(due_date);
+CREATE INDEX IF NOT EXISTS idx_fines_fine_date ON fines(fine_date, fine_id);
+
+CREATE TABLE IF NOT EXISTS activity_log (
+    log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
+    member_id INTEGER REFERENCES members(member_id) ON DELETE SET NULL,
+    action_type VARCHAR(50) NOT NULL,
+    table_name VARCHAR(50),
+    record_id INTEGER,
+    description TEXT,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_log_user_id ON activity_log(user_id);
+CREATE INDEX IF NOT EXISTS idx_activity_log_created_at ON activity_log(created_at);
+CREATE INDEX IF NOT EXISTS idx_activity_log_action_type ON activity_log(action_type);
+
+CREATE TABLE IF NOT EXISTS activity_log_archive (
+    log_id INTEGER PRIMARY KEY,
+    user_id INTEGER,
+    member_id INTEGER,
+    action_type VARCHAR(50) NOT NULL,
+    table_name VARCHAR(50),
+    record_id INTEGER,
+    description TEXT,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    created_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS system_settings (
+    setting_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    setting_key VARCHAR(100) UNIQUE NOT NULL,
+    setting_value TEXT,
+    setting_type VARCHAR(50) DEFAULT 'string',
+    description TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_by INTEGER REFERENCES users(user_id)
+);
+
+-- Overdue fine policy per membership type; a NULL rate_per_day means the
+-- fine_per_day setting and a NULL max_fine means no cap
+CREATE TABLE IF NOT EXISTS fine_policies (
+    membership_type VARCHAR(20) PRIMARY KEY,
+    rate_per_day DECIMAL(10,2),
+    grace_days INTEGER NOT NULL DEFAULT 0,
+    max_fine DECIMAL(10,2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CHECK (grace_days >= 0)
+);
+
+INSERT OR IGNORE INTO fine_policies (membership_type) VALUES ('Standard'), ('Premium'), ('Student');
+
+-- Bumped by the settings triggers; SettingsService reloads when it moves
+CREATE TABLE IF NOT EXISTS settings_version (
+    version_id INTEGER PRIMARY KEY CHECK (version_id = 1),
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO settings_version (version_id, version) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS library_stats (
+    stat_key VARCHAR(50) PRIMARY KEY,
+    stat_value INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+    job_name VARCHAR(50) PRIMARY KEY,
+    as_of DATE NOT NULL,
+    last_due_date DATE,
+    last_borrow_id INTEGER,
+    loans_scanned INTEGER DEFAULT 0,
+    loans_marked INTEGER DEFAULT 0,
+    fines_accrued INTEGER DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+-- Fine policies with the fine_per_day fallback resolved
+CREATE VIEW IF NOT EXISTS view_fine_policies AS
+SELECT
+    p.membership_type,
+    COALESCE(
+        p.rate_per_day,
+        (SELECT CAST(setting_value AS REAL) FROM system_settings WHERE setting_key = 'fine_per_day'),
+        0.50
+    ) AS rate_per_day,
+    p.grace_days,
+    p.max_fine
+FROM fine_policies p;
+
+CREATE VIEW IF NOT EXISTS view_active_loans AS
+SELECT
+    bb.borrow_id,
+    b.title AS book_title,
+    b.isbn,
+    m.first_name || ' ' || m.last_name AS member_name,
+    m.membership_number,
+    bb.borrow_date,
+    bb.due_date,
+    bb.status,
+    CASE
+        WHEN bb.due_date < DATE('now') THEN CAST(JULIANDAY('now', 'start of day') - JULIANDAY(bb.due_date) AS INTEGER)
+        ELSE 0
+    END AS days_overdue,
+    CASE
+        WHEN bb.due_date < DATE('now') THEN COALESCE(ROUND(MIN(
+            MAX(0, CAST(JULIANDAY('now', 'start of day') - JULIANDAY(bb.due_date) AS INTEGER) - p.grace_days)
+                * p.rate_per_day,
+            COALESCE(p.max_fine, 1e308)
+        ), 2), 0.00)
+        ELSE 0.00
+    END AS calculated_fine
+FROM borrowed_books bb
+JOIN books b ON bb.book_id = b.book_id
+JOIN members m ON bb.member_id = m.member_id
+LEFT JOIN view_fine_policies p ON p.membership_type = m.membership_type
+WHERE bb.status IN ('Borrowed', 'Overdue');
+
+CREATE VIEW IF NOT EXISTS loan_history AS
+SELECT * FROM borrowed_books
+UNION ALL
+SELECT * FROM borrowed_books_archive;
+
+-- Each statistic is a correlated count or sum answered from a covering
+-- index, so loans and fines never multiply each other's rows and a single
+-- member or book costs a handful of index probes. Loan totals add the
+-- archive separately: SQLite does not push the correlation into a UNION ALL.
+CREATE VIEW IF NOT EXISTS view_member_stats AS
+SELECT
+    m.member_id,
+    m.first_name || ' ' || m.last_name AS member_name,
+    m.membership_number,
+    m.membership_type,
+    m.membership_date,
+    m.status,
+    (SELECT COUNT(*) FROM borrowed_books bb WHERE bb.member_id = m.member_id)
+        + (SELECT COUNT(*) FROM borrowed_books_archive bb WHERE bb.member_id = m.member_id) AS total_loans,
+    (SELECT COUNT(*) FROM borrowed_books bb
+     WHERE bb.member_id = m.member_id AND bb.status = 'Borrowed') AS active_loans,
+    (SELECT COUNT(*) FROM borrowed_books bb
+     WHERE bb.member_id = m.member_id AND bb.status = 'Overdue') AS overdue_loans,
+    (SELECT COALESCE(SUM(f.amount), 0.00) FROM fines f WHERE f.member_id = m.member_id) AS total_fines,
+    (SELECT COALESCE(SUM(f.amount), 0.00) FROM fines f
+     WHERE f.member_id = m.member_id AND f.status = 'Pending') AS pending_fines
+FROM members m;
+
+CREATE VIEW IF NOT EXISTS view_book_stats AS
+SELECT
+    b.book_id,
+    b.title,
+    b.author,
+    b.category,
+    b.total_copies,
+    b.available_copies,
+    (SELECT COUNT(*) FROM borrowed_books bb WHERE bb.book_id = b.book_id)
+        + (SELECT COUNT(*) FROM borrowed_books_archive bb WHERE bb.book_id = b.book_id) AS times_borrowed,
+    (SELECT COUNT(*) FROM borrowed_books bb
+     WHERE bb.book_id = b.book_id AND bb.status = 'Borrowed') AS currently_borrowed,
+    (SELECT COUNT(*) FROM borrowed_books bb
+     WHERE bb.book_id = b.book_id AND bb.status = 'Overdue') AS currently_overdue
+FROM books b;
+"""
+
+# Aggregates behind the library_stats counters (refresh_library_stats() in
+# postgres.sql); the trg_*_stats triggers keep them current afterwards.
+LIBRARY_STATS_QUERY = """
+SELECT 'total_books', COUNT(*) FROM books
+UNION ALL SELECT 'available_books', COUNT(*) FROM books WHERE available_copies > 0
+UNION ALL SELECT 'active_loans', COUNT(*) FROM borrowed_books WHERE status = 'Borrowed'
+UNION ALL SELECT 'overdue_loans', COUNT(*) FROM borrowed_books WHERE status = 'Overdue'
+UNION ALL SELECT 'active_members', COUNT(*) FROM members WHERE status = 'Active'
+UNION ALL SELECT 'pending_fines', COUNT(*) FROM fines WHERE status = 'Pending'
+"""
+
+# SQLite equivalents of the PL/pgSQL triggers. Created after seeding so the
+# historical sample loans do not alter the seeded availability counts.
+SQLITE_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS trg_members_membership_number
+AFTER INSERT ON members
+FOR EACH ROW WHEN NEW.membership_number IS NULL
+BEGIN
+    UPDATE members SET membership_number = 'MEM' || printf('%04d', NEW.member_id)
+    WHERE member_id = NEW.member_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_book_availability_insert
+AFTER INSERT ON borrowed_books
+FOR EACH ROW WHEN NEW.status = 'Borrowed'
+BEGIN
+    UPDATE books SET available_copies = available_copies - 1 WHERE book_id = NEW.book_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_book_availability_return
+AFTER UPDATE OF status ON borrowed_books
+FOR EACH ROW WHEN OLD.status IN ('Borrowed', 'Overdue') AND NEW.status = 'Returned'
+BEGIN
+    UPDATE books SET available_copies = available_copies + 1 WHERE book_id = NEW.book_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_book_availability_reborrow
+AFTER UPDATE OF status ON borrowed_books
+FOR EACH ROW WHEN OLD.status = 'Returned' AND NEW.status = 'Borrowed'
+BEGIN
+    UPDATE books SET available_copies = available_copies - 1 WHERE book_id = NEW.book_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_overdue_status
+AFTER INSERT ON borrowed_books
+FOR EACH ROW WHEN NEW.due_date < DATE('now') AND NEW.status = 'Borrowed'
+BEGIN
+    UPDATE borrowed_books SET status = 'Overdue' WHERE borrow_id = NEW.borrow_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_generate_fines
+AFTER UPDATE OF status ON borrowed_books
+FOR EACH ROW
+WHEN OLD.status IN ('Borrowed', 'Overdue') AND NEW.status = 'Returned'
+    AND JULIANDAY(NEW.actual_return_date) > JULIANDAY(OLD.due_date)
+BEGIN
+    -- The member's fine policy: days past the grace period times the rate, capped
+    UPDATE fines
+    SET amount = f.amount, reason = 'Overdue fine: ' || f.days || ' days'
+    FROM (
+        SELECT d.days, ROUND(MIN(MAX(0, d.days - p.grace_days) * p.rate_per_day, COALESCE(p.max_fine, 1e308)), 2)
+            AS amount
+        FROM (SELECT CAST(JULIANDAY(NEW.actual_return_date) - JULIANDAY(OLD.due_date) AS INTEGER) AS days) d
+        JOIN members m ON m.member_id = NEW.member_id
+        JOIN view_fine_policies p ON p.membership_type = m.membership_type
+    ) f
+    WHERE fines.borrow_id = NEW.borrow_id AND fines.status = 'Pending';
+    INSERT INTO fines (borrow_id, member_id, amount, reason, due_date)
+    SELECT NEW.borrow_id, NEW.member_id, f.amount, 'Overdue fine: ' || f.days || ' days', DATE('now', '+7 days')
+    FROM (
+        SELECT d.days, ROUND(MIN(MAX(0, d.days - p.grace_days) * p.rate_per_day, COALESCE(p.max_fine, 1e308)), 2)
+            AS amount
+        FROM (SELECT CAST(JULIANDAY(NEW.actual_return_date) - JULIANDAY(OLD.due_date) AS INTEGER) AS days) d
+        JOIN members m ON m.member_id = NEW.member_id
+        JOIN view_fine_policies p ON p.membership_type = m.membership_type
+    ) f
+    WHERE f.amount > 0 AND NOT EXISTS (SELECT 1 FROM fines WHERE borrow_id = NEW.borrow_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_books_stats_insert
+AFTER INSERT ON books
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value + CASE stat_key
+        WHEN 'total_books' THEN 1 ELSE (NEW.available_copies > 0) END
+    WHERE stat_key IN ('total_books', 'available_books');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_books_stats_delete
+AFTER DELETE ON books
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value - CASE stat_key
+        WHEN 'total_books' THEN 1 ELSE (OLD.available_copies > 0) END
+    WHERE stat_key IN ('total_books', 'available_books');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_books_stats_update
+AFTER UPDATE OF available_copies ON books
+FOR EACH ROW WHEN (OLD.available_copies > 0) <> (NEW.available_copies > 0)
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP,
+        stat_value = stat_value + (NEW.available_copies > 0) - (OLD.available_copies > 0)
+    WHERE stat_key = 'available_books';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_borrowed_books_stats_insert
+AFTER INSERT ON borrowed_books
+FOR EACH ROW WHEN NEW.status IN ('Borrowed', 'Overdue')
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value + 1
+    WHERE stat_key = CASE NEW.status WHEN 'Borrowed' THEN 'active_loans' ELSE 'overdue_loans' END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_borrowed_books_stats_delete
+AFTER DELETE ON borrowed_books
+FOR EACH ROW WHEN OLD.status IN ('Borrowed', 'Overdue')
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value - 1
+    WHERE stat_key = CASE OLD.status WHEN 'Borrowed' THEN 'active_loans' ELSE 'overdue_loans' END;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_borrowed_books_stats_update
+AFTER UPDATE OF status ON borrowed_books
+FOR EACH ROW WHEN OLD.status <> NEW.status
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value
+        + (NEW.status = CASE stat_key WHEN 'active_loans' THEN 'Borrowed' ELSE 'Overdue' END)
+        - (OLD.status = CASE stat_key WHEN 'active_loans' THEN 'Borrowed' ELSE 'Overdue' END)
+    WHERE stat_key IN ('active_loans', 'overdue_loans');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_stats_insert
+AFTER INSERT ON members
+FOR EACH ROW WHEN NEW.status = 'Active'
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value + 1
+    WHERE stat_key = 'active_members';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_stats_delete
+AFTER DELETE ON members
+FOR EACH ROW WHEN OLD.status = 'Active'
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value - 1
+    WHERE stat_key = 'active_members';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_members_stats_update
+AFTER UPDATE OF status ON members
+FOR EACH ROW WHEN (OLD.status = 'Active') <> (NEW.status = 'Active')
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP,
+        stat_value = stat_value + (NEW.status = 'Active') - (OLD.status = 'Active')
+    WHERE stat_key = 'active_members';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fines_stats_insert
+AFTER INSERT ON fines
+FOR EACH ROW WHEN NEW.status = 'Pending'
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value + 1
+    WHERE stat_key = 'pending_fines';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fines_stats_delete
+AFTER DELETE ON fines
+FOR EACH ROW WHEN OLD.status = 'Pending'
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP, stat_value = stat_value - 1
+    WHERE stat_key = 'pending_fines';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fines_stats_update
+AFTER UPDATE OF status ON fines
+FOR EACH ROW WHEN (OLD.status = 'Pending') <> (NEW.status = 'Pending')
+BEGIN
+    UPDATE library_stats SET updated_at = CURRENT_TIMESTAMP,
+        stat_value = stat_value + (NEW.status = 'Pending') - (OLD.status = 'Pending')
+    WHERE stat_key = 'pending_fines';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_system_settings_version_insert
+AFTER INSERT ON system_settings
+BEGIN
+    UPDATE settings_version SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_system_settings_version_update
+AFTER UPDATE ON system_settings
+BEGIN
+    UPDATE settings_version SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_system_settings_version_delete
+AFTER DELETE ON system_settings
+BEGIN
+    UPDATE settings_version SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fine_policies_version_insert
+AFTER INSERT ON fine_policies
+BEGIN
+    UPDATE settings_version SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fine_policies_version_update
+AFTER UPDATE ON fine_policies
+BEGIN
+    UPDATE settings_version SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_fine_policies_version_delete
+AFTER DELETE ON fine_policies
+BEGIN
+    UPDATE settings_version SET version = version + 1;
+END;
+"""
+
+
+# Expression indexes for the type-ahead pickers' case-insensitive prefix
+# lookups (lower(column) range scans). Run on every start so databases
+# created before them get them too.
+SQLITE_LOOKUP_INDEXES = """
+DROP INDEX IF EXISTS idx_members_last_name;
+CREATE INDEX IF NOT EXISTS idx_books_title_lower ON books(lower(title));
+CREATE INDEX IF NOT EXISTS idx_books_isbn_lower ON books(lower(isbn));
+CREATE INDEX IF NOT EXISTS idx_members_name_lower ON members(lower(first_name), lower(last_name));
+CREATE INDEX IF NOT EXISTS idx_members_last_name_lower ON members(lower(last_name));
+CREATE INDEX IF NOT EXISTS idx_members_email_lower ON members(lower(email));
+CREATE INDEX IF NOT EXISTS idx_members_membership_number_lower ON members(lower(membership_number));
+"""
+
+
+# Full-text search index for the SQLite stand-in: FTS5 with the trigram
+# tokenizer plays the role of the tsvector/pg_trgm indexes in postgres.sql.
+SQLITE_SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    title, author, isbn, content='books', content_rowid='book_id', tokenize='trigram'
+);
+INSERT INTO books_fts(books_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_books_fts_insert
+AFTER INSERT ON books
+BEGIN
+    INSERT INTO books_fts(rowid, title, author, isbn) VALUES (NEW.book_id, NEW.title, NEW.author, NEW.isbn);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_books_fts_delete
+AFTER DELETE ON books
+BEGIN
+    INSERT INTO books_fts(books_fts, rowid, title, author, isbn)
+    VALUES ('delete', OLD.book_id, OLD.title, OLD.author, OLD.isbn);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_books_fts_update
+AFTER UPDATE OF title, author, isbn ON books
+BEGIN
+    INSERT INTO books_fts(books_fts, rowid, title, author, isbn)
+    VALUES ('delete', OLD.book_id, OLD.title, OLD.author, OLD.isbn);
+    INSERT INTO books_fts(rowid, title, author, isbn) VALUES (NEW.book_id, NEW.title, NEW.author, NEW.isbn);
+END;
+"""
+
+
+class SQLiteDatabase(PooledDatabase):
+    """SQLite stand-in with the postgres.sql schema, used for demos and tests
+
+    With no path the database lives in a shared-cache in-memory database that
+    every pooled connection sees; a keeper connection holds it open for the
+    lifetime of the object.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path=None, seed=True, **pool_options):
+        if path is None:
+            self._target = f"file:smartlibrary-{id(self)}?mode=memory&cache=shared"
+            self._memory = True
+        else:
+            self._target = f"file:{path}"
+            self._memory = False
+
+        self._keeper = self._connect()
+        super().__init__(**pool_options)
+        self._initialize(seed)
+
+    def _connect(self):
+        conn = sqlite3.connect(self._target, uri=True, timeout=10.0, check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        if self._memory:
+            # Shared-cache readers would otherwise block on writers' table locks
+            conn.execute("PRAGMA read_uncommitted = 1")
+        else:
+            conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def adapt(self, query):
+        return query.replace("%s", "?")
+
+    def interrupt(self, conn):
+        conn.interrupt()
+
+    def close(self):
+        super().close()
+        self._keeper.close()
+
+    def _initialize(self, seed):
+        conn = self._keeper
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books'"
+        ).fetchone()
+        if not exists:
+            conn.executescript(SQLITE_SCHEMA)
+            if seed:
+                self._seed(conn)
+            conn.execute("INSERT OR REPLACE INTO library_stats (stat_key, stat_value) " + LIBRARY_STATS_QUERY)
+            conn.executescript(SQLITE_TRIGGERS)
+            try:
+                conn.executescript(SQLITE_SEARCH_SCHEMA)
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5/trigram: search falls back to LIKE
+                conn.rollback()
+            conn.commit()
+        conn.executescript(SQLITE_LOOKUP_INDEXES)
+        self._normalize_isbns(conn)
+
+        self.has_fts = bool(conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'books_fts'"
+        ).fetchone())
+
     @staticmethod
-    def get_connection():
-        return MockConnection()
+    def _normalize_isbns(conn):
+        """Rewrite ISBNs stored with hyphens or spaces in normalize_isbn form
+
+        Scans and imports are matched against the normalized ISBN. A row
+        whose normalized ISBN another book already has is left as it is.
+        """
+        rows = conn.execute("SELECT book_id, isbn FROM books WHERE isbn GLOB '*[^0-9X]*'").fetchall()
+        updates = [(normalize_isbn(isbn), book_id) for book_id, isbn in rows if normalize_isbn(isbn)]
+        if updates:
+            conn.executemany("UPDATE OR IGNORE books SET isbn = ? WHERE book_id = ?", updates)
+            conn.commit()
 
     @staticmethod
-    def return_connection(conn):
-        pass
+    def _seed(conn):
+        """Load SampleData, resolving the free-text titles and names to IDs"""
+        conn.execute(
+            "INSERT OR IGNORE INTO users (username, password_hash, full_name, email, role) "
+            "VALUES ('admin', 'ef92b778bafe771e89245b89ecbc08a44a4e166c06659911881f383d4473e94f', "
+            "'System Administrator', 'admin@smartlibrary.com', 'Admin')"
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO system_settings (setting_key, setting_value, setting_type, description) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                ('library_name', 'SmartLibrary', 'string', 'Name of the library'),
+                ('fine_per_day', '0.50', 'decimal', 'Fine amount per overdue day'),
+                ('max_borrow_days', '14', 'integer', 'Maximum days for borrowing'),
+                ('max_books_per_member', '5', 'integer', 'Maximum books a member can borrow'),
+                ('reservation_period_days', '3', 'integer', 'Days to hold reserved books'),
+            ]
+        )
 
+        conn.executemany(
+            "INSERT OR IGNORE INTO books (book_id, title, author, isbn, available_copies, total_copies, category) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(b[0], b[1], b[2], b[3], b[4], b[5], b[7]) for b in SampleData.SAMPLE_BOOKS]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO members (member_id, first_name, last_name, membership_number, "
+            "email, phone, membership_type, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(m[0], *m[1].split(" ", 1), m[2], m[3], m[4], m[5], m[7]) for m in SampleData.SAMPLE_MEMBERS]
+        )
 
-class MockConnection:
-    def cursor(self):
-        return MockCursor()
+        books = conn.execute("SELECT book_id, title FROM books ORDER BY book_id").fetchall()
+        members = conn.execute(
+            "SELECT member_id, first_name, last_name FROM members ORDER BY member_id"
+        ).fetchall()
+
+        def find_book(title):
+            title = title.lower()
+            for book_id, candidate in books:
+                candidate = candidate.lower()
+                if title in candidate or candidate in title:
+                    return book_id
+            return None
+
+        def find_member(name):
+            first, _, last = name.lower().partition(" ")
+            for member_id, first_name, last_name in members:
+                if (first_name.lower(), last_name.lower()) == (first, last):
+                    return member_id
+            for member_id, first_name, last_name in members:
+                if last_name.lower() == last:
+                    return member_id
+            return None
+
+        statuses = {"Active": "Borrowed", "Overdue": "Overdue", "Returned": "Returned"}
+        loans = (SampleData.SAMPLE_ACTIVE_LOANS + SampleData.SAMPLE_OVERDUE_LOANS
+                 + SampleData.SAMPLE_RETURNED_LOANS)
+        for borrow_id, title, name, borrow_date, due_date, status, _ in loans:
+            book_id, member_id = find_book(title), find_member(name)
+            if book_id is None or member_id is None:
+                continue
+            status = statuses[status]
+            return_date = due_date if status == "Returned" else None
+            conn.execute(
+                "INSERT OR IGNORE INTO borrowed_books (borrow_id, book_id, member_id, borrow_date, "
+                "due_date, return_date, actual_return_date, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (borrow_id, book_id, member_id, borrow_date, due_date, return_date, return_date, status)
+            )
 
-    def commit(self):
-        pass
+        for fine_id, name, title, amount, issued, due, status in SampleData.SAMPLE_FINES:
+            book_id, member_id = find_book(title), find_member(name)
+            if book_id is None or member_id is None:
+                continue
+            cursor = conn.execute(
+                "INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, return_date, "
+                "actual_return_date, status) VALUES (?, ?, ?, ?, ?, ?, 'Returned')",
+                (book_id, member_id, issued, due, due, due)
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO fines (fine_id, borrow_id, member_id, amount, reason, fine_date, "
+                "due_date, status) VALUES (?, ?, ?, ?, 'Overdue fine', ?, ?, ?)",
+                (fine_id, cursor.lastrowid, member_id, float(amount.lstrip("$")), issued, due, status)
+            )
+
+
+# Catalogue search mode: "local" answers searches from the in-memory
+# CatalogueIndex (kiosk/offline), "database" always queries the server and
+# "auto" uses the local index with the SQLite stand-in.
+SEARCH_MODE = os.environ.get("SMARTLIBRARY_SEARCH", "auto").lower()
+
+
+def create_database():
+    """Create the configured database backend
+
+    SMARTLIBRARY_BACKEND selects ``postgresql`` or ``sqlite`` (the default);
+    SMARTLIBRARY_SQLITE_PATH stores the SQLite database on disk instead of in memory.
+    """
+    backend = os.environ.get("SMARTLIBRARY_BACKEND", "sqlite").lower()
+    pool_options = {
+        'min_size': int(os.environ.get("SMARTLIBRARY_POOL_MIN", 1)),
+        'max_size': int(os.environ.get("SMARTLIBRARY_POOL_MAX", 5)),
+        'timeout': float(os.environ.get("SMARTLIBRARY_POOL_TIMEOUT", 10.0)),
+    }
+    if backend in ("postgresql", "postgres"):
+        return PostgresDatabase(**pool_options)
+    return SQLiteDatabase(os.environ.get("SMARTLIBRARY_SQLITE_PATH"), **pool_options)
+
+
+def like_pattern(term, prefix_only=False):
+    """Build a LIKE pattern (ESCAPE '\\') that matches term literally"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%" if prefix_only else "%" + escaped + "%"
 
-    def rollback(self):
-        pass
 
+def format_money(amount):
+    """Format a DECIMAL/REAL amount the way the tables display it"""
+    return f"${float(amount or 0):.2f}"
+
+
+def to_cents(amount):
+    """A DECIMAL/REAL/str money amount as integer cents"""
+    return int((Decimal(str(amount or 0)) * 100).to_integral_value())
+
+
+class BookFilter:
+    """Composable filter over the books table (aliased ``b``)
+
+    Each method adds one parameterized condition and returns the filter, so
+    ``BookFilter().status("available").category("Fiction")`` mirrors the
+    combo boxes of the books screen. Every condition has an index to use:
+    ``available_copies > 0`` matches the partial idx_books_available,
+    categories use idx_books_category and overdue is a semi-join against the
+    overdue slice of idx_borrowed_books_status.
+    """
+
+    STATUS_CONDITIONS = {
+        "available": "b.available_copies > 0",
+        "borrowed": "b.available_copies = 0",
+        "overdue": "b.book_id IN (SELECT book_id FROM borrowed_books WHERE status = 'Overdue')",
+    }
 
-class MockCursor:
     def __init__(self):
-        self._rowcount = 0
+        self.where = []
+        self.params = []
+
+    def __bool__(self):
+        return bool(self.where)
 
-    def execute(self, query, params=None):
-        print(f"Executing: {query}")
-        if params:
-            print(f"Params: {params}")
+    def key(self):
+        """Hashable identity of the filter, for caching results"""
+        return tuple(self.where), tuple(self.params)
+
+    def add(self, condition, *params):
+        self.where.append(condition)
+        self.params.extend(params)
         return self
 
-    def fetchall(self):
-        # Return appropriate sample data based on query
-        query = str(getattr(self, '_last_query', ''))
-        if 'books' in query.lower() and 'author' in query.lower():
-            return MockDatabase.SAMPLE_BOOKS
-        elif 'users' in query.lower():
-            return [('admin', 'admin')]
-        elif 'count' in query.lower():
-            return [(42,)]  # Sample count
-        return []
-
-    def fetchone(self):
-        # For authentication
-        return ('admin', 'admin')
+    def status(self, status):
+        if status and status != "all":
+            self.add(self.STATUS_CONDITIONS[status])
+        return self
+
+    def category(self, category):
+        if category and category != "all":
+            self.add("b.category = %s", category)
+        return self
+
+
+class LibraryRepository:
+    """Queries used by the GUI, returning rows shaped like the Treeview columns"""
+
+    LOAN_STATUSES = {"active": "Borrowed", "overdue": "Overdue", "returned": "Returned"}
+
+    def __init__(self, db, settings=None):
+        self.db = db
+        self.changes = ChangeFeed()
+        self.settings = settings or SettingsService(db, self.changes)
+
+    def fetchall(self, query, params=(), cancel=None):
+        """Run a read-only query on a pooled connection
+
+        ``cancel`` is an optional QueryCancel that can interrupt the query.
+        """
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            if cancel is None:
+                cursor.execute(self.db.adapt(query), params)
+                return cursor.fetchall()
+            cancel.attach(self.db, conn)
+            try:
+                cursor.execute(self.db.adapt(query), params)
+                return cursor.fetchall()
+            finally:
+                cancel.detach()
+
+    def stream(self, query, params=(), batch_size=2000, cancel=None):
+        """Yield the rows of a read-only query in batches of batch_size
+
+        PostgreSQL reads through a server-side (named) cursor and SQLite steps
+        its statement, so only one batch is in memory however large the
+        result. ``cancel`` is an optional QueryCancel checked between
+        batches; cancelling also interrupts a batch being fetched.
+        """
+        with self.db.connection() as conn:
+            if self.db.dialect == "postgresql":
+                cursor = conn.cursor(name="smartlibrary_stream")
+                cursor.itersize = batch_size
+            else:
+                cursor = conn.cursor()
+            if cancel is not None:
+                cancel.attach(self.db, conn)
+            try:
+                cursor.execute(self.db.adapt(query), params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield rows
+                    if cancel is not None and cancel.cancelled:
+                        raise QueryCancelledError("Query was cancelled")
+            finally:
+                if cancel is not None:
+                    cancel.detach()
+
+    def execute(self, query, params=()):
+        """Run a write statement in its own transaction"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.db.adapt(query), params)
+            conn.commit()
+            return cursor.rowcount
+
+    def page(self, query, key_column, after=None, offset=0, limit=100, where=(), params=()):
+        """Fetch one window of query ordered by key_column
+
+        Rows start after the key ``after`` (keyset pagination); ``offset`` is
+        only used to jump to windows whose starting key is not known yet.
+        """
+        clauses = list(where)
+        params = list(params)
+        if after is not None:
+            clauses.append(f"{key_column} > %s")
+            params.append(after)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {key_column} LIMIT %s OFFSET %s"
+        return self.fetchall(query, params + [limit, offset])
+
+    def count(self, table, where=(), params=()):
+        query = f"SELECT COUNT(*) FROM {table}"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        return self.fetchall(query, params)[0][0]
+
+    BOOKS_QUERY = (
+        "SELECT book_id, title, author, isbn, available_copies, total_copies, "
+        "CASE WHEN available_copies > 0 THEN 'Available' ELSE 'Borrowed' END, category "
+        "FROM books b"
+    )
+
+    def count_books(self, filters=None):
+        filters = filters or BookFilter()
+        return self.count("books b", filters.where, filters.params)
+
+    def page_books(self, after=None, offset=0, limit=100, filters=None):
+        filters = filters or BookFilter()
+        return self.page(self.BOOKS_QUERY, "b.book_id", after, offset, limit, filters.where, filters.params)
+
+    def iter_books(self, batch_size=1000):
+        """Yield every book row, reading the table in keyset batches"""
+        after = None
+        while True:
+            rows = self.page_books(after, 0, batch_size)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][0]
+
+    def add_book(self, isbn, title, author, category=None, copies=1, publisher=None,
+                 publication_year=None, location_code=None, description=None):
+        """Insert a book and return its row in the books table shape"""
+        isbn = normalize_isbn(isbn)
+        if not isbn:
+            raise ValueError("ISBN must contain digits")
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self.db.adapt(
+                    "INSERT INTO books (isbn, title, author, category, publisher, publication_year, "
+                    "total_copies, available_copies, location_code, description) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING book_id"
+                ),
+                (isbn, title, author, category, publisher, publication_year,
+                 copies, copies, location_code, description)
+            )
+            book_id = cursor.fetchone()[0]
+            cursor.execute(self.db.adapt(self.BOOKS_QUERY + " WHERE b.book_id = %s"), (book_id,))
+            book = cursor.fetchone()
+            conn.commit()
+        self.changes.publish("books", "insert", book_id, book)
+        return book
+
+    def delete_book(self, book_id):
+        rowcount = self.execute("DELETE FROM books WHERE book_id = %s", (book_id,))
+        if rowcount:
+            self.changes.publish("books", "delete", book_id)
+        return rowcount
+
+    def get_book(self, book_id):
+        """One book in the books table shape, or None"""
+        rows = self.fetchall(self.BOOKS_QUERY + " WHERE b.book_id = %s", (book_id,))
+        return rows[0] if rows else None
+
+    def _publish_circulation(self, book_id, borrow_id, action):
+        """Change events of a checkout or check-in: the loan, its book and its fines"""
+        self.changes.publish("borrowed_books", action, borrow_id)
+        if self.changes.watched("books"):
+            self.changes.publish("books", "update", book_id, self.get_book(book_id))
+        if self.changes.watched("fines"):
+            for (fine_id,) in self.fetchall("SELECT fine_id FROM fines WHERE borrow_id = %s", (borrow_id,)):
+                self.changes.publish("fines", "update", fine_id)
+
+    def _publish_circulation_batch(self, loans):
+        """Change events of many checkouts/check-ins, one query per table
+
+        loans holds (book_id, borrow_id, action) triples.
+        """
+        if not loans:
+            return
+        for book_id, borrow_id, action in loans:
+            self.changes.publish("borrowed_books", action, borrow_id)
+        if self.changes.watched("books"):
+            book_ids = sorted({book_id for book_id, _, _ in loans})
+            marks = ", ".join(["%s"] * len(book_ids))
+            for book in self.fetchall(self.BOOKS_QUERY + f" WHERE b.book_id IN ({marks})", book_ids):
+                self.changes.publish("books", "update", book[0], book)
+        if self.changes.watched("fines"):
+            borrow_ids = [borrow_id for _, borrow_id, action in loans if action == "update"]
+            if borrow_ids:
+                marks = ", ".join(["%s"] * len(borrow_ids))
+                for (fine_id,) in self.fetchall(f"SELECT fine_id FROM fines WHERE borrow_id IN ({marks})",
+                                                borrow_ids):
+                    self.changes.publish("fines", "update", fine_id)
+
+    BOOK_SEARCH_COLUMNS = (
+        "b.book_id, b.title, b.author, b.isbn, b.available_copies, b.total_copies, "
+        "CASE WHEN b.available_copies > 0 THEN 'Available' ELSE 'Borrowed' END, b.category"
+    )
+
+    def _book_search(self, term, filters=None):
+        """Return the ranked search subquery and its parameters
+
+        Rows carry a trailing ``score`` column (higher is better). PostgreSQL
+        matches through the search_vector/pg_trgm GIN indexes; the SQLite
+        stand-in uses its FTS5 trigram index, or LIKE when that is missing.
+        A BookFilter is ANDed onto the match in the same query.
+        """
+        term = term.strip()
+        tokens = re.findall(r"\w+", term.lower())
+        contains = like_pattern(term)
+        isbn_prefix = like_pattern(normalize_isbn(term) if ISBN_LIKE.fullmatch(term) else term, prefix_only=True)
+
+        if self.db.dialect == "postgresql":
+            conditions = [
+                "b.title ILIKE %s ESCAPE '\\'",
+                "b.author ILIKE %s ESCAPE '\\'",
+                "b.isbn LIKE %s ESCAPE '\\'",
+            ]
+            score = (
+                "similarity(b.title, %s) + similarity(b.author, %s) "
+                "+ CASE WHEN b.isbn LIKE %s ESCAPE '\\' THEN 1 ELSE 0 END"
+            )
+            score_params = [term, term, isbn_prefix]
+            match_params = [contains, contains, isbn_prefix]
+            if tokens:
+                tsquery = " & ".join(token + ":*" for token in tokens)
+                conditions.insert(0, "b.search_vector @@ to_tsquery('simple', %s)")
+                match_params.insert(0, tsquery)
+                score = "ts_rank(b.search_vector, to_tsquery('simple', %s)) + " + score
+                score_params.insert(0, tsquery)
+            select = f"SELECT {self.BOOK_SEARCH_COLUMNS}, {score} AS score FROM books b"
+            return self._filtered(select, " OR ".join(conditions), score_params + match_params, filters)
+
+        fts_tokens = [token for token in tokens if len(token) >= 3]
+        if getattr(self.db, "has_fts", False) and fts_tokens:
+            match = " AND ".join('"' + token.replace('"', '""') + '"' for token in fts_tokens)
+            select = (
+                f"SELECT {self.BOOK_SEARCH_COLUMNS}, -bm25(books_fts) AS score "
+                "FROM books_fts JOIN books b ON b.book_id = books_fts.rowid"
+            )
+            return self._filtered(select, "books_fts MATCH %s", [match], filters)
+
+        select = (
+            f"SELECT {self.BOOK_SEARCH_COLUMNS}, "
+            "CASE WHEN b.isbn LIKE %s ESCAPE '\\' THEN 1.0 ELSE 0.0 END AS score FROM books b"
+        )
+        match = (
+            "b.title LIKE %s ESCAPE '\\' OR b.author LIKE %s ESCAPE '\\' "
+            "OR b.isbn LIKE %s ESCAPE '\\'"
+        )
+        return self._filtered(select, match, [isbn_prefix, contains, contains, isbn_prefix], filters)
+
+    def _book_matcher(self, term):
+        """The match rule of _book_search as (mode, predicate on a result row)
+
+        Lets a previous result set be narrowed in memory to exactly the rows
+        a fresh query would return; mode changes when the query would take a
+        different branch, and then the rows cannot be narrowed.
+        """
+        term = term.strip()
+        tokens = re.findall(r"\w+", term.lower())
+        isbn_prefix = normalize_isbn(term) if ISBN_LIKE.fullmatch(term) else term
+
+        if self.db.dialect == "postgresql":
+            needle = term.lower()
+
+            def matches(row):
+                title, author, isbn = (row[1] or "").lower(), (row[2] or "").lower(), row[3] or ""
+                words = re.findall(r"\w+", title + " " + author)
+                return (
+                    bool(tokens) and all(any(word.startswith(token) for word in words) for token in tokens)
+                    or needle in title or needle in author or isbn.startswith(isbn_prefix)
+                )
+            return "postgresql", matches
+
+        fts_tokens = [token for token in tokens if len(token) >= 3]
+        if getattr(self.db, "has_fts", False) and fts_tokens:
+            def matches(row):
+                columns = [(value or "").lower() for value in row[1:4]]
+                return all(any(token in column for column in columns) for token in fts_tokens)
+            return "fts", matches
+
+        # SQLite's LIKE folds ASCII letters only
+        fold = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+        needle, isbn_prefix = term.translate(fold), isbn_prefix.translate(fold)
+
+        def matches(row):
+            title, author, isbn = ((value or "").translate(fold) for value in row[1:4])
+            return needle in title or needle in author or isbn.startswith(isbn_prefix)
+        return "like", matches
+
+    def narrow_search_books(self, rows, previous_term, term):
+        """Rows of a search for previous_term that also match term, in order
+
+        rows must be every match for previous_term. Returns None when term
+        does not extend it or is matched differently; re-run the search then.
+        """
+        if not term.strip().lower().startswith(previous_term.strip().lower()):
+            return None
+        previous_mode, _ = self._book_matcher(previous_term)
+        mode, matches = self._book_matcher(term)
+        if mode != previous_mode:
+            return None
+        return [row for row in rows if matches(row)]
+
+    @staticmethod
+    def _filtered(select, match, params, filters):
+        where, params = [f"({match})"], list(params)
+        if filters:
+            where += filters.where
+            params += filters.params
+        return f"{select} WHERE {' AND '.join(where)}", params
+
+    def count_search_books(self, term, filters=None):
+        query, params = self._book_search(term, filters)
+        return self.fetchall(f"SELECT COUNT(*) FROM ({query}) ranked", params)[0][0]
+
+    def search_books(self, term, after=None, offset=0, limit=100, cancel=None, filters=None):
+        """Ranked page of books matching term, keyset-paginated on (score, book_id)"""
+        query, params = self._book_search(term, filters)
+        query = f"SELECT * FROM ({query}) ranked"
+        if after is not None:
+            score, book_id = after
+            query += " WHERE score < %s OR (score = %s AND book_id > %s)"
+            params += [score, score, book_id]
+        query += " ORDER BY score DESC, book_id LIMIT %s OFFSET %s"
+        return self.fetchall(query, params + [limit, offset], cancel)
+
+    def _prefix(self, column, prefix):
+        """Case-insensitive prefix condition on column that can use its index
+
+        Both backends compare lower(column), which has an expression index:
+        PostgreSQL matches LIKE against its text_pattern_ops index; SQLite
+        gets an explicit range, since it never uses an expression index for
+        LIKE or GLOB. SQLite's lower() only folds ASCII, so the prefix is
+        folded the same way there.
+        """
+        if self.db.dialect == "postgresql":
+            return f"lower({column}) LIKE %s ESCAPE '\\'", [like_pattern(prefix.lower(), prefix_only=True)]
+        prefix = "".join(char.lower() if char.isascii() else char for char in prefix)
+        return f"lower({column}) >= %s AND lower({column}) < %s", [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+
+    def _lookup(self, columns, table, order, branches, limit, where=None):
+        """Rows matching any branch, best branch first, without duplicates
+
+        Each branch is a list of (column, prefix) pairs read as its own
+        limited index range scan, so a lookup touches at most ``limit``
+        index entries per branch however large the table.
+        """
+        selects, params = [], []
+        for rank, branch in enumerate(branches):
+            conditions = [self._prefix(column, prefix) for column, prefix in branch]
+            where_sql = " AND ".join([condition for condition, _ in conditions] + ([where] if where else []))
+            selects.append(
+                f"SELECT * FROM (SELECT {columns}, {rank} AS branch FROM {table} "
+                f"WHERE {where_sql} LIMIT %s) b{rank}"
+            )
+            params += [param for _, values in conditions for param in values] + [limit]
+        rows, seen = [], set()
+        for row in self.fetchall(" UNION ALL ".join(selects) + f" ORDER BY branch, {order}", params):
+            if row[0] not in seen:
+                seen.add(row[0])
+                rows.append(row[:-1])
+        return rows[:limit]
+
+    def lookup_members(self, term, limit=10):
+        """Members whose membership number, name or email starts with term, in any case
+
+        Rows are (member_id, name, membership_number, email, status).
+        """
+        term = " ".join(term.split())
+        if not term:
+            return []
+        branches = [[("membership_number", term)]]
+        words = term.split(" ")
+        if len(words) == 2:
+            branches.append([("first_name", words[0]), ("last_name", words[1])])
+        branches += [[("first_name", term)], [("last_name", term)], [("email", term)]]
+        return self._lookup(
+            "member_id, first_name || ' ' || last_name AS name, membership_number, email, status",
+            "members", "name", branches, limit
+        )
+
+    def lookup_books(self, term, limit=10, available_only=True):
+        """Books whose ISBN or title starts with term, in any case
+
+        Rows are (book_id, title, author, isbn, available_copies), the
+        leading columns of the books table.
+        """
+        term = " ".join(term.split())
+        if not term:
+            return []
+        branches = []
+        isbn = normalize_isbn(term)
+        if isbn and ISBN_LIKE.fullmatch(term):
+            branches.append([("isbn", isbn)])
+        branches.append([("title", term)])
+        return self._lookup(
+            "book_id, title, author, isbn, available_copies", "books", "title", branches, limit,
+            "available_copies > 0" if available_only else None
+        )
+
+    def _check_loan_limit(self, cursor, member_id):
+        """Raise LoanError if the member already has max_books_per_member books out"""
+        limit = self.settings["max_books_per_member"]
+        cursor.execute(self.db.adapt(
+            "SELECT COUNT(*) FROM borrowed_books WHERE member_id = %s AND status IN ('Borrowed', 'Overdue')"
+        ), (member_id,))
+        if limit and cursor.fetchone()[0] >= limit:
+            raise LoanError(f"Member already has {limit} books on loan, the most allowed")
+
+    def issue_loan(self, book_id, member_id, due_days=None, issued_by=None):
+        """Lend a book (the borrow_book procedure) and return the new borrow_id
+
+        The loan runs for due_days, by default the max_borrow_days setting.
+        """
+        due_days = due_days or self.settings["max_borrow_days"]
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            self._check_loan_limit(cursor, member_id)
+            if self.db.dialect == "postgresql":
+                cursor.execute("CALL borrow_book(%s, %s, %s, %s)", (book_id, member_id, issued_by, due_days))
+                cursor.execute("SELECT currval('borrowed_books_borrow_id_seq')")
+                borrow_id = cursor.fetchone()[0]
+                conn.commit()
+                self._publish_circulation(book_id, borrow_id, "insert")
+                return borrow_id
+
+            cursor.execute("SELECT available_copies FROM books WHERE book_id = ?", (book_id,))
+            row = cursor.fetchone()
+            if row is None or row[0] <= 0:
+                raise LoanError("Book is not available for borrowing")
+            cursor.execute(
+                "SELECT 1 FROM borrowed_books WHERE book_id = ? AND member_id = ? AND status = 'Borrowed'",
+                (book_id, member_id)
+            )
+            if cursor.fetchone() is not None:
+                raise LoanError("Member already has this book borrowed")
+            cursor.execute(
+                "INSERT INTO borrowed_books (book_id, member_id, borrowed_by, borrow_date, due_date, status) "
+                "VALUES (?, ?, ?, DATE('now'), DATE('now', ?), 'Borrowed')",
+                (book_id, member_id, issued_by, f"+{int(due_days)} days")
+            )
+            borrow_id = cursor.lastrowid
+            cursor.execute(
+                "INSERT INTO activity_log (user_id, member_id, action_type, table_name, record_id, description) "
+                "VALUES (?, ?, 'BORROW_BOOK', 'borrowed_books', ?, "
+                "'Book borrowed with due date ' || DATE('now', ?))",
+                (issued_by, member_id, borrow_id, f"+{int(due_days)} days")
+            )
+            conn.commit()
+        self._publish_circulation(book_id, borrow_id, "insert")
+        return borrow_id
+
+    def return_loan(self, borrow_id, condition="Good", returned_by=None):
+        """Check a loan back in (the return_book procedure)"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.db.adapt(
+                "SELECT member_id, book_id, status FROM borrowed_books WHERE borrow_id = %s"
+            ), (borrow_id,))
+            row = cursor.fetchone()
+            if row is None:
+                raise LoanError("Borrow record not found")
+            if row[2] not in ("Borrowed", "Overdue"):
+                raise LoanError(f"Book is not on loan (loan is {row[2].lower()})")
+            if self.db.dialect == "postgresql":
+                cursor.execute("CALL return_book(%s, %s, %s)", (borrow_id, returned_by, condition))
+                conn.commit()
+                self._publish_circulation(row[1], borrow_id, "update")
+                return
+            cursor.execute(
+                "UPDATE borrowed_books SET status = 'Returned', return_date = DATE('now'), "
+                "actual_return_date = DATE('now'), condition_after = ? "
+                "WHERE borrow_id = ? AND status IN ('Borrowed', 'Overdue')",
+                (condition, borrow_id)
+            )
+            if cursor.rowcount == 0:
+                raise LoanError("Book is not on loan")
+            cursor.execute(
+                "INSERT INTO activity_log (user_id, member_id, action_type, table_name, record_id, description) "
+                "VALUES (?, ?, 'RETURN_BOOK', 'borrowed_books', ?, 'Book returned with condition: ' || ?)",
+                (returned_by, row[0], borrow_id, condition)
+            )
+            conn.commit()
+        self._publish_circulation(row[1], borrow_id, "update")
+
+    RETURN_CHUNK = 500
+
+    def return_loans(self, borrow_ids, condition="Good", returned_by=None):
+        """Check many loans back in, RETURN_CHUNK loans per transaction
+
+        Returns {borrow_id: (ok, message)} in the order given; loans that
+        are unknown or no longer open are reported, not raised.
+        """
+        borrow_ids = list(dict.fromkeys(int(borrow_id) for borrow_id in borrow_ids))
+        results, events = {}, []
+        for start in range(0, len(borrow_ids), self.RETURN_CHUNK):
+            chunk = borrow_ids[start:start + self.RETURN_CHUNK]
+            marks = ", ".join(["%s"] * len(chunk))
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                returned = self._return_loans(cursor, chunk, condition, returned_by)
+                cursor.execute(self.db.adapt(
+                    "SELECT bb.borrow_id, bb.book_id, bb.status, f.amount FROM borrowed_books bb "
+                    "LEFT JOIN fines f ON f.borrow_id = bb.borrow_id AND f.status = 'Pending' "
+                    f"WHERE bb.borrow_id IN ({marks})"
+                ), chunk)
+                loans = {row[0]: row[1:] for row in cursor.fetchall()}
+                conn.commit()
+
+            for borrow_id in chunk:
+                loan = loans.get(borrow_id)
+                if borrow_id in returned:
+                    fine = loan[2]
+                    results[borrow_id] = (True, "Returned" + (f", fine {format_money(fine)}" if fine else ""))
+                    events.append((loan[0], borrow_id, "update"))
+                elif loan is None:
+                    results[borrow_id] = (False, "Loan not found")
+                elif loan[1] == "Returned":
+                    results[borrow_id] = (False, "Already returned")
+                else:
+                    results[borrow_id] = (False, f"Loan is {loan[1].lower()}")
+        self._publish_circulation_batch(events)
+        return results
+
+    def _return_loans(self, cursor, borrow_ids, condition="Good", returned_by=None):
+        """Check loans back in set-wise; returns the set of borrow_ids returned
+
+        PostgreSQL runs the return_books procedure: one statement for the
+        loans, one grouped UPDATE of available_copies and set-based fines
+        and activity_log inserts. On SQLite the loans are returned with one
+        UPDATE and the availability and fine triggers fire per row inside
+        it.
+        """
+        if not borrow_ids:
+            return set()
+        if self.db.dialect == "postgresql":
+            cursor.execute("CALL return_books(%s, %s, %s, NULL)", (list(borrow_ids), returned_by, condition))
+            return set(cursor.fetchone()[0] or ())
+        marks = ", ".join(["%s"] * len(borrow_ids))
+        today = date.today().isoformat()
+        cursor.execute(self.db.adapt(
+            "UPDATE borrowed_books SET status = 'Returned', return_date = %s, actual_return_date = %s, "
+            f"condition_after = %s WHERE borrow_id IN ({marks}) AND status IN ('Borrowed', 'Overdue') "
+            "RETURNING borrow_id, member_id"
+        ), [today, today, condition] + list(borrow_ids))
+        returned = dict(cursor.fetchall())
+        cursor.executemany(self.db.adapt(
+            "INSERT INTO activity_log (user_id, member_id, action_type, table_name, record_id, description) "
+            "VALUES (%s, %s, 'RETURN_BOOK', 'borrowed_books', %s, %s)"
+        ), [(returned_by, member_id, borrow_id, f"Book returned with condition: {condition}")
+            for borrow_id, member_id in returned.items()])
+        return set(returned)
+
+    def circulate(self, scans, due_days=None, operator=None):
+        """Apply a batch of circulation desk scans in one transaction
+
+        scans are (kind, member_barcode, item_barcode) triples: kind
+        "member" looks a patron card up, "checkout" lends the item to the
+        member and "checkin" returns the item's open loan (the member's,
+        when one is given, else the one due first). Members are scanned by
+        membership number and items by ISBN. Barcodes are resolved, the
+        books locked and their open loans read with one query each, the
+        borrow_book checks run over the batch in memory, then all loans are
+        inserted with one statement and all returns made with another.
+        Returns one (ok, message, detail) per scan, in order; a scan that
+        fails its checks is reported without affecting the rest. Loans run
+        for due_days, by default the max_borrow_days setting, and stop at
+        max_books_per_member.
+        """
+        due_days = due_days or self.settings["max_borrow_days"]
+        loan_limit = self.settings["max_books_per_member"]
+        adapt = self.db.adapt
+        member_codes = sorted({member.upper() for _, member, _ in scans if member})
+        isbns = sorted({normalize_isbn(item) for _, _, item in scans if item})
+        results = [None] * len(scans)
+        checkouts, checkins = [], []
+        today = date.today()
+        due_date = today + timedelta(days=due_days)
+
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            members, books, loans = {}, {}, {}
+            if member_codes:
+                marks = ", ".join(["%s"] * len(member_codes))
+                cursor.execute(adapt(
+                    "SELECT membership_number, member_id, first_name || ' ' || last_name, status "
+                    f"FROM members WHERE membership_number IN ({marks})"
+                ), member_codes)
+                members = {row[0]: row[1:] for row in cursor.fetchall()}
+            on_loan = {}
+            if members:
+                member_ids = [member[0] for member in members.values()]
+                marks = ", ".join(["%s"] * len(member_ids))
+                cursor.execute(adapt(
+                    "SELECT member_id, COUNT(*) FROM borrowed_books "
+                    f"WHERE member_id IN ({marks}) AND status IN ('Borrowed', 'Overdue') GROUP BY member_id"
+                ), member_ids)
+                on_loan = dict(cursor.fetchall())
+            if isbns:
+                # Lock the books in a fixed order, as borrow_book locks its one book
+                marks = ", ".join(["%s"] * len(isbns))
+                cursor.execute(adapt(
+                    f"SELECT isbn, book_id, title, available_copies FROM books WHERE isbn IN ({marks}) "
+                    "ORDER BY book_id" + (" FOR UPDATE" if self.db.dialect == "postgresql" else "")
+                ), isbns)
+                books = {row[0]: list(row[1:]) for row in cursor.fetchall()}
+            if books:
+                book_ids = [book[0] for book in books.values()]
+                marks = ", ".join(["%s"] * len(book_ids))
+                cursor.execute(adapt(
+                    "SELECT book_id, borrow_id, member_id FROM borrowed_books "
+                    f"WHERE book_id IN ({marks}) AND status IN ('Borrowed', 'Overdue') "
+                    "ORDER BY due_date, borrow_id"
+                ), book_ids)
+                for book_id, borrow_id, member_id in cursor.fetchall():
+                    loans.setdefault(book_id, []).append([borrow_id, member_id])
+
+            for index, (kind, member_code, item_code) in enumerate(scans):
+                member = members.get(member_code.upper()) if member_code else None
+                if kind == "member":
+                    if member is None:
+                        results[index] = (False, f"Unknown member card {member_code}", None)
+                    else:
+                        results[index] = (member[2] == "Active", f"{member[1]} ({member[2]})", member)
+                    continue
+                book = books.get(normalize_isbn(item_code))
+                if book is None:
+                    results[index] = (False, f"Unknown item {item_code}", None)
+                    continue
+                book_id, title, available = book
+                open_loans = loans.setdefault(book_id, [])
+
+                if kind == "checkout":
+                    if member is None:
+                        results[index] = (False, f"Unknown member card {member_code}", None)
+                    elif member[2] != "Active":
+                        results[index] = (False, f"{member[1]}'s membership is {member[2].lower()}", None)
+                    elif available <= 0:
+                        results[index] = (False, f"'{title}' has no copies available", None)
+                    elif any(loan[1] == member[0] for loan in open_loans):
+                        results[index] = (False, f"{member[1]} already has '{title}'", None)
+                    elif loan_limit and on_loan.get(member[0], 0) >= loan_limit:
+                        results[index] = (False, f"{member[1]} already has {loan_limit} books, the most allowed",
+                                          None)
+                    else:
+                        book[2] -= 1
+                        on_loan[member[0]] = on_loan.get(member[0], 0) + 1
+                        open_loans.append([None, member[0]])
+                        checkouts.append((index, book_id, member[0], title))
+                    continue
+
+                candidates = [loan for loan in open_loans if loan[0] is not None]
+                if member is not None:
+                    candidates = [loan for loan in candidates if loan[1] == member[0]] or candidates
+                if not candidates:
+                    results[index] = (False, f"'{title}' is not on loan", None)
+                    continue
+                loan = candidates[0]
+                open_loans.remove(loan)
+                book[2] += 1
+                if loan[1] in on_loan:
+                    on_loan[loan[1]] -= 1
+                checkins.append((index, book_id, loan[0], title))
+
+            borrowed = {}
+            if checkouts:
+                values = ", ".join(["(%s, %s, %s, %s, %s, 'Borrowed')"] * len(checkouts))
+                params = []
+                for _, book_id, member_id, _ in checkouts:
+                    params += [book_id, member_id, operator, today.isoformat(), due_date.isoformat()]
+                cursor.execute(adapt(
+                    "INSERT INTO borrowed_books (book_id, member_id, borrowed_by, borrow_date, due_date, status) "
+                    f"VALUES {values} RETURNING borrow_id, book_id, member_id"
+                ), params)
+                borrowed = {(book_id, member_id): borrow_id for borrow_id, book_id, member_id in cursor.fetchall()}
+                cursor.executemany(adapt(
+                    "INSERT INTO activity_log (user_id, member_id, action_type, table_name, record_id, description) "
+                    "VALUES (%s, %s, 'BORROW_BOOK', 'borrowed_books', %s, %s)"
+                ), [(operator, member_id, borrowed[(book_id, member_id)], f"Book borrowed with due date {due_date}")
+                    for _, book_id, member_id, _ in checkouts])
+
+            returned = self._return_loans(cursor, [borrow_id for _, _, borrow_id, _ in checkins],
+                                          returned_by=operator)
+            fines = {}
+            if returned:
+                marks = ", ".join(["%s"] * len(returned))
+                cursor.execute(adapt(
+                    f"SELECT borrow_id, amount FROM fines WHERE borrow_id IN ({marks}) AND status = 'Pending'"
+                ), list(returned))
+                fines = dict(cursor.fetchall())
+            conn.commit()
+
+        events = []
+        for index, book_id, member_id, title in checkouts:
+            borrow_id = borrowed[(book_id, member_id)]
+            results[index] = (True, f"'{title}' due {due_date}", borrow_id)
+            events.append((book_id, borrow_id, "insert"))
+        for index, book_id, borrow_id, title in checkins:
+            if borrow_id not in returned:
+                results[index] = (False, f"'{title}' was already returned", None)
+                continue
+            fine = fines.get(borrow_id)
+            results[index] = (True, f"'{title}' returned" + (f", fine {format_money(fine)}" if fine else ""),
+                              borrow_id)
+            events.append((book_id, borrow_id, "update"))
+        self._publish_circulation_batch(events)
+        return results
+
+    def dashboard_stats(self):
+        """Dashboard counters from the trigger-maintained library_stats table"""
+        return dict(self.fetchall("SELECT stat_key, stat_value FROM library_stats"))
+
+    def refresh_stats(self):
+        """Recompute library_stats from the base tables"""
+        if self.db.dialect == "postgresql":
+            return self.execute("CALL refresh_library_stats()")
+        return self.execute("INSERT OR REPLACE INTO library_stats (stat_key, stat_value) " + LIBRARY_STATS_QUERY)
+
+    def recent_activity(self, limit=50):
+        """Latest activity_log entries as (log_id, time, user, action, details)"""
+        rows = self.fetchall(
+            "SELECT a.log_id, a.created_at, COALESCE(u.username, 'system'), a.action_type, "
+            "COALESCE(a.description, '') "
+            "FROM activity_log a LEFT JOIN users u ON a.user_id = u.user_id "
+            "ORDER BY a.created_at DESC, a.log_id DESC LIMIT %s", [limit]
+        )
+        return [
+            (r[0], str(r[1])[:16], r[2], r[3].replace("_", " ").title(), r[4])
+            for r in rows
+        ]
+
+    MEMBERS_QUERY = (
+        "SELECT m.member_id, m.first_name || ' ' || m.last_name, m.membership_number, m.email, "
+        "m.phone, m.membership_type, "
+        "(SELECT COUNT(*) FROM borrowed_books bb "
+        " WHERE bb.member_id = m.member_id AND bb.status IN ('Borrowed', 'Overdue')), "
+        "m.status "
+        "FROM members m"
+    )
+
+    def count_members(self):
+        return self.count("members")
+
+    def page_members(self, after=None, offset=0, limit=100):
+        return self.page(self.MEMBERS_QUERY, "m.member_id", after, offset, limit)
+
+    RETURNED_LOANS_QUERY = (
+        "SELECT bb.borrow_id, b.title, m.first_name || ' ' || m.last_name, bb.borrow_date, "
+        "bb.due_date, bb.status, "
+        "COALESCE((SELECT SUM(f.amount) FROM fines f WHERE f.borrow_id = bb.borrow_id), 0) "
+        "FROM loan_history bb "
+        "JOIN books b ON bb.book_id = b.book_id "
+        "JOIN members m ON bb.member_id = m.member_id "
+        "WHERE bb.status = 'Returned'"
+    )
+    OPEN_LOANS_QUERY = (
+        "SELECT borrow_id, book_title, member_name, borrow_date, due_date, status, calculated_fine "
+        "FROM view_active_loans"
+    )
+
+    def count_loans(self, loan_type):
+        table = "loan_history" if loan_type == "returned" else "borrowed_books"
+        return self.count(table, ["status = %s"], [self.LOAN_STATUSES[loan_type]])
+
+    @staticmethod
+    def history_key(row):
+        """Keyset key of a returned-loans row: (borrow_date, borrow_id)"""
+        return (row[3], row[0])
+
+    def page_history(self, after=None, offset=0, limit=100):
+        """Fetch one window of returned loans, newest first
+
+        History is keyed on (borrow_date, borrow_id) so each window is a range
+        scan of the history indexes of borrowed_books and its archive, however
+        many years of loans lie behind it.
+        """
+        query = self.RETURNED_LOANS_QUERY
+        params = []
+        if after is not None:
+            borrow_date, borrow_id = after
+            query += " AND bb.borrow_date <= %s AND (bb.borrow_date < %s OR bb.borrow_id < %s)"
+            params += [borrow_date, borrow_date, borrow_id]
+        query += " ORDER BY bb.borrow_date DESC, bb.borrow_id DESC LIMIT %s OFFSET %s"
+        return self.fetchall(query, params + [limit, offset])
+
+    def page_loans(self, loan_type, after=None, offset=0, limit=100):
+        status = self.LOAN_STATUSES[loan_type]
+        if loan_type == "returned":
+            rows = self.page_history(after, offset, limit)
+        else:
+            rows = self.page(self.OPEN_LOANS_QUERY, "borrow_id", after, offset, limit,
+                             ["status = %s"], [status])
+        display_status = {"Borrowed": "Active"}
+        return [
+            (r[0], r[1], r[2], str(r[3]), str(r[4]), display_status.get(r[5], r[5]), format_money(r[6]))
+            for r in rows
+        ]
+
+    FINES_QUERY = (
+        "SELECT f.fine_id, m.first_name || ' ' || m.last_name, "
+        "COALESCE((SELECT b.title FROM loan_history bb JOIN books b ON bb.book_id = b.book_id "
+        "          WHERE bb.borrow_id = f.borrow_id), ''), "
+        "f.amount, f.fine_date, f.due_date, f.status "
+        "FROM fines f "
+        "JOIN members m ON f.member_id = m.member_id"
+    )
+
+    def count_fines(self):
+        return self.count("fines")
+
+    def page_fines(self, after=None, offset=0, limit=100):
+        rows = self.page(self.FINES_QUERY, "f.fine_id", after, offset, limit)
+        return [(r[0], r[1], r[2], format_money(r[3]), str(r[4]), str(r[5]), r[6]) for r in rows]
+
+
+# Shared pooled database used by the application, created on first use so
+# importing the module neither opens nor seeds a database
+DatabaseConnection = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    """The shared pooled database, created by the first caller"""
+    global DatabaseConnection
+    with _database_lock:
+        if DatabaseConnection is None:
+            DatabaseConnection = create_database()
+        return DatabaseConnection
+
+
+# ============================================================================
+# ASYNC DATA FETCHING
+# ============================================================================
+
+class DataFetcher:
+    """Runs database work on a thread pool and delivers results to the Tk thread
+
+    Tk is not thread-safe, so workers never touch widgets: finished futures are
+    queued and drained on the main loop by a ``root.after`` poll that only runs
+    while work is outstanding. Requests are grouped in channels (one per
+    screen); cancelling a channel drops its queued jobs and discards the
+    results of jobs that are already running.
+    """
+
+    POLL_INTERVAL_MS = 15
+
+    def __init__(self, root, max_workers=4, changes=None):
+        self.root = root
+        self.changes = changes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="smartlibrary-db")
+        self._results = queue.Queue()
+        self._generations = {}
+        self._pending = {}
+        self._poll_job = None
+
+    def submit(self, channel, func, on_success, on_error=None, *args):
+        """Run func(*args) on a worker and call on_success(result) on the Tk thread"""
+        generation = self._generations.get(channel, 0)
+        future = self._executor.submit(func, *args)
+        self._pending.setdefault(channel, set()).add(future)
+        future.add_done_callback(
+            lambda f: self._results.put((channel, generation, f, on_success, on_error))
+        )
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.POLL_INTERVAL_MS, self._poll)
+        return future
+
+    def cancel(self, channel):
+        """Cancel every request of a channel; late results are ignored"""
+        self._generations[channel] = self._generations.get(channel, 0) + 1
+        for future in self._pending.pop(channel, ()):
+            future.cancel()
+
+    def busy(self, channel):
+        return bool(self._pending.get(channel))
+
+    def shutdown(self):
+        for channel in list(self._pending):
+            self.cancel(channel)
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        self._poll_job = None
+        try:
+            while True:
+                # Change events of a write reach the screens before its callback
+                if self.changes is not None:
+                    self._call(self.changes.deliver)
+                try:
+                    channel, generation, future, on_success, on_error = self._results.get_nowait()
+                except queue.Empty:
+                    break
+
+                self._pending.get(channel, set()).discard(future)
+                if future.cancelled() or generation != self._generations.get(channel, 0):
+                    continue
+
+                error = future.exception()
+                if error is None:
+                    self._call(on_success, future.result())
+                elif on_error is not None:
+                    self._call(on_error, error)
+                else:
+                    self._call(messagebox.showerror, "Database Error", str(error))
+        finally:
+            if self._poll_job is None and (any(self._pending.values()) or not self._results.empty()):
+                self._poll_job = self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _call(self, callback, *args):
+        """Run a callback, reporting its errors the way Tk reports those of its own callbacks
+
+        A failing callback must not stop the results queued behind it from
+        being delivered.
+        """
+        try:
+            callback(*args)
+        except Exception:
+            self.root.report_callback_exception(*sys.exc_info())
+
+
+class ChangeFeed:
+    """Row-level change events published by LibraryRepository writes
+
+    After a write commits it publishes ``(table, action, key, row)``: action
+    is "insert", "update" or "delete", key the primary key of the changed
+    row (book_id, member_id, borrow_id or fine_id) and row the new row in
+    the screen's shape when the writer has it, else None. Writes run on
+    worker threads, so events are queued and handed to the subscribers of
+    their table by ``deliver()``, which the DataFetcher calls on the Tk
+    thread. Nothing is queued for tables nobody subscribes to.
+    """
+
+    def __init__(self):
+        self._events = queue.Queue()
+        self._subscribers = {}
+
+    def subscribe(self, table, callback, owner=None):
+        """Call callback(action, key, row) for changes to table
+
+        With an owner widget the subscription ends when the widget is destroyed.
+        """
+        self._subscribers.setdefault(table, []).append(callback)
+        if owner is not None:
+            owner.bind("<Destroy>", lambda event: self.unsubscribe(table, callback)
+                       if event.widget is owner else None, add="+")
+
+    def unsubscribe(self, table, callback):
+        callbacks = self._subscribers.get(table, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def watched(self, table):
+        return bool(self._subscribers.get(table))
+
+    def publish(self, table, action, key, row=None):
+        if self.watched(table):
+            self._events.put((table, action, key, row))
+
+    def deliver(self):
+        """Run the subscribers of every queued event (Tk thread)"""
+        while True:
+            try:
+                table, action, key, row = self._events.get_nowait()
+            except queue.Empty:
+                return
+            for callback in list(self._subscribers.get(table, ())):
+                callback(action, key, row)
+
+
+# ============================================================================
+# SETTINGS CACHE
+# ============================================================================
+
+class SettingsService:
+    """system_settings and the fine policies, loaded once and kept in memory
+
+    Settings are typed by their setting_type (integer, decimal, boolean,
+    else string) and fall back to DEFAULTS when a row is missing; fine
+    policies are in FineEngine's cents form. Nothing is read until the
+    first lookup, after which lookups are dict reads.
+
+    The cache follows changes made anywhere, from a daemon thread so that
+    lookups never query: on PostgreSQL a dedicated connection LISTENs on
+    CHANNEL, which the settings triggers NOTIFY on commit, and the thread
+    reloads on each notification. On SQLite the triggers bump
+    settings_version, which the thread compares every VERSION_CHECK_SECONDS.
+    Each reload publishes a "system_settings" change event.
+    """
+
+    CHANNEL = "smartlibrary_settings"
+    VERSION_CHECK_SECONDS = 5.0
+    RECONNECT_SECONDS = 5.0
+
+    DEFAULTS = {
+        "library_name": "SmartLibrary",
+        "fine_per_day": Decimal("0.50"),
+        "max_borrow_days": 14,
+        "max_books_per_member": 5,
+        "reservation_period_days": 3,
+    }
+
+    def __init__(self, db, changes=None):
+        self.db = db
+        self.changes = changes
+        self._values = None
+        self._policies = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def get(self, key, default=None):
+        values = self._current()
+        if key in values:
+            return values[key]
+        return self.DEFAULTS.get(key, default)
+
+    def __getitem__(self, key):
+        return self.get(key)
+
+    @property
+    def fine_policies(self):
+        self._current()
+        return self._policies
+
+    def _current(self):
+        if self._values is None:
+            with self._lock:
+                if self._values is None:
+                    self._start()
+        return self._values
+
+    def _start(self):
+        if self.db.dialect == "postgresql":
+            # Listen before the first load so no change can fall in between
+            conn = self._listen()
+            self.reload()
+            target, args = self._watch, (conn,)
+        else:
+            self.reload()
+            target, args = self._poll, ()
+        self._watcher = threading.Thread(target=target, args=args, name="smartlibrary-settings", daemon=True)
+        self._watcher.start()
+
+    def reload(self):
+        """Read every setting and fine policy again"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            version = self._read_version(cursor)
+            cursor.execute("SELECT setting_key, setting_value, setting_type FROM system_settings")
+            values = {key: self._convert(value, setting_type) for key, value, setting_type in cursor.fetchall()}
+            policies = FineEngine.read_policies(cursor)
+            conn.rollback()
+        self._values, self._policies, self._version = values, policies, version
+        if self.changes is not None:
+            self.changes.publish("system_settings", "update", None)
+
+    @staticmethod
+    def _convert(value, setting_type):
+        try:
+            if setting_type == "integer":
+                return int(value)
+            if setting_type == "decimal":
+                return Decimal(value)
+        except (TypeError, ValueError, ArithmeticError):
+            return None
+        if setting_type == "boolean":
+            return str(value).strip().lower() in ("1", "true", "yes", "on")
+        return value
+
+    def check_version(self):
+        """Reload if settings_version has moved on (SQLite); True if it had"""
+        if self._read_version() == self._version:
+            return False
+        self.reload()
+        return True
+
+    def _read_version(self, cursor=None):
+        if self.db.dialect == "postgresql":
+            return None
+        if cursor is None:
+            with self.db.connection() as conn:
+                return self._read_version(conn.cursor())
+        try:
+            cursor.execute("SELECT version FROM settings_version")
+        except sqlite3.OperationalError:
+            # Database created before settings_version: no change tracking
+            return None
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _poll(self):
+        while not self._stop.wait(self.VERSION_CHECK_SECONDS):
+            try:
+                self.check_version()
+            except PoolError:
+                # The database was closed
+                return
+            except sqlite3.Error:
+                continue
+
+    def _listen(self):
+        conn = self.db.dedicated_connection()
+        conn.autocommit = True
+        conn.cursor().execute(f"LISTEN {self.CHANNEL}")
+        return conn
+
+    def _watch(self, conn):
+        while not self._stop.is_set():
+            try:
+                if conn is None:
+                    conn = self._listen()
+                    self.reload()
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    self.reload()
+            except (psycopg2.Error, OSError):
+                # Lost the connection: reconnect, reloading in case a change was missed
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                self._stop.wait(self.RECONNECT_SECONDS)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=2)
+
+
+# ============================================================================
+# OFFLINE CATALOGUE SEARCH
+# ============================================================================
+
+def tokenize(text):
+    """Lower-case word tokens of a title/author/query string"""
+    return re.findall(r"\w+", str(text).lower())
+
+
+def trigrams(token):
+    """Character trigrams of a token, padded so short words still have some"""
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# A search term typed as an ISBN: digits and X, with optional hyphens/spaces
+ISBN_LIKE = re.compile(r"[0-9Xx][0-9Xx\- ]*")
+
+
+def normalize_isbn(isbn):
+    """The stored form of an ISBN: digits and X only"""
+    return re.sub(r"[^0-9X]", "", str(isbn or "").upper())
+
+
+class CatalogueIndex:
+    """In-memory search index over book rows for kiosk and offline mode
+
+    Title and author words go into an inverted index, ISBNs into a sorted
+    list for prefix lookups, and every indexed word into a trigram index that
+    finds near matches for misspelt words on either side ("Georgy Orwell",
+    "The Vinci Code"). Rows have the books table shape, ID first.
+
+    The index is guarded by a lock so it can be built and queried on worker
+    threads while the Tk thread applies add/remove updates.
+    """
+
+    PREFIX_WEIGHT = 0.8
+    FUZZY_WEIGHT = 0.6
+    MIN_SIMILARITY = 0.5
+    MAX_PREFIX_EXPANSIONS = 50
+
+    def __init__(self, books=()):
+        self._lock = threading.RLock()
+        self._rows = {}
+        self._doc_tokens = {}
+        self._postings = {}
+        self._trigrams = {}
+        self._gram_counts = {}
+        for book in books:
+            self._index(book)
+        self._vocabulary = sorted(self._postings)
+        self._isbns = sorted(
+            (normalize_isbn(row[3]), book_id) for book_id, row in self._rows.items() if row[3]
+        )
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, book):
+        """Index a new or changed book row"""
+        with self._lock:
+            self.remove(book[0])
+            for token in self._index(book):
+                bisect.insort(self._vocabulary, token)
+            if book[3]:
+                bisect.insort(self._isbns, (normalize_isbn(book[3]), book[0]))
+
+    def remove(self, book_id):
+        """Drop a book from the index"""
+        with self._lock:
+            row = self._rows.pop(book_id, None)
+            if row is None:
+                return
+            for token in self._doc_tokens.pop(book_id):
+                postings = self._postings[token]
+                postings.discard(book_id)
+                if not postings:
+                    self._forget_token(token)
+            if row[3]:
+                entry = (normalize_isbn(row[3]), book_id)
+                position = bisect.bisect_left(self._isbns, entry)
+                if position < len(self._isbns) and self._isbns[position] == entry:
+                    del self._isbns[position]
+
+    def search(self, query):
+        """Return matching rows, best first
+
+        A book must match at least half of the query words; exact words
+        score highest, then prefixes (the word being typed), then near
+        matches weighted by trigram similarity. ISBN prefixes rank first.
+        """
+        tokens = tokenize(query)
+        isbn = normalize_isbn(query)
+
+        with self._lock:
+            scores = {}
+            for token in tokens:
+                best = {}
+                for candidate, weight in self._match_token(token).items():
+                    for book_id in self._postings[candidate]:
+                        if weight > best.get(book_id, 0.0):
+                            best[book_id] = weight
+                for book_id, weight in best.items():
+                    matched, score = scores.get(book_id, (0, 0.0))
+                    scores[book_id] = (matched + 1, score + weight)
+
+            needed = (len(tokens) + 1) // 2
+            results = {book_id: rank for book_id, rank in scores.items() if rank[0] >= needed}
+
+            if len(isbn) >= 3:
+                position = bisect.bisect_left(self._isbns, (isbn,))
+                while position < len(self._isbns) and self._isbns[position][0].startswith(isbn):
+                    results[self._isbns[position][1]] = (len(tokens) + 1, 0.0)
+                    position += 1
+
+            order = sorted(results, key=lambda book_id: (-results[book_id][0], -results[book_id][1], book_id))
+            return [self._rows[book_id] for book_id in order]
+
+    def _index(self, book):
+        """Add a row's words to the postings; return the words new to the vocabulary"""
+        book_id = book[0]
+        tokens = set(tokenize(book[1])) | set(tokenize(book[2]))
+        self._rows[book_id] = book
+        self._doc_tokens[book_id] = tokens
+
+        new_tokens = []
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                grams = trigrams(token)
+                self._gram_counts[token] = len(grams)
+                for gram in grams:
+                    self._trigrams.setdefault(gram, set()).add(token)
+                new_tokens.append(token)
+            postings.add(book_id)
+        return new_tokens
+
+    def _forget_token(self, token):
+        del self._postings[token]
+        del self._gram_counts[token]
+        for gram in trigrams(token):
+            candidates = self._trigrams.get(gram)
+            if candidates is not None:
+                candidates.discard(token)
+                if not candidates:
+                    del self._trigrams[gram]
+        position = bisect.bisect_left(self._vocabulary, token)
+        if position < len(self._vocabulary) and self._vocabulary[position] == token:
+            del self._vocabulary[position]
+
+    def _match_token(self, token):
+        """Map vocabulary words matching a query word to their weight"""
+        weights = {}
+        if token in self._postings:
+            weights[token] = 1.0
+
+        position = bisect.bisect_left(self._vocabulary, token)
+        for candidate in self._vocabulary[position:position + self.MAX_PREFIX_EXPANSIONS]:
+            if not candidate.startswith(token):
+                break
+            weights.setdefault(candidate, self.PREFIX_WEIGHT)
+
+        if len(token) >= 3:
+            grams = trigrams(token)
+            shared = {}
+            for gram in grams:
+                for candidate in self._trigrams.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            for candidate, common in shared.items():
+                similarity = 2.0 * common / (len(grams) + self._gram_counts[candidate])
+                if similarity >= self.MIN_SIMILARITY:
+                    weight = self.FUZZY_WEIGHT * similarity
+                    if weight > weights.get(candidate, 0.0):
+                        weights[candidate] = weight
+        return weights
+
+
+# ============================================================================
+# VIRTUAL TABLE WIDGET
+# ============================================================================
+
+def show_loading_indicator(parent):
+    """Place a busy indicator in the middle of parent"""
+    indicator = tk.Frame(parent, relief=tk.RIDGE, borderwidth=1, padx=15, pady=10)
+    tk.Label(indicator, text="Loading...", font=("Helvetica", 11)).pack()
+    progress = ttk.Progressbar(indicator, mode="indeterminate", length=150)
+    progress.pack(pady=(5, 0))
+    progress.start(10)
+    indicator.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+    return indicator
+
+
+class PagedSource:
+    """A result set the VirtualTable pages through
+
+    ``count()`` returns the number of rows and ``fetch(after, offset, limit)``
+    returns up to ``limit`` rows ordered by ``key(row)``, starting after the
+    key ``after`` and skipping ``offset`` further rows. ``ordered`` marks a
+    source holding every row of its table in ascending ID order, where a
+    new or deleted ID's position follows from the key alone.
+    """
+
+    def __init__(self, count, fetch, key=lambda row: row[0], ordered=False):
+        self.count = count
+        self.fetch = fetch
+        self.key = key
+        self.ordered = ordered
+
+
+def list_source(rows, key=lambda row: row[0]):
+    """PagedSource over rows that are already in memory"""
+    positions = {key(row): index for index, row in enumerate(rows)}
+
+    def fetch(after, offset, limit):
+        start = (0 if after is None else positions[after] + 1) + offset
+        return rows[start:start + limit]
+
+    return PagedSource(lambda: len(rows), fetch, key)
+
+
+class VirtualTable(tk.Frame):
+    """Treeview that only materializes the rows currently on screen
+
+    The table keeps one Treeview item per visible line and rewrites their
+    values while scrolling. Rows are fetched a page at a time on the
+    DataFetcher: a page whose predecessor has been seen continues from that
+    page's last key, so sequential scrolling is pure keyset pagination and
+    only jumps with the scrollbar fall back to an OFFSET from the nearest
+    known key. Fetched pages are kept in a small LRU cache.
+    """
+
+    PAGE_SIZE = 100
+    CACHED_PAGES = 50
+
+    def __init__(self, parent, columns, fetcher, channel="content", source=None,
+                 row_tags=None, height=15, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.fetcher = fetcher
+        self.channel = channel
+        self.row_tags = row_tags or (lambda row: ())
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height,
+                                 selectmode="browse")
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=100)
+
+        self.v_scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        h_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=h_scrollbar.set)
+
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.v_scrollbar.grid(row=0, column=1, sticky="ns")
+        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", lambda e: self._render())
+        self.tree.bind("<MouseWheel>", lambda e: self._scroll_by(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(3))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_by(-self._visible_count()))
+        self.tree.bind("<Next>", lambda e: self._scroll_by(self._visible_count()))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+        self._visible_rows = height
+        self._items = []
+        self._shown = []
+        self._render_job = None
+        self._indicator = None
+        self.source = None
+        if source is not None:
+            self.set_source(source)
+
+    def column(self, col, **options):
+        self.tree.column(col, **options)
+
+    def tag_configure(self, tag, **options):
+        self.tree.tag_configure(tag, **options)
+
+    def set_source(self, source):
+        """Show a new result set from the top"""
+        self.source = source
+        self.top = 0
+        self.selected_key = None
+        self.refresh()
+
+    def set_row_tags(self, row_tags):
+        self.row_tags = row_tags
+        self._render()
+
+    def refresh(self):
+        """Drop cached rows and reload the current window"""
+        self._version = getattr(self, "_version", 0) + 1
+        self._pages = OrderedDict()
+        self._anchors = {0: None}
+        self._requested = set()
+        self.total = None
+        self._count()
+        self._render()
+
+    def apply_change(self, action, key, row=None):
+        """Patch the table for a change to the row whose ID (first column) is key
+
+        An update with the new row rewrites the cached copy in place; without
+        it the cached page holding the row is fetched again. In an ordered
+        source an insert or delete only drops the cached pages from the
+        row's position on, so just the pages on screen are re-read; in any
+        other source it reloads the result set.
+        """
+        if self.source is None:
+            return
+        if action == "update":
+            for page_no, page in self._pages.items():
+                for index, cached in enumerate(page):
+                    if cached[0] != key:
+                        continue
+                    if row is None:
+                        del self._pages[page_no]
+                        self._render()
+                    else:
+                        # Keep trailing columns the source adds, like search scores
+                        page[index] = tuple(row) + tuple(cached[len(row):])
+                        self._schedule_render()
+                    return
+            return
+        if not self.source.ordered:
+            self.refresh()
+            return
+
+        first = min(
+            (page_no for page_no, page in self._pages.items()
+             if len(page) < self.PAGE_SIZE or self.source.key(page[-1]) >= key),
+            default=max(self._pages, default=-1) + 1
+        )
+        # Responses in flight may predate the change
+        self._version += 1
+        self._requested = set()
+        for page_no in [page_no for page_no in self._pages if page_no >= first]:
+            del self._pages[page_no]
+        self._anchors = {page_no: anchor for page_no, anchor in self._anchors.items() if page_no <= first}
+        if self.total is None:
+            self._count()
+        else:
+            self.total = max(0, self.total + (1 if action == "insert" else -1))
+        self._render()
+
+    def destroy(self):
+        # Results still in flight belong to a dead table
+        self._version = getattr(self, "_version", 0) + 1
+        if self._render_job is not None:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+        super().destroy()
+
+    def selected_row(self):
+        """Return the data row of the selected line, or None"""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self._items:
+            return None
+        index = self._items.index(selection[0])
+        return self._shown[index] if index < len(self._shown) else None
+
+    def row_count(self):
+        return self.total if self.total is not None else self._known_rows()
+
+    # -- paging ---------------------------------------------------------------
+
+    def _count(self):
+        version = self._version
+
+        def counted(total):
+            if version == self._version:
+                self.total = total
+                self._schedule_render()
+
+        self.fetcher.submit(self.channel, self.source.count, counted)
+
+    def _known_rows(self):
+        if not self._pages:
+            return 0
+        last = max(self._pages)
+        return last * self.PAGE_SIZE + len(self._pages[last])
+
+    def _row(self, index):
+        page = self._pages.get(index // self.PAGE_SIZE)
+        if page is None:
+            return None
+        self._pages.move_to_end(index // self.PAGE_SIZE)
+        offset = index % self.PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def _request_page(self, page_no):
+        if page_no in self._pages or page_no in self._requested:
+            return
+        self._requested.add(page_no)
+
+        anchor_page = max(p for p in self._anchors if p <= page_no)
+        after = self._anchors[anchor_page]
+        offset = (page_no - anchor_page) * self.PAGE_SIZE
+        version = self._version
+
+        def loaded(rows):
+            if version != self._version:
+                return
+            self._requested.discard(page_no)
+            self._pages[page_no] = rows
+            if len(rows) == self.PAGE_SIZE:
+                self._anchors[page_no + 1] = self.source.key(rows[-1])
+            elif self.total is None or self.total > page_no * self.PAGE_SIZE + len(rows):
+                self.total = page_no * self.PAGE_SIZE + len(rows)
+            while len(self._pages) > self.CACHED_PAGES:
+                self._pages.popitem(last=False)
+            self._schedule_render()
+
+        def failed(error):
+            self._requested.discard(page_no)
+            messagebox.showerror("Database Error", f"Could not load rows:\n{error}")
+
+        self.fetcher.submit(self.channel, self.source.fetch, loaded, failed,
+                            after, offset, self.PAGE_SIZE)
+
+    # -- rendering ------------------------------------------------------------
+
+    def _visible_count(self):
+        if self._items and self.tree.winfo_ismapped():
+            bbox = self.tree.bbox(self._items[0])
+            if bbox:
+                heading, row_height = bbox[1], bbox[3]
+                return max(1, (self.tree.winfo_height() - heading) // row_height)
+        return self._visible_rows
+
+    def _schedule_render(self):
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+
+    def _render(self):
+        self._render_job = None
+        if self.source is None or not self.winfo_exists():
+            return
+
+        # Remember the selected row before the lines are rewritten
+        self._on_select()
+        self._visible_rows = self._visible_count()
+        total = self.row_count()
+        if self.total is not None:
+            self.top = max(0, min(self.top, total - self._visible_rows))
+
+        end = self.top + self._visible_rows
+        if self.total is not None:
+            end = min(end, self.total)
+        for page_no in range(self.top // self.PAGE_SIZE, max(self.top, end - 1) // self.PAGE_SIZE + 1):
+            self._request_page(page_no)
+
+        rows = []
+        for index in range(self.top, end):
+            row = self._row(index)
+            if row is None and self.total is not None and index >= self.total:
+                break
+            rows.append(row)
+        while rows and rows[-1] is None and self.total is None:
+            rows.pop()
+
+        while len(self._items) < len(rows):
+            self._items.append(self.tree.insert("", tk.END))
+        while len(self._items) > len(rows):
+            self.tree.delete(self._items.pop())
+
+        self._shown = rows
+        selected_item = None
+        for item, row in zip(self._items, rows):
+            if row is None:
+                self.tree.item(item, values=(), tags=())
+            else:
+                values = ["" if value is None else value for value in row]
+                self.tree.item(item, values=values, tags=self.row_tags(row))
+                if self.selected_key is not None and self.source.key(row) == self.selected_key:
+                    selected_item = item
+
+        if selected_item is not None:
+            self.tree.selection_set(selected_item)
+        elif self.tree.selection():
+            self.tree.selection_remove(*self.tree.selection())
+
+        loading = None in rows or (not rows and self.total is None)
+        if loading and self._indicator is None:
+            self._indicator = show_loading_indicator(self)
+        elif not loading and self._indicator is not None:
+            self._indicator.destroy()
+            self._indicator = None
+
+        if total:
+            self.v_scrollbar.set(self.top / total, min(1.0, (self.top + len(rows)) / total))
+        else:
+            self.v_scrollbar.set(0.0, 1.0)
+
+    def _row_key(self, item):
+        index = self._items.index(item)
+        row = self._shown[index] if index < len(self._shown) else None
+        return None if row is None else self.source.key(row)
+
+    # -- scrolling ------------------------------------------------------------
+
+    def _scroll_to(self, top):
+        total = self.row_count()
+        limit = max(0, total - self._visible_rows) if self.total is not None else top
+        top = max(0, min(int(top), limit))
+        if top != self.top:
+            self.top = top
+            self._render()
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self.top + rows)
+        return "break"
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self._scroll_to(float(args[0]) * self.row_count())
+        elif action == "scroll":
+            step = int(args[0])
+            if args[1] == "pages":
+                step *= self._visible_rows
+            self._scroll_by(step)
+
+    def _move_selection(self, step):
+        selection = self.tree.selection()
+        index = self._items.index(selection[0]) if selection and selection[0] in self._items else -1
+        target = index + step
+        if 0 <= target < len(self._items):
+            self.tree.selection_set(self._items[target])
+            self.tree.see(self._items[target])
+        else:
+            row = self._row(self.top + target) if index >= 0 and self.top + target >= 0 else None
+            self._scroll_by(step)
+            if row is not None:
+                self.tree.selection_remove(*self.tree.selection())
+                self.selected_key = self.source.key(row)
+                self._render()
+        return "break"
+
+    def _on_select(self, event=None):
+        selection = self.tree.selection()
+        if selection and selection[0] in self._items:
+            key = self._row_key(selection[0])
+            if key is not None:
+                self.selected_key = key
+
+
+class TreeLoader:
+    """Fills a plain Treeview in time-sliced chunks
+
+    ``load(rows)`` replaces the tree's contents with rows, diffed by
+    ``key(row)`` (the ID column by default): rows already shown are updated
+    in place only when their values or tags changed, rows that disappeared
+    are deleted and new ones inserted, so reloading a mostly unchanged data
+    set touches only the differences. Values and tags are computed for the
+    whole data set up front; the Treeview calls then run in chunks scheduled
+    with ``after``, each stopping after SLICE_MS so the event loop keeps
+    handling input while large data sets stream in. A newer load cancels
+    the unfinished one.
+    """
+
+    SLICE_MS = 15
+    CHECK_EVERY = 50
+
+    def __init__(self, tree, key=lambda row: row[0], values=None, row_tags=None, on_done=None):
+        self.tree = tree
+        self.key = key
+        self.values = values or (lambda row: row)
+        self.row_tags = row_tags or (lambda row: ())
+        self.on_done = on_done
+        self.rows = {}
+        self._order = []
+        self._shown = {}
+        self._job = None
+        self._work = None
+
+    def load(self, rows):
+        """Show rows, in order, replacing the current contents"""
+        self.cancel()
+        prepared = []
+        for row in rows:
+            values = tuple("" if value is None else value for value in self.values(row))
+            prepared.append((self.key(row), row, values, tuple(self.row_tags(row))))
+        self._work = self._apply(prepared)
+        self._job = self.tree.after_idle(self._step, self._work)
+
+    def cancel(self):
+        """Stop an unfinished load, leaving the rows applied so far"""
+        if self._job is not None:
+            self.tree.after_cancel(self._job)
+            self._job = None
+        if self._work is not None:
+            self._work = None
+            keys = {item: key for key, (item, _) in self._shown.items()}
+            self._order = [keys[item] for item in self.tree.get_children() if item in keys]
+
+    def item(self, key):
+        """Treeview item id of the row with key, or None"""
+        return self._shown.get(key, (None,))[0]
+
+    def selected_rows(self):
+        keys = {item: key for key, (item, _) in self._shown.items()}
+        return [self.rows[keys[item]] for item in self.tree.selection() if item in keys]
+
+    def _apply(self, prepared):
+        """Generator making the Treeview calls for one load"""
+        wanted = {key for key, _, _, _ in prepared}
+        removed = [key for key in self._order if key not in wanted]
+        for start in range(0, len(removed), 500):
+            chunk = removed[start:start + 500]
+            self.tree.delete(*(self._shown.pop(key)[0] for key in chunk))
+            for key in chunk:
+                del self.rows[key]
+            yield
+
+        # Survivors keep their relative order; walk them alongside the new
+        # order and only move the ones that are out of place
+        survivors = [key for key in self._order if key in wanted]
+        placed = set()
+        cursor = 0
+        for index, (key, row, values, tags) in enumerate(prepared):
+            self.rows[key] = row
+            while cursor < len(survivors) and survivors[cursor] in placed:
+                cursor += 1
+            shown = self._shown.get(key)
+            if shown is None:
+                item = self.tree.insert("", index, values=values, tags=tags)
+                self._shown[key] = (item, (values, tags))
+            else:
+                item, current = shown
+                if current != (values, tags):
+                    self.tree.item(item, values=values, tags=tags)
+                    self._shown[key] = (item, (values, tags))
+                if cursor < len(survivors) and survivors[cursor] == key:
+                    cursor += 1
+                else:
+                    self.tree.move(item, "", index)
+            placed.add(key)
+            yield
+        self._order = [key for key, _, _, _ in prepared]
+
+    def _step(self, work):
+        self._job = None
+        try:
+            if not self.tree.winfo_exists():
+                return
+            deadline = time.perf_counter() + self.SLICE_MS / 1000
+            while True:
+                for _ in range(self.CHECK_EVERY):
+                    next(work)
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration:
+            self._work = None
+            if self.on_done:
+                self.on_done()
+            return
+        except tk.TclError:
+            # The tree was destroyed mid-load
+            return
+        self._job = self.tree.after(1, self._step, work)
+
+
+class ReportView(tk.Frame):
+    """Pages through a ReportResult without loading it into the Text widget
+
+    Only the PAGE_LINES lines of the current page are ever in the widget;
+    they are sliced from the result's memory-mapped file when the page
+    changes. Find scans the mapping from the line after the last match,
+    wrapping once, and turns to the page of the match.
+    """
+
+    PAGE_LINES = 500
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.result = None
+        self.page = 0
+        self._match = None
+
+        nav = tk.Frame(self)
+        nav.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(nav, text="<<", width=3, command=lambda: self.go_to(0)).pack(side=tk.LEFT)
+        ttk.Button(nav, text="<", width=3, command=lambda: self.go_to(self.page - 1)).pack(side=tk.LEFT)
+        tk.Label(nav, text="Page").pack(side=tk.LEFT, padx=(10, 5))
+        self.page_var = tk.StringVar(value="1")
+        page_entry = ttk.Entry(nav, textvariable=self.page_var, width=6)
+        page_entry.pack(side=tk.LEFT)
+        page_entry.bind("<Return>", lambda e: self.jump())
+        self.pages_label = tk.Label(nav, text="of 1")
+        self.pages_label.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Button(nav, text=">", width=3, command=lambda: self.go_to(self.page + 1)).pack(side=tk.LEFT)
+        ttk.Button(nav, text=">>", width=3, command=lambda: self.go_to(self.pages - 1)).pack(side=tk.LEFT)
+
+        self.find_var = tk.StringVar()
+        ttk.Button(nav, text="Find Next", command=self.find_next).pack(side=tk.RIGHT)
+        find_entry = ttk.Entry(nav, textvariable=self.find_var, width=24)
+        find_entry.pack(side=tk.RIGHT, padx=5)
+        find_entry.bind("<Return>", lambda e: self.find_next())
+        tk.Label(nav, text="Find:").pack(side=tk.RIGHT)
+        self.status_var = tk.StringVar()
+        tk.Label(nav, textvariable=self.status_var, fg="gray").pack(side=tk.RIGHT, padx=20)
+
+        self.text = scrolledtext.ScrolledText(self, width=80, height=20, font=("Courier", 10), wrap=tk.NONE)
+        h_scrollbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
+        self.text.configure(xscrollcommand=h_scrollbar.set)
+        self.text.pack(fill=tk.BOTH, expand=True)
+        h_scrollbar.pack(fill=tk.X)
+        self.text.tag_configure("match", background="yellow")
+        self.text.config(state=tk.DISABLED)
+
+        self.bind("<Destroy>", lambda e: self._release() if e.widget is self else None, add="+")
 
     @property
-    def rowcount(self):
-        return self._rowcount
+    def pages(self):
+        if self.result is None:
+            return 1
+        return max(1, -(-self.result.line_count // self.PAGE_LINES))
+
+    def _release(self):
+        if self.result is not None:
+            self.result.release()
+            self.result = None
+
+    def _set_text(self, text):
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, text)
+        self.text.config(state=tk.DISABLED)
+
+    def show_message(self, text):
+        """Show plain text instead of a report"""
+        self._release()
+        self.page = 0
+        self.page_var.set("1")
+        self.pages_label.config(text="of 1")
+        self.status_var.set("")
+        self._set_text(text)
+
+    def show(self, result):
+        """Show a report from its first page"""
+        result.acquire()
+        self._release()
+        self.result = result
+        self._match = None
+        elapsed = f" in {result.elapsed * 1000:,.0f} ms" if result.elapsed is not None else ""
+        self.status_var.set(f"{result.row_count:,} rows{elapsed}")
+        self.page = -1
+        self.go_to(0)
+
+    def go_to(self, page, line=None):
+        """Show a page, optionally highlighting text on one of its lines"""
+        if self.result is None:
+            return
+        page = max(0, min(page, self.pages - 1))
+        if page != self.page:
+            self.page = page
+            start = page * self.PAGE_LINES
+            self._set_text(self.result.lines(start, start + self.PAGE_LINES))
+            self.page_var.set(str(page + 1))
+            self.pages_label.config(text=f"of {self.pages:,}")
+        self.text.tag_remove("match", "1.0", tk.END)
+        if line is None:
+            self.text.yview_moveto(0)
+            return
+        row = line - page * self.PAGE_LINES + 1
+        term = self.find_var.get().strip()
+        column = self.text.search(term, f"{row}.0", f"{row}.end", nocase=True)
+        start = column or f"{row}.0"
+        end = f"{start}+{len(term)}c" if column else f"{row}.end"
+        self.text.tag_add("match", start, end)
+        self.text.see(start)
+
+    def jump(self):
+        """Go to the page typed into the page box"""
+        try:
+            page = int(self.page_var.get()) - 1
+        except ValueError:
+            page = self.page
+        self.go_to(page)
+        self.page_var.set(str(self.page + 1))
+
+    def find_next(self):
+        """Find the next line containing the search text"""
+        term = self.find_var.get().strip()
+        if self.result is None or not term:
+            return
+        start = self._match + 1 if self._match is not None else self.page * self.PAGE_LINES
+        line = self.result.find(term, start)
+        if line is None and start:
+            line = self.result.find(term, 0)
+        if line is None:
+            self._match = None
+            self.status_var.set(f"'{term}' not found")
+            return
+        self._match = line
+        self.status_var.set(f"Line {line + 1:,} of {self.result.line_count:,}")
+        self.go_to(line // self.PAGE_LINES, line)
+
+
+class TypeAheadPicker(tk.Frame):
+    """Entry that looks up matches as the user types and lists them below
+
+    The lookup runs on the DataFetcher DEBOUNCE_MS after the last keystroke,
+    on the picker's own channel so a newer term drops the older result.
+    Results go into an LRU shared by the pickers of one kind, keyed by
+    (channel, term), so retyping a recent term needs no query; an empty
+    entry lists the most recent picks. Up/Down move through the list and
+    Return or a click picks a row.
+    """
+
+    DEBOUNCE_MS = 150
+    LIMIT = 10
+    CACHE_SIZE = 128
+    CACHE_TTL = 60
+
+    def __init__(self, parent, fetcher, channel, lookup, describe, cache, on_pick=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.fetcher = fetcher
+        self.channel = channel
+        self.lookup = lookup
+        self.describe = describe
+        self.cache = cache
+        self.on_pick = on_pick
+        self.selected = None
+        self._rows = []
+        self._job = None
+
+        self.var = tk.StringVar()
+        self.entry = ttk.Entry(self, textvariable=self.var)
+        self.entry.pack(fill=tk.X)
+        self.listbox = tk.Listbox(self, height=6, activestyle="dotbox", exportselection=False)
+        self.status = tk.Label(self, fg="gray", anchor=tk.W)
+        self.status.pack(fill=tk.X)
+
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<FocusIn>", lambda e: self._show_recent() if not self.var.get().strip() else None)
+        self.entry.bind("<Down>", lambda e: self._move(1))
+        self.entry.bind("<Up>", lambda e: self._move(-1))
+        self.entry.bind("<Return>", lambda e: self.pick())
+        self.entry.bind("<Escape>", lambda e: self._hide())
+        self.listbox.bind("<ButtonRelease-1>", lambda e: self.pick())
+
+    def _on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        self.selected = None
+        if self._job is not None:
+            self.after_cancel(self._job)
+        self._job = self.after(self.DEBOUNCE_MS, self._lookup)
+
+    def _lookup(self):
+        self._job = None
+        term = " ".join(self.var.get().split())
+        if not term:
+            self._show_recent()
+            return
+        cache_key = (self.channel, term.lower())
+        cached = self.cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < self.CACHE_TTL:
+            self.cache.move_to_end(cache_key)
+            self._show(cached[1])
+            return
+
+        def found(rows):
+            self._remember(cache_key, rows)
+            if " ".join(self.var.get().split()) == term:
+                self._show(rows)
+
+        self.fetcher.cancel(self.channel)
+        self.status.config(text="Searching...")
+        self.fetcher.submit(self.channel, self.lookup, found, lambda error: self.status.config(text=str(error)),
+                            term, self.LIMIT)
+
+    def _remember(self, cache_key, rows):
+        self.cache[cache_key] = (time.monotonic(), rows)
+        self.cache.move_to_end(cache_key)
+        while len(self.cache) > self.CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    def _show_recent(self):
+        recent = self.cache.get((self.channel, ""))
+        if recent:
+            self._show(recent[1], "Recent")
+
+    def _show(self, rows, label=None):
+        self._rows = list(rows)
+        self.listbox.delete(0, tk.END)
+        for row in self._rows:
+            self.listbox.insert(tk.END, self.describe(row))
+        if self._rows:
+            self.listbox.selection_set(0)
+            self.listbox.pack(fill=tk.X, before=self.status)
+            self.status.config(text=label or f"{len(self._rows)} match{'es' if len(self._rows) != 1 else ''}")
+        else:
+            self.listbox.pack_forget()
+            self.status.config(text="No matches")
+
+    def _hide(self):
+        self.listbox.pack_forget()
+
+    def _move(self, step):
+        if not self._rows:
+            return "break"
+        current = self.listbox.curselection()
+        index = max(0, min(len(self._rows) - 1, (current[0] + step) if current else 0))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        return "break"
+
+    def pick(self):
+        """Pick the highlighted row"""
+        current = self.listbox.curselection()
+        if self._rows and self.listbox.winfo_ismapped():
+            self.pick_row(self._rows[current[0] if current else 0])
+
+    def pick_row(self, row):
+        self.selected = row
+        self.var.set(self.describe(row))
+        self.entry.icursor(tk.END)
+        self._hide()
+        self.status.config(text="")
+
+        # Most recent picks first, shown when the entry is empty
+        recent = [row] + [other for other in self.cache.get((self.channel, ""), (0, []))[1]
+                          if other[0] != row[0]]
+        self._remember((self.channel, ""), recent[:self.LIMIT])
+        if self.on_pick:
+            self.on_pick(row)
+
+
+class CirculationQueue:
+    """Feeds desk scans to LibraryRepository.circulate in batches
+
+    A scan arriving while no batch is in flight is sent on its own at once;
+    scans arriving while one is in flight wait and go together in the next
+    batch (group commit), so the batch size follows the scan rate and a
+    busy desk costs one transaction per round trip, not one per scan.
+    A batch stops before an item already in it, so a checkout and a
+    check-in of the same copy are never applied together. on_result is
+    called on the Tk thread with (ticket, ok, message, detail) for every
+    scan, ticket being what add returned.
+    """
+
+    BATCH_SIZE = 50
+
+    def __init__(self, fetcher, circulate, on_result, channel="circulation"):
+        self.fetcher = fetcher
+        self.circulate = circulate
+        self.on_result = on_result
+        self.channel = channel
+        self._pending = deque()
+        self._in_flight = None
+        self._tickets = itertools.count(1)
+
+    def add(self, kind, member, item=None):
+        """Queue a scan and return its ticket"""
+        ticket = next(self._tickets)
+        self._pending.append((ticket, (kind, member, item)))
+        if self._in_flight is None:
+            self._send()
+        return ticket
+
+    @property
+    def pending(self):
+        return len(self._pending) + len(self._in_flight or ())
+
+    def _send(self):
+        batch, items = [], set()
+        while self._pending and len(batch) < self.BATCH_SIZE:
+            item = self._pending[0][1][2]
+            if item is not None and normalize_isbn(item) in items:
+                break
+            if item is not None:
+                items.add(normalize_isbn(item))
+            batch.append(self._pending.popleft())
+        if not batch:
+            return
+        self._in_flight = batch
+        self.fetcher.submit(self.channel, self.circulate, self._done, self._failed,
+                            [scan for _, scan in batch])
+
+    def _done(self, results):
+        batch, self._in_flight = self._in_flight, None
+        try:
+            for (ticket, _), (ok, message, detail) in zip(batch, results):
+                self.on_result(ticket, ok, message, detail)
+        finally:
+            self._send()
+
+    def _failed(self, error):
+        batch, self._in_flight = self._in_flight, None
+        try:
+            for ticket, _ in batch:
+                self.on_result(ticket, False, f"Not saved: {error}", None)
+        finally:
+            self._send()
 
 
-# Use mock database for demonstration
-DatabaseConnection = MockDatabase
+# ============================================================================
+# SCREEN CACHE
+# ============================================================================
+
+class ViewManager:
+    """Keeps built screens alive and switches between them
+
+    Each screen lives in its own frame inside parent; switching hides the
+    current one with pack_forget and packs the target, then runs the
+    target's refresh callback to reload its data. At most ``capacity``
+    screens are kept; the least recently shown one is destroyed when the
+    cap is exceeded. ``on_evict(name)`` runs before a screen's frame is
+    destroyed, so the work it still has in flight can be cancelled.
+    """
+
+    def __init__(self, parent, capacity=4, on_evict=None):
+        self.parent = parent
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.current = None
+        self._frames = OrderedDict()
+        self._refresh = {}
+
+    def show(self, name):
+        """Show the cached screen name; False if it has to be built first"""
+        frame = self._frames.get(name)
+        if frame is None or not frame.winfo_exists():
+            self._frames.pop(name, None)
+            return False
+        self._switch(name, frame)
+        refresh = self._refresh.get(name)
+        if refresh is not None:
+            refresh()
+        return True
+
+    def create(self, name):
+        """Return a new frame for screen name, shown in place of the current one"""
+        self.discard(name)
+        frame = tk.Frame(self.parent)
+        self._frames[name] = frame
+        self._switch(name, frame)
+
+        while len(self._frames) > self.capacity:
+            evicted, old = self._frames.popitem(last=False)
+            self._refresh.pop(evicted, None)
+            self._destroy(evicted, old)
+        return frame
+
+    def set_refresh(self, name, refresh):
+        """Callback reloading the data of screen name when it is shown again"""
+        self._refresh[name] = refresh
+
+    def discard(self, name):
+        """Destroy screen name so the next visit rebuilds it"""
+        frame = self._frames.pop(name, None)
+        self._refresh.pop(name, None)
+        if frame is not None:
+            self._destroy(name, frame)
+        if self.current == name:
+            self.current = None
+
+    def clear(self):
+        """Destroy every screen (logout)"""
+        for name in list(self._frames):
+            self.discard(name)
+
+    def _destroy(self, name, frame):
+        if self.on_evict is not None:
+            self.on_evict(name)
+        frame.destroy()
+
+    def _switch(self, name, frame):
+        if self.current != name and self.current in self._frames:
+            self._frames[self.current].pack_forget()
+        self._frames.move_to_end(name)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.current = name
 
 
 # ============================================================================
@@ -202,6 +3505,19 @@ DatabaseConnection = MockDatabase
 # ============================================================================
 
 class SmartLibraryApp:
+    # Search-as-you-type waits this long after the last keystroke; result sets
+    # up to SEARCH_NARROW_LIMIT rows are kept so longer queries can narrow them
+    SEARCH_DEBOUNCE_MS = 200
+    SEARCH_NARROW_LIMIT = 1000
+
+    # Screens kept alive between visits (least recently used are destroyed)
+    MAX_CACHED_SCREENS = 4
+
+    # Seconds before a loaded Loans tab is reloaded when shown again
+    LOAN_TAB_TTL = 30
+
+    BOOK_GENRES = ["Fiction", "Non-Fiction", "Science", "Technology", "Biography", "History", "Mystery", "Self-Help"]
+
     def __init__(self, root):
         self.root = root
         self.root.title("SmartLibrary Management System")
@@ -220,6 +3536,30 @@ class SmartLibraryApp:
         self.current_user = None
         self.user_role = None
 
+        # Data access through the shared connection pool, off the Tk thread
+        self.repo = LibraryRepository(get_database())
+        self.fetcher = DataFetcher(self.root, changes=self.repo.changes)
+        self.repo.changes.subscribe("books", self.on_book_changed)
+        self.reports = ReportEngine(self.repo, self.fetcher)
+
+        # Settings are loaded once, off the Tk thread, and kept current
+        self.settings = self.repo.settings
+        self.fetcher.submit("settings", self.settings.get, lambda value: None, None, "library_name")
+
+        # Recent member/book lookups of the type-ahead pickers
+        self.lookup_cache = OrderedDict()
+
+        # Local catalogue index for kiosk/offline search, built after login
+        self.use_local_search = SEARCH_MODE == "local" or (
+            SEARCH_MODE == "auto" and self.repo.db.dialect == "sqlite"
+        )
+        self.catalogue_index = None
+
+        # Live book search state
+        self.search_job = None
+        self.search_cancel = None
+        self.book_search_results = None
+
         # Setup main application
         self.setup_main_window()
 
@@ -392,6 +3732,16 @@ class SmartLibraryApp:
         # Show dashboard by default
         self.show_dashboard()
 
+        if self.use_local_search and self.catalogue_index is None:
+            self.load_catalogue_index()
+
+    def load_catalogue_index(self):
+        """Build the offline search index from a snapshot of the catalogue"""
+        def loaded(index):
+            self.catalogue_index = index
+
+        self.fetcher.submit("catalogue", lambda: CatalogueIndex(self.repo.iter_books()), loaded)
+
     def create_header(self):
         """Create application header"""
         if HAS_TTKBOOTSTRAP:
@@ -499,6 +3849,26 @@ class SmartLibraryApp:
             )
         loans_btn.pack(side=tk.LEFT, padx=10)
 
+        # Circulation desk button (only for admin/librarian)
+        if self.user_role in ['admin', 'librarian']:
+            if HAS_TTKBOOTSTRAP:
+                circulation_btn = tb.Button(
+                    nav_frame,
+                    text="Circulation",
+                    command=self.show_circulation,
+                    bootstyle="link"
+                )
+            else:
+                circulation_btn = tk.Button(
+                    nav_frame,
+                    text="Circulation",
+                    command=self.show_circulation,
+                    bg="blue",
+                    fg="white",
+                    relief=tk.FLAT
+                )
+            circulation_btn.pack(side=tk.LEFT, padx=10)
+
         # Fines button
         if HAS_TTKBOOTSTRAP:
             fines_btn = tb.Button(
@@ -581,6 +3951,10 @@ class SmartLibraryApp:
             self.content_frame = tk.Frame(self.main_container)
         self.content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
 
+        # Screens are built once and kept hidden while another one is shown
+        self.views = ViewManager(self.content_frame, capacity=self.MAX_CACHED_SCREENS,
+                                 on_evict=self.screen_evicted)
+
     def create_footer(self):
         """Create application footer"""
         if HAS_TTKBOOTSTRAP:
@@ -630,29 +4004,54 @@ class SmartLibraryApp:
 
     def clear_main_container(self):
         """Clear all widgets from main container"""
+        if getattr(self, "views", None) is not None:
+            self.views.clear()
         for widget in self.main_container.winfo_children():
             widget.destroy()
 
-    def clear_content_frame(self):
-        """Clear content frame"""
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+    def open_screen(self, name):
+        """Switch to screen name
+
+        A cached screen is shown again and its data refreshed; the result is
+        None. Otherwise a new, empty frame is returned for the screen to be
+        built into.
+        """
+        if self.views.show(name):
+            return None
+        return self.views.create(name)
+
+    @staticmethod
+    def screen_channel(name):
+        """Fetcher channel of the loads made by screen name"""
+        return f"screen:{name}"
+
+    def screen_evicted(self, name):
+        """Drop the loads of a screen that is being destroyed
+
+        Writes ("writes", "circulation") are left to finish: their results
+        must be committed whether or not the screen is still there.
+        """
+        self.fetcher.cancel(self.screen_channel(name))
+        if name == "books":
+            self.cancel_book_search()
 
     def show_dashboard(self):
         """Show dashboard with statistics"""
-        self.clear_content_frame()
+        screen = self.open_screen("dashboard")
+        if screen is None:
+            return
 
         # Dashboard title
         if HAS_TTKBOOTSTRAP:
             title_label = tb.Label(
-                self.content_frame,
+                screen,
                 text="Dashboard",
                 font=("Helvetica", 24, "bold"),
                 bootstyle=PRIMARY
             )
         else:
             title_label = tk.Label(
-                self.content_frame,
+                screen,
                 text="Dashboard",
                 font=("Helvetica", 24, "bold"),
                 fg="blue"
@@ -660,20 +4059,21 @@ class SmartLibraryApp:
         title_label.pack(anchor=tk.W, pady=(0, 20))
 
         # Statistics cards
-        stats_frame = tk.Frame(self.content_frame)
+        stats_frame = tk.Frame(screen)
         stats_frame.pack(fill=tk.X, pady=(0, 30))
 
-        # Statistics data
+        # Statistics data, filled in from library_stats once loaded
         stats_data = [
-            ("Total Books", "20", "books", PRIMARY),
-            ("Available Books", "20", "books", SUCCESS),
-            ("Active Loans", "10", "loans", INFO),
-            ("Overdue Loans", "10", "loans", WARNING),
-            ("Active Members", "12", "members", SECONDARY),
-            ("Pending Fines", "18", "fines", DANGER)
+            ("Total Books", "total_books", "books", PRIMARY),
+            ("Available Books", "available_books", "books", SUCCESS),
+            ("Active Loans", "active_loans", "loans", INFO),
+            ("Overdue Loans", "overdue_loans", "loans", WARNING),
+            ("Active Members", "active_members", "members", SECONDARY),
+            ("Pending Fines", "pending_fines", "fines", DANGER)
         ]
+        value_labels = {}
 
-        for i, (title, value, unit, style) in enumerate(stats_data):
+        for i, (title, stat_key, unit, style) in enumerate(stats_data):
             if HAS_TTKBOOTSTRAP:
                 card_frame = tb.Frame(stats_frame, bootstyle="light", padding=20)
             else:
@@ -695,23 +4095,34 @@ class SmartLibraryApp:
             }
             color = colors.get(style, "black")
 
-            value_label = tk.Label(card_frame, text=value, font=("Helvetica", 28, "bold"), fg=color)
+            value_label = tk.Label(card_frame, text="…", font=("Helvetica", 28, "bold"), fg=color)
             value_label.pack(anchor=tk.W, pady=(5, 0))
+            value_labels[stat_key] = value_label
 
             unit_label = tk.Label(card_frame, text=unit, font=("Helvetica", 10), fg="gray")
             unit_label.pack(anchor=tk.W)
 
+        def show_stats(stats):
+            for stat_key, label in value_labels.items():
+                if label.winfo_exists():
+                    label.config(text=str(stats.get(stat_key, 0)))
+
+        def load_stats():
+            self.fetcher.submit(self.screen_channel("dashboard"), self.repo.dashboard_stats, show_stats)
+
+        load_stats()
+
         # Quick actions frame
         if HAS_TTKBOOTSTRAP:
             actions_frame = tb.LabelFrame(
-                self.content_frame,
+                screen,
                 text="Quick Actions",
                 padding=20,
                 bootstyle=INFO
             )
         else:
             actions_frame = tk.LabelFrame(
-                self.content_frame,
+                screen,
                 text="Quick Actions",
                 padx=20,
                 pady=20,
@@ -760,14 +4171,14 @@ class SmartLibraryApp:
         # Recent activity table
         if HAS_TTKBOOTSTRAP:
             activity_frame = tb.LabelFrame(
-                self.content_frame,
+                screen,
                 text="Recent Activity",
                 padding=20,
                 bootstyle=SECONDARY
             )
         else:
             activity_frame = tk.LabelFrame(
-                self.content_frame,
+                screen,
                 text="Recent Activity",
                 padx=20,
                 pady=20,
@@ -798,29 +4209,27 @@ class SmartLibraryApp:
         tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
-        # Add sample activity data
-        sample_activity = [
-            ("2025-12-05 10:30", "admin", "Added Book", "The Great Gatsby - F. Scott Fitzgerald"),
-            ("2025-12-05 09:15", "librarian", "Issued Loan", "Member #1001 borrowed '1984'"),
-            ("2025-12-05 08:45", "system", "Daily Maintenance", "Updated 42 overdue loans"),
-            ("2024-12-04 16:20", "member", "Returned Book", "To Kill a Mockingbird"),
-            ("2025-12-04 14:10", "admin", "Updated Member", "Updated membership for John Doe")
-            ("2027-12-05 10:30", "admin", "Added Book", "The Greatest Gatsby - F. Scott Fitzgerald"),
-            ("2029-12-05 09:15", "librarian", "Issued Loan", "Member #1001 borrowed '1984'"),
-            ("2020-12-05 08:45", "system", "Daily Maintenance", "Updated 42 overdue loans"),
-            ("2011-12-04 16:20", "member", "Returned Book", "To Kill a Mockingbird"),
-            ("2026-12-04 14:10", "admin", "Updated Member", "Updated membership for John Doe"),
-        ]
+        # Recent activity, diffed by log_id on every visit to the dashboard
+        activity = TreeLoader(tree, values=lambda entry: entry[1:])
+
+        def load_activity():
+            self.fetcher.submit(self.screen_channel("dashboard"), self.repo.recent_activity, activity.load)
 
-        for activity in sample_activity:
-            tree.insert("", tk.END, values=activity)
+        def refresh():
+            load_stats()
+            load_activity()
+
+        load_activity()
+        self.views.set_refresh("dashboard", refresh)
 
     def show_books(self):
         """Show books management interface"""
-        self.clear_content_frame()
+        screen = self.open_screen("books")
+        if screen is None:
+            return
 
         # Title and search bar
-        title_frame = tk.Frame(self.content_frame)
+        title_frame = tk.Frame(screen)
         title_frame.pack(fill=tk.X, pady=(0, 20))
 
         if HAS_TTKBOOTSTRAP:
@@ -860,6 +4269,7 @@ class SmartLibraryApp:
             search_entry.insert(0, "Search books...")
         search_entry.pack(side=tk.LEFT, padx=(0, 10))
         search_entry.bind('<Return>', lambda e: self.search_books())
+        self.book_search_var.trace_add("write", self.schedule_book_search)
 
         if HAS_TTKBOOTSTRAP:
             search_btn = tb.Button(
@@ -897,8 +4307,23 @@ class SmartLibraryApp:
                 )
             add_btn.pack(side=tk.LEFT, padx=(20, 0))
 
+            if HAS_TTKBOOTSTRAP:
+                import_btn = tb.Button(
+                    search_frame,
+                    text="Import CSV...",
+                    command=self.import_books,
+                    bootstyle="outline-success"
+                )
+            else:
+                import_btn = tk.Button(
+                    search_frame,
+                    text="Import CSV...",
+                    command=self.import_books
+                )
+            import_btn.pack(side=tk.LEFT, padx=(10, 0))
+
         # Filter frame
-        filter_frame = tk.Frame(self.content_frame)
+        filter_frame = tk.Frame(screen)
         filter_frame.pack(fill=tk.X, pady=(0, 20))
 
         tk.Label(filter_frame, text="Filter by:").pack(side=tk.LEFT, padx=(0, 10))
@@ -917,7 +4342,7 @@ class SmartLibraryApp:
         genre_combo = ttk.Combobox(
             filter_frame,
             textvariable=self.filter_genre_var,
-            values=["all", "fiction", "non-fiction", "science", "technology"],
+            values=["all"] + self.BOOK_GENRES,
             state="readonly",
             width=15
         )
@@ -938,37 +4363,22 @@ class SmartLibraryApp:
             )
         filter_btn.pack(side=tk.LEFT)
 
-        # Books table
-        table_frame = tk.Frame(self.content_frame)
-        table_frame.pack(fill=tk.BOTH, expand=True)
-
-        # Create treeview
+        # Books table (only the visible rows are materialized)
         columns = ("ID", "Title", "Author", "ISBN", "Available", "Total", "Status", "Genre")
-        self.books_tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
-
-        # Configure columns
-        for col in columns:
-            self.books_tree.heading(col, text=col)
-            self.books_tree.column(col, width=100)
+        self.books_table = VirtualTable(screen, columns, self.fetcher, channel=self.screen_channel("books"),
+                                        row_tags=self.book_row_tags)
+        self.books_table.pack(fill=tk.BOTH, expand=True)
 
-        self.books_tree.column("Title", width=200)
-        self.books_tree.column("Author", width=150)
+        self.books_table.column("Title", width=200)
+        self.books_table.column("Author", width=150)
 
-        # Add scrollbars
-        v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.books_tree.yview)
-        h_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=self.books_tree.xview)
-        self.books_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-        # Grid layout
-        self.books_tree.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
-
-        table_frame.grid_rowconfigure(0, weight=1)
-        table_frame.grid_columnconfigure(0, weight=1)
+        # Configure tag colors
+        self.books_table.tag_configure('success', foreground='green')
+        self.books_table.tag_configure('warning', foreground='orange')
+        self.views.set_refresh("books", self.books_table.refresh)
 
         # Action buttons frame
-        action_frame = tk.Frame(self.content_frame)
+        action_frame = tk.Frame(screen)
         action_frame.pack(fill=tk.X, pady=(20, 0))
 
         if self.user_role in ['admin', 'librarian']:
@@ -1026,62 +4436,124 @@ class SmartLibraryApp:
 
     def load_books(self):
         """Load books from database"""
-        # Clear existing items
-        for item in self.books_tree.get_children():
-            self.books_tree.delete(item)
-
-        # Load sample data
-        for book in DatabaseConnection.SAMPLE_BOOKS:
-            tags = ('success',) if book[4] > 0 else ('warning',)
-            self.books_tree.insert("", tk.END, values=book, tags=tags)
+        self.book_search_results = None
+        filters = self.book_filter()
+        self.books_table.set_source(PagedSource(
+            partial(self.repo.count_books, filters),
+            partial(self.repo.page_books, filters=filters),
+            ordered=not filters
+        ))
+
+    def book_filter(self):
+        """BookFilter for the status and genre combo boxes"""
+        return BookFilter().status(self.filter_status_var.get()).category(self.filter_genre_var.get())
+
+    def books_table_visible(self):
+        return hasattr(self, "books_table") and bool(self.books_table.winfo_exists())
+
+    def on_book_changed(self, action, book_id, book):
+        """Patch the search index, cached results and books table for one book"""
+        self.book_search_results = None
+        if self.catalogue_index is not None:
+            if action == "delete":
+                self.catalogue_index.remove(book_id)
+            elif book is not None:
+                self.catalogue_index.add(book)
+
+        if not self.books_table_visible():
+            return
+        if action != "update" and self.book_search_var.get().strip():
+            # Whether the book matches is up to the search
+            self.search_books()
+        else:
+            self.books_table.apply_change(action, book_id, book)
 
-        # Configure tag colors
-        self.books_tree.tag_configure('success', foreground='green')
-        self.books_tree.tag_configure('warning', foreground='orange')
+    @staticmethod
+    def book_row_tags(book):
+        return ('success',) if book[4] > 0 else ('warning',)
+
+    def schedule_book_search(self, *args):
+        """Debounce keystrokes in the books search box"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(self.SEARCH_DEBOUNCE_MS, self.search_books)
+
+    def cancel_book_search(self):
+        """Drop the pending search and interrupt the one in flight"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+            self.search_job = None
+        if self.search_cancel is not None:
+            self.search_cancel.cancel()
+            self.search_cancel = None
+        self.fetcher.cancel("search")
 
     def search_books(self):
         """Search books based on search term"""
-        search_term = self.book_search_var.get().lower()
-        if not search_term or search_term == "search books...":
+        self.cancel_book_search()
+        if not self.books_table_visible():
+            return
+
+        search_term = self.book_search_var.get().strip()
+        if not search_term or search_term.lower() == "search books...":
             self.load_books()
             return
 
-        # Filter displayed books
-        for item in self.books_tree.get_children():
-            values = self.books_tree.item(item)['values']
-            # Search in title, author, and ISBN
-            if (search_term in str(values[1]).lower() or
-                    search_term in str(values[2]).lower() or
-                    search_term in str(values[3]).lower()):
-                self.books_tree.item(item, tags=())
+        filters = self.book_filter()
+        previous = self.book_search_results
+        if previous is not None and previous[0] != filters.key():
+            previous = None
+        # Only database results are kept for narrowing: the index matches differently
+        from_database = self.catalogue_index is None or bool(filters)
+        if not from_database:
+            # Kiosk/offline mode answers from the local index once it is built
+            fetch = partial(self.catalogue_index.search, search_term)
+        else:
+            self.search_cancel = QueryCancel()
+            fetch = partial(self.fetch_search_results, search_term, filters, self.search_cancel, previous)
+
+        def loaded(rows):
+            self.search_cancel = None
+            if not self.books_table_visible():
+                return
+            if not from_database or rows is None or len(rows) > self.SEARCH_NARROW_LIMIT:
+                self.book_search_results = None
             else:
-                self.books_tree.item(item, tags=('hidden',))
+                self.book_search_results = (filters.key(), search_term, rows)
+
+            if rows is not None:
+                self.books_table.set_source(list_source(rows))
+                return
 
-        self.books_tree.tag_configure('hidden', foreground='gray')
+            # Ranked search on title, author and ISBN runs in the database;
+            # results are paged by (score, book_id)
+            self.books_table.set_source(PagedSource(
+                partial(self.repo.count_search_books, search_term, filters),
+                partial(self.repo.search_books, search_term, filters=filters),
+                key=lambda book: (book[8], book[0])
+            ))
+
+        self.fetcher.submit("search", fetch, loaded)
+
+    def fetch_search_results(self, term, filters, cancel, previous=None):
+        """Every match for term, or None when there are too many to keep in memory
+
+        When term extends the previous search, its kept rows are narrowed in
+        memory with the database's own match rule instead of re-querying.
+        """
+        if previous is not None:
+            rows = self.repo.narrow_search_books(previous[2], previous[1], term)
+            if rows is not None:
+                return rows
+        rows = self.repo.search_books(
+            term, limit=self.SEARCH_NARROW_LIMIT + 1, cancel=cancel, filters=filters
+        )
+        return rows if len(rows) <= self.SEARCH_NARROW_LIMIT else None
 
     def filter_books(self):
         """Filter books based on criteria"""
-        status = self.filter_status_var.get()
-        genre = self.filter_genre_var.get()
-
-        for item in self.books_tree.get_children():
-            values = self.books_tree.item(item)['values']
-            show = True
-
-            # Filter by status
-            if status != "all":
-                if status == "available" and values[6] != "Available":
-                    show = False
-                elif status == "borrowed" and values[6] != "Borrowed":
-                    show = False
-
-            # Filter by genre (simplified)
-            if show and genre != "all" and genre.lower() not in str(values[7]).lower():
-                show = False
-
-            self.books_tree.item(item, tags=() if show else ('hidden',))
-
-        self.books_tree.tag_configure('hidden', foreground='gray')
+        # Filters are part of the query, so re-run the current search or listing
+        self.search_books()
 
     def show_members(self):
         """Show members management interface"""
@@ -1089,10 +4561,12 @@ class SmartLibraryApp:
             messagebox.showerror("Access Denied", "Only administrators and librarians can access this section.")
             return
 
-        self.clear_content_frame()
+        screen = self.open_screen("members")
+        if screen is None:
+            return
 
         # Title and add button
-        title_frame = tk.Frame(self.content_frame)
+        title_frame = tk.Frame(screen)
         title_frame.pack(fill=tk.X, pady=(0, 20))
 
         if HAS_TTKBOOTSTRAP:
@@ -1128,58 +4602,45 @@ class SmartLibraryApp:
             )
         add_btn.pack(side=tk.RIGHT)
 
-        # Members table
-        table_frame = tk.Frame(self.content_frame)
-        table_frame.pack(fill=tk.BOTH, expand=True)
-
-        # Create treeview
+        # Members table (only the visible rows are materialized)
         columns = ("ID", "Name", "Membership #", "Email", "Phone", "Type", "Active Loans", "Status")
-        tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=15)
-
-        # Configure columns
-        for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=100)
-
-        tree.column("Name", width=150)
-        tree.column("Email", width=200)
-
-        # Add scrollbars
-        v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
-        h_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=tree.xview)
-        tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-        # Grid layout
-        tree.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        table = VirtualTable(
+            screen,
+            columns,
+            self.fetcher,
+            channel=self.screen_channel("members"),
+            row_tags=lambda member: ('success',) if member[7] == "Active" else ('warning',)
+        )
+        table.pack(fill=tk.BOTH, expand=True)
 
-        table_frame.grid_rowconfigure(0, weight=1)
-        table_frame.grid_columnconfigure(0, weight=1)
+        table.column("Name", width=150)
+        table.column("Email", width=200)
 
-        # Load sample members data
-        for member in DatabaseConnection.SAMPLE_MEMBERS:
-            tags = ('success',) if member[7] == "Active" else ('warning',)
-            tree.insert("", tk.END, values=member, tags=tags)
+        table.tag_configure('success', foreground='green')
+        table.tag_configure('warning', foreground='orange')
 
-        tree.tag_configure('success', foreground='green')
-        tree.tag_configure('warning', foreground='orange')
+        # Load members data; member changes patch single rows
+        table.set_source(PagedSource(self.repo.count_members, self.repo.page_members, ordered=True))
+        self.repo.changes.subscribe("members", table.apply_change, owner=table)
+        self.views.set_refresh("members", table.refresh)
 
     def show_loans(self):
         """Show loans management interface"""
-        self.clear_content_frame()
+        screen = self.open_screen("loans")
+        if screen is None:
+            return
 
         # Title
         if HAS_TTKBOOTSTRAP:
             title_label = tb.Label(
-                self.content_frame,
+                screen,
                 text="Loans Management",
                 font=("Helvetica", 24, "bold"),
                 bootstyle=PRIMARY
             )
         else:
             title_label = tk.Label(
-                self.content_frame,
+                screen,
                 text="Loans Management",
                 font=("Helvetica", 24, "bold"),
                 fg="blue"
@@ -1187,27 +4648,46 @@ class SmartLibraryApp:
         title_label.pack(anchor=tk.W, pady=(0, 20))
 
         # Tabs for different loan types
-        notebook = ttk.Notebook(self.content_frame)
+        notebook = ttk.Notebook(screen)
         notebook.pack(fill=tk.BOTH, expand=True)
 
-        # Active loans tab
-        active_frame = tk.Frame(notebook)
-        notebook.add(active_frame, text="Active Loans")
-        self.create_loans_table(active_frame, "active")
-
-        # Overdue loans tab
-        overdue_frame = tk.Frame(notebook)
-        notebook.add(overdue_frame, text="Overdue Loans")
-        self.create_loans_table(overdue_frame, "overdue")
-
-        # Returned loans tab
-        returned_frame = tk.Frame(notebook)
-        notebook.add(returned_frame, text="Returned Loans")
-        self.create_loans_table(returned_frame, "returned")
+        # Active, overdue and returned loans tabs; each table is built and
+        # loaded the first time its tab is selected
+        tab_types = {}
+        for loan_type, text in (("active", "Active Loans"), ("overdue", "Overdue Loans"),
+                                ("returned", "Returned Loans")):
+            tab_frame = tk.Frame(notebook)
+            notebook.add(tab_frame, text=text)
+            tab_types[str(tab_frame)] = (loan_type, tab_frame)
+
+        loaded = {}
+
+        def show_tab(event=None):
+            """Build the selected tab, or reload it when older than LOAN_TAB_TTL"""
+            loan_type, tab_frame = tab_types[str(notebook.select())]
+            now = time.monotonic()
+            if loan_type not in loaded:
+                loaded[loan_type] = [self.create_loans_table(tab_frame, loan_type), now]
+            elif now - loaded[loan_type][1] > self.LOAN_TAB_TTL:
+                loaded[loan_type][0].refresh()
+                loaded[loan_type][1] = now
+
+        def loans_changed(action, borrow_id, row):
+            # Checkouts and check-ins move loans between tabs: reload the
+            # selected tab now and the others when they are next selected
+            for entry in loaded.values():
+                entry[1] = float("-inf")
+            if notebook.winfo_ismapped():
+                show_tab()
+
+        notebook.bind("<<NotebookTabChanged>>", show_tab)
+        show_tab()
+        self.repo.changes.subscribe("borrowed_books", loans_changed, owner=notebook)
+        self.views.set_refresh("loans", show_tab)
 
         # Issue new loan button
         if self.user_role in ['admin', 'librarian']:
-            issue_frame = tk.Frame(self.content_frame)
+            issue_frame = tk.Frame(screen)
             issue_frame.pack(fill=tk.X, pady=(20, 0))
 
             if HAS_TTKBOOTSTRAP:
@@ -1231,76 +4711,204 @@ class SmartLibraryApp:
 
     def create_loans_table(self, parent, loan_type):
         """Create loans table for specific type"""
-        table_frame = tk.Frame(parent)
-        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        tags = ()
+        if loan_type == "overdue":
+            tags = ('danger',)
+        elif loan_type == "active":
+            tags = ('success',)
 
-        # Create treeview
         columns = ("Loan ID", "Book Title", "Member", "Loan Date", "Due Date", "Status", "Fine")
-        tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=10)
-
-        # Configure columns
-        for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=100)
-
-        tree.column("Book Title", width=200)
-        tree.column("Member", width=150)
+        table = VirtualTable(parent, columns, self.fetcher, channel=self.screen_channel("loans"),
+                             row_tags=lambda loan: tags, height=10)
+        table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        table.column("Book Title", width=200)
+        table.column("Member", width=150)
+
+        table.tag_configure('danger', foreground='red')
+        table.tag_configure('success', foreground='green')
+
+        # Load loans data
+        table.set_source(PagedSource(
+            partial(self.repo.count_loans, loan_type),
+            partial(self.repo.page_loans, loan_type),
+            self.repo.history_key if loan_type == "returned" else (lambda loan: loan[0])
+        ))
+        return table
+
+    CIRCULATION_FEED_ROWS = 200
+    MEMBER_BARCODE = re.compile(r"MEM\d+", re.IGNORECASE)
+
+    def show_circulation(self):
+        """Show the circulation desk: continuous barcode scanning for checkouts and check-ins
+
+        A member card (membership number) selects the patron; item barcodes
+        (ISBNs) are then checked out to them or checked in, depending on the
+        mode. Every scan is listed at once as queued and updated when its
+        batch is committed.
+        """
+        screen = self.open_screen("circulation")
+        if screen is None:
+            return
 
-        # Add scrollbars
-        v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
-        h_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=tree.xview)
-        tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        if HAS_TTKBOOTSTRAP:
+            title_label = tb.Label(
+                screen,
+                text="Circulation Desk",
+                font=("Helvetica", 24, "bold"),
+                bootstyle=PRIMARY
+            )
+        else:
+            title_label = tk.Label(
+                screen,
+                text="Circulation Desk",
+                font=("Helvetica", 24, "bold"),
+                fg="blue"
+            )
+        title_label.pack(anchor=tk.W, pady=(0, 20))
 
-        # Grid layout
-        tree.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
+        # Mode and current patron
+        top_frame = tk.Frame(screen)
+        top_frame.pack(fill=tk.X)
+        mode_var = tk.StringVar(value="checkout")
+        if HAS_TTKBOOTSTRAP:
+            tb.Radiobutton(top_frame, text="Check Out", variable=mode_var, value="checkout",
+                           bootstyle="toolbutton").pack(side=tk.LEFT, padx=(0, 5))
+            tb.Radiobutton(top_frame, text="Check In", variable=mode_var, value="checkin",
+                           bootstyle="toolbutton").pack(side=tk.LEFT)
+        else:
+            tk.Radiobutton(top_frame, text="Check Out", variable=mode_var, value="checkout",
+                           indicatoron=False, width=12).pack(side=tk.LEFT, padx=(0, 5))
+            tk.Radiobutton(top_frame, text="Check In", variable=mode_var, value="checkin",
+                           indicatoron=False, width=12).pack(side=tk.LEFT)
+        patron_label = tk.Label(top_frame, text="No patron - scan a member card", font=("Helvetica", 12, "bold"))
+        patron_label.pack(side=tk.LEFT, padx=30)
+
+        scan_var = tk.StringVar()
+        scan_entry = ttk.Entry(screen, textvariable=scan_var, font=("Helvetica", 18))
+        scan_entry.pack(fill=tk.X, pady=15)
+        scan_entry.focus_set()
+
+        counters = {"Checked out": 0, "Checked in": 0, "Errors": 0}
+        counter_label = tk.Label(screen, anchor=tk.W, font=("Helvetica", 10))
+        counter_label.pack(fill=tk.X)
+
+        columns = ("Time", "Action", "Barcode", "Result")
+        feed = ttk.Treeview(screen, columns=columns, show="headings", height=18)
+        for column, width in zip(columns, (80, 100, 160, 500)):
+            feed.heading(column, text=column)
+            feed.column(column, width=width, stretch=column == "Result")
+        feed.tag_configure("queued", foreground="gray")
+        feed.tag_configure("ok", foreground="green")
+        feed.tag_configure("error", foreground="red")
+        feed.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+
+        patron = {"code": None}
+        rows = {}
+
+        def update_counters():
+            counter_label.config(text="    ".join(f"{name}: {count}" for name, count in counters.items())
+                                 + f"    Pending: {circulation.pending}")
+
+        def add_row(action, barcode, result, tag):
+            row = feed.insert("", 0, values=(datetime.now().strftime("%H:%M:%S"), action, barcode, result),
+                              tags=(tag,))
+            children = feed.get_children()
+            if len(children) > self.CIRCULATION_FEED_ROWS:
+                feed.delete(*children[self.CIRCULATION_FEED_ROWS:])
+            return row
+
+        def finished(ticket, ok, message, detail):
+            # The queue outlives the screen: scans already made are still
+            # committed after an eviction, there is just nothing to update
+            action, row = rows.pop(ticket)
+            if not feed.winfo_exists():
+                return
+            if action == "Member":
+                if ok:
+                    patron_label.config(text=f"Patron: {message}", fg="green")
+                else:
+                    patron["code"] = None
+                    patron_label.config(text=message, fg="red")
+            elif ok:
+                counters["Checked out" if action == "Check Out" else "Checked in"] += 1
+            if not ok:
+                counters["Errors"] += 1
+                self.root.bell()
+            if feed.exists(row):
+                feed.item(row, values=feed.item(row, "values")[:3] + (message,), tags=("ok" if ok else "error",))
+            update_counters()
+
+        circulation = CirculationQueue(self.fetcher, self.repo.circulate, finished)
+
+        def scan(event=None):
+            barcode = scan_var.get().strip()
+            scan_var.set("")
+            if not barcode:
+                return
+            if self.MEMBER_BARCODE.fullmatch(barcode):
+                patron["code"] = barcode.upper()
+                patron_label.config(text=f"Patron: {patron['code']}...", fg="gray")
+                action, ticket = "Member", circulation.add("member", patron["code"])
+            elif mode_var.get() == "checkout" and patron["code"] is None:
+                self.root.bell()
+                counters["Errors"] += 1
+                add_row("Check Out", barcode, "Scan a member card first", "error")
+                update_counters()
+                return
+            elif mode_var.get() == "checkout":
+                action, ticket = "Check Out", circulation.add("checkout", patron["code"], barcode)
+            else:
+                action, ticket = "Check In", circulation.add("checkin", None, barcode)
+            rows[ticket] = (action, add_row(action, barcode, "Queued", "queued"))
+            update_counters()
 
-        table_frame.grid_rowconfigure(0, weight=1)
-        table_frame.grid_columnconfigure(0, weight=1)
-
-        # Load sample data
-        sample_data = {
-            "active": DatabaseConnection.SAMPLE_ACTIVE_LOANS,
-            "overdue": DatabaseConnection.SAMPLE_OVERDUE_LOANS,
-            "returned": [
-                (301, "Sapiens", "Charlie Wilson", "2025-10-10", "2025-10-24", "Returned", "$0.00"),
-                (302, "Atomic Habits", "Diana Miller", "2025-10-15", "2025-10-29", "Returned", "$0.00"),
-                (301, "Mathematics", "Charlie Wilson", "2025-10-10", "2025-10-24", "Returned", "$0.00"),
-                (303, "Atomical", "Diana Miller", "2025-10-15", "2025-10-29", "Returned", "$0.00"),
-                (303, "Sapien", "Charlie Wilson", "2025-10-10", "2025-10-24", "Returned", "$0.00"),
-                (304, "Habits", "Diana Miller", "2025-10-15", "2025-10-29", "Returned", "$0.00"),
-                (306, "Sapians", "Charlie Wilson", "2025-10-10", "2025-10-24", "Returned", "$0.00"),
-                (300, "Database", "Diana Miller", "2025-10-15", "2025-10-29", "Returned", "$0.00"),
-            ]
-        }
+        def new_patron():
+            patron["code"] = None
+            patron_label.config(text="No patron - scan a member card", fg="black")
+            scan_entry.focus_set()
 
-        for loan in sample_data.get(loan_type, []):
-            tags = ()
-            if loan_type == "overdue":
-                tags = ('danger',)
-            elif loan_type == "active":
-                tags = ('success',)
-            tree.insert("", tk.END, values=loan, tags=tags)
+        scan_entry.bind("<Return>", scan)
+        mode_var.trace_add("write", lambda *args: scan_entry.focus_set())
 
-        tree.tag_configure('danger', foreground='red')
-        tree.tag_configure('success', foreground='green')
+        button_frame = tk.Frame(screen)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        if HAS_TTKBOOTSTRAP:
+            done_btn = tb.Button(
+                button_frame,
+                text="Next Patron",
+                command=new_patron,
+                bootstyle=SECONDARY,
+                width=15
+            )
+        else:
+            done_btn = tk.Button(
+                button_frame,
+                text="Next Patron",
+                command=new_patron,
+                width=15
+            )
+        done_btn.pack(side=tk.RIGHT)
+        update_counters()
+        self.views.set_refresh("circulation", scan_entry.focus_set)
 
     def show_fines(self):
         """Show fines management interface"""
-        self.clear_content_frame()
+        screen = self.open_screen("fines")
+        if screen is None:
+            return
 
         # Title
         if HAS_TTKBOOTSTRAP:
             title_label = tb.Label(
-                self.content_frame,
+                screen,
                 text="Fines Management",
                 font=("Helvetica", 24, "bold"),
                 bootstyle=PRIMARY
             )
         else:
             title_label = tk.Label(
-                self.content_frame,
+                screen,
                 text="Fines Management",
                 font=("Helvetica", 24, "bold"),
                 fg="blue"
@@ -1308,7 +4916,7 @@ class SmartLibraryApp:
         title_label.pack(anchor=tk.W, pady=(0, 20))
 
         # Statistics frame
-        stats_frame = tk.Frame(self.content_frame)
+        stats_frame = tk.Frame(screen)
         stats_frame.pack(fill=tk.X, pady=(0, 20))
 
         stats_data = [
@@ -1338,52 +4946,35 @@ class SmartLibraryApp:
 
             tk.Label(card, text=value, font=("Helvetica", 20, "bold"), fg=color).pack(anchor=tk.W, pady=(5, 0))
 
-        # Fines table
-        table_frame = tk.Frame(self.content_frame)
-        table_frame.pack(fill=tk.BOTH, expand=True)
+        # Fines table (only the visible rows are materialized)
+        def fine_tags(fine):
+            if fine[6] == "Pending":
+                return ('danger',)
+            elif fine[6] == "Paid":
+                return ('success',)
+            elif fine[6] == "Waived":
+                return ('warning',)
+            return ()
 
-        # Create treeview
         columns = ("Fine ID", "Member", "Book", "Amount", "Issued Date", "Due Date", "Status")
-        tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=12)
-
-        # Configure columns
-        for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=100)
+        table = VirtualTable(screen, columns, self.fetcher, channel=self.screen_channel("fines"),
+                             row_tags=fine_tags, height=12)
+        table.pack(fill=tk.BOTH, expand=True)
 
-        tree.column("Member", width=150)
-        tree.column("Book", width=150)
+        table.column("Member", width=150)
+        table.column("Book", width=150)
 
-        # Add scrollbars
-        v_scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
-        h_scrollbar = ttk.Scrollbar(table_frame, orient=tk.HORIZONTAL, command=tree.xview)
-        tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        table.tag_configure('danger', foreground='red')
+        table.tag_configure('success', foreground='green')
+        table.tag_configure('warning', foreground='orange')
 
-        # Grid layout
-        tree.grid(row=0, column=0, sticky="nsew")
-        v_scrollbar.grid(row=0, column=1, sticky="ns")
-        h_scrollbar.grid(row=1, column=0, sticky="ew")
-
-        table_frame.grid_rowconfigure(0, weight=1)
-        table_frame.grid_columnconfigure(0, weight=1)
-
-        # Load sample fines data
-        for fine in DatabaseConnection.SAMPLE_FINES:
-            tags = ()
-            if fine[6] == "Pending":
-                tags = ('danger',)
-            elif fine[6] == "Paid":
-                tags = ('success',)
-            elif fine[6] == "Waived":
-                tags = ('warning',)
-            tree.insert("", tk.END, values=fine, tags=tags)
-
-        tree.tag_configure('danger', foreground='red')
-        tree.tag_configure('success', foreground='green')
-        tree.tag_configure('warning', foreground='orange')
+        # Load fines data; fine changes patch single rows
+        table.set_source(PagedSource(self.repo.count_fines, self.repo.page_fines, ordered=True))
+        self.repo.changes.subscribe("fines", table.apply_change, owner=table)
+        self.views.set_refresh("fines", table.refresh)
 
         # Action buttons
-        action_frame = tk.Frame(self.content_frame)
+        action_frame = tk.Frame(screen)
         action_frame.pack(fill=tk.X, pady=(20, 0))
 
         if self.user_role in ['admin', 'librarian']:
@@ -1420,19 +5011,21 @@ class SmartLibraryApp:
 
     def show_reports(self):
         """Show reports interface"""
-        self.clear_content_frame()
+        screen = self.open_screen("reports")
+        if screen is None:
+            return
 
         # Title
         if HAS_TTKBOOTSTRAP:
             title_label = tb.Label(
-                self.content_frame,
+                screen,
                 text="Reports & Analytics",
                 font=("Helvetica", 24, "bold"),
                 bootstyle=PRIMARY
             )
         else:
             title_label = tk.Label(
-                self.content_frame,
+                screen,
                 text="Reports & Analytics",
                 font=("Helvetica", 24, "bold"),
                 fg="blue"
@@ -1442,14 +5035,14 @@ class SmartLibraryApp:
         # Report selection frame
         if HAS_TTKBOOTSTRAP:
             report_frame = tb.LabelFrame(
-                self.content_frame,
+                screen,
                 text="Generate Report",
                 padding=20,
                 bootstyle=INFO
             )
         else:
             report_frame = tk.LabelFrame(
-                self.content_frame,
+                screen,
                 text="Generate Report",
                 padx=20,
                 pady=20,
@@ -1462,18 +5055,11 @@ class SmartLibraryApp:
         tk.Label(report_frame, text="Report Type:", font=("Helvetica", 11)).grid(row=0, column=0, sticky=tk.W,
                                                                                  padx=(0, 10))
 
-        self.report_type_var = tk.StringVar(value="overdue")
+        self.report_type_var = tk.StringVar(value="Overdue Books Report")
         report_combo = ttk.Combobox(
             report_frame,
             textvariable=self.report_type_var,
-            values=[
-                "Overdue Books Report",
-                "Monthly Circulation",
-                "Member Activity",
-                "Popular Genres",
-                "Fine Collection",
-                "Book Inventory"
-            ],
+            values=list(REPORTS),
             state="readonly",
             width=25
         )
@@ -1483,7 +5069,7 @@ class SmartLibraryApp:
         tk.Label(report_frame, text="From:", font=("Helvetica", 11)).grid(row=0, column=2, sticky=tk.W, padx=(0, 10))
 
         if HAS_TKCALENDAR:
-            from_date = DateEntry(
+            self.report_from_date = DateEntry(
                 report_frame,
                 width=12,
                 background='darkblue',
@@ -1492,14 +5078,14 @@ class SmartLibraryApp:
                 date_pattern='yyyy-mm-dd'
             )
         else:
-            from_date = tk.Entry(report_frame, width=12)
-            from_date.insert(0, (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
-        from_date.grid(row=0, column=3, padx=(0, 20))
+            self.report_from_date = tk.Entry(report_frame, width=12)
+            self.report_from_date.insert(0, (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d'))
+        self.report_from_date.grid(row=0, column=3, padx=(0, 20))
 
         tk.Label(report_frame, text="To:", font=("Helvetica", 11)).grid(row=0, column=4, sticky=tk.W, padx=(0, 10))
 
         if HAS_TKCALENDAR:
-            to_date = DateEntry(
+            self.report_to_date = DateEntry(
                 report_frame,
                 width=12,
                 background='darkblue',
@@ -1508,9 +5094,9 @@ class SmartLibraryApp:
                 date_pattern='yyyy-mm-dd'
             )
         else:
-            to_date = tk.Entry(report_frame, width=12)
-            to_date.insert(0, datetime.now().strftime('%Y-%m-%d'))
-        to_date.grid(row=0, column=5, padx=(0, 20))
+            self.report_to_date = tk.Entry(report_frame, width=12)
+            self.report_to_date.insert(0, datetime.now().strftime('%Y-%m-%d'))
+        self.report_to_date.grid(row=0, column=5, padx=(0, 20))
 
         # Generate button
         if HAS_TTKBOOTSTRAP:
@@ -1531,77 +5117,16 @@ class SmartLibraryApp:
         generate_btn.grid(row=0, column=6, padx=(20, 0))
 
         # Report output area
-        output_frame = tk.Frame(self.content_frame)
+        output_frame = tk.Frame(screen)
         output_frame.pack(fill=tk.BOTH, expand=True)
 
-        # Text area for report
-        self.report_text = scrolledtext.ScrolledText(
-            output_frame,
-            width=80,
-            height=20,
-            font=("Courier", 10)
-        )
-        self.report_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-
-        # Add sample report
-        sample_report = """OVERDUE BOOKS REPORT
-Generated: 2025-12-05
-Period: 2025-11-01 to 2025-12-05
-==================================================
-
-Total Overdue Books: 42
-Total Fines Due: $245.50
-
-DETAILED LIST:
---------------------------------------------------
-1. Member: John Doe (MEM1001)
-   Book: To Kill a Mockingbird
-   Due Date: 2025-11-29
-   Days Overdue: 6
-   Fine: $3.00
-
-2. Member: Alice Brown (MEM1004)
-   Book: The Silent Patient
-   Due Date: 2025-12-04
-   Days Overdue: 1
-   Fine: $0.50
-   
-3. Member: Alice Brown (MEM1004)
-   Book: The Silent Patient
-   Due Date: 2025-12-04
-   Days Overdue: 1
-   Fine: $0.50
-
-3. Member: Bob Johnson (MEM1003)
-   Book: 1984
-   Due Date: 2025-11-25
-   Days Overdue: 10
-   Fine: $5.00
-
-4. Member: Alice Brown (MEM1004)
-   Book: The Silent Patient
-   Due Date: 2025-12-04
-   Days Overdue: 1
-   Fine: $0.50
-... (39 more records)
-
-5. Member: Alice Brown (MEM1004)
-   Book: The Silent Patient
-   Due Date: 2025-12-04
-   Days Overdue: 1
-   Fine: $0.50
-
-SUMMARY:
-- Most overdue book: 1984 (10 days)
-- Highest fine: $12.00
-- Member with most overdue books: Alice Brown (3 books)
-"""
-
-        self.report_text.insert(tk.END, sample_report)
-        self.report_text.config(state=tk.DISABLED)
+        # Paged view of the generated report
+        self.report_view = ReportView(output_frame)
+        self.report_view.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.report_view.show_message("Choose a report and a date range, then Generate Report.\n")
 
         # Export buttons
-        export_frame = tk.Frame(self.content_frame)
+        export_frame = tk.Frame(screen)
         export_frame.pack(fill=tk.X, pady=(10, 0))
 
         if HAS_TTKBOOTSTRAP:
@@ -1611,6 +5136,12 @@ SUMMARY:
                 command=lambda: self.export_report("csv"),
                 bootstyle="outline-primary"
             )
+            jsonl_btn = tb.Button(
+                export_frame,
+                text="Export as JSON Lines",
+                command=lambda: self.export_report("jsonl"),
+                bootstyle="outline-secondary"
+            )
             pdf_btn = tb.Button(
                 export_frame,
                 text="Export as PDF",
@@ -1629,6 +5160,11 @@ SUMMARY:
                 text="Export as CSV",
                 command=lambda: self.export_report("csv")
             )
+            jsonl_btn = tk.Button(
+                export_frame,
+                text="Export as JSON Lines",
+                command=lambda: self.export_report("jsonl")
+            )
             pdf_btn = tk.Button(
                 export_frame,
                 text="Export as PDF",
@@ -1640,6 +5176,7 @@ SUMMARY:
                 command=self.print_report
             )
         csv_btn.pack(side=tk.LEFT, padx=(0, 10))
+        jsonl_btn.pack(side=tk.LEFT, padx=(0, 10))
         pdf_btn.pack(side=tk.LEFT, padx=(0, 10))
         print_btn.pack(side=tk.LEFT)
 
@@ -1698,7 +5235,7 @@ SUMMARY:
             elif key == "genre":
                 entry = ttk.Combobox(
                     form_frame,
-                    values=["Fiction", "Non-Fiction", "Science", "Technology", "Biography", "History", "Mystery"]
+                    values=self.BOOK_GENRES
                 )
                 entry.pack(fill=tk.X, pady=(0, 10))
             else:
@@ -1719,6 +5256,9 @@ SUMMARY:
             if not entries["isbn"].get().strip():
                 messagebox.showerror("Error", "ISBN is required")
                 return
+            if not normalize_isbn(entries["isbn"].get()):
+                messagebox.showerror("Error", "ISBN must contain digits")
+                return
             if not entries["title"].get().strip():
                 messagebox.showerror("Error", "Title is required")
                 return
@@ -1728,11 +5268,35 @@ SUMMARY:
             if not entries["copies"].get().strip():
                 messagebox.showerror("Error", "Total copies is required")
                 return
+            try:
+                copies = int(entries["copies"].get().strip())
+                year = int(entries["year"].get().strip()) if entries["year"].get().strip() else None
+            except ValueError:
+                messagebox.showerror("Error", "Total copies and publication year must be numbers")
+                return
 
-            # Save to database (mock)
-            messagebox.showinfo("Success", "Book added successfully!")
-            dialog.destroy()
-            self.load_books()  # Refresh book list
+            def saved(book):
+                # The books table and search index pick the book up from its change event
+                messagebox.showinfo("Success", "Book added successfully!")
+                dialog.destroy()
+
+            # Save to database
+            self.fetcher.submit(
+                "writes",
+                partial(
+                    self.repo.add_book,
+                    entries["isbn"].get().strip(),
+                    entries["title"].get().strip(),
+                    entries["author"].get().strip(),
+                    category=entries["genre"].get().strip() or None,
+                    copies=copies,
+                    publisher=entries["publisher"].get().strip() or None,
+                    publication_year=year,
+                    location_code=entries["location"].get().strip() or None,
+                    description=entries["description"].get("1.0", tk.END).strip() or None
+                ),
+                saved
+            )
 
         if HAS_TTKBOOTSTRAP:
             save_btn = tb.Button(
@@ -1888,11 +5452,11 @@ SUMMARY:
         register_btn.pack(side=tk.LEFT, padx=(0, 10))
         cancel_btn.pack(side=tk.LEFT)
 
-    def issue_loan(self):
-        """Open dialog to issue a new loan"""
+    def issue_loan(self, book=None):
+        """Open dialog to issue a new loan, optionally for a given book row"""
         dialog = tk.Toplevel(self.root)
         dialog.title("Issue New Loan")
-        dialog.geometry("500x400")
+        dialog.geometry("500x560")
         dialog.transient(self.root)
         dialog.grab_set()
 
@@ -1918,44 +5482,63 @@ SUMMARY:
             )
         title_label.pack(anchor=tk.W, pady=(0, 20))
 
-        # Member selection
-        tk.Label(form_frame, text="Select Member:", font=("Helvetica", 10)).pack(anchor=tk.W, pady=(10, 5))
-        member_combo = ttk.Combobox(
-            form_frame,
-            values=["John Doe (MEM1001)", "Jane Smith (MEM1002)", "Bob Johnson (MEM1003)"],
-            state="readonly"
+        # Member selection: membership number, name or email
+        tk.Label(form_frame, text="Member (number, name or email):",
+                 font=("Helvetica", 10)).pack(anchor=tk.W, pady=(10, 5))
+        member_picker = TypeAheadPicker(
+            form_frame, self.fetcher, "lookup-members", self.repo.lookup_members,
+            lambda row: f"{row[1]} ({row[2]})" + ("" if row[4] == "Active" else f" - {row[4]}"),
+            self.lookup_cache
         )
-        member_combo.pack(fill=tk.X, pady=(0, 10))
-        member_combo.set("John Doe (MEM1001)")
-
-        # Book selection
-        tk.Label(form_frame, text="Select Book:", font=("Helvetica", 10)).pack(anchor=tk.W, pady=(10, 5))
-        book_combo = ttk.Combobox(
-            form_frame,
-            values=["The Great Gatsby (Available)", "Sapiens (Available)", "Atomic Habits (Available)"],
-            state="readonly"
+        member_picker.pack(fill=tk.X, pady=(0, 10))
+
+        # Book selection: ISBN or title, available copies only
+        tk.Label(form_frame, text="Book (ISBN or title):", font=("Helvetica", 10)).pack(anchor=tk.W, pady=(10, 5))
+        book_picker = TypeAheadPicker(
+            form_frame, self.fetcher, "lookup-books", self.repo.lookup_books,
+            lambda row: f"{row[1]} by {row[2]} ({row[3]}, {row[4]} available)",
+            self.lookup_cache
         )
-        book_combo.pack(fill=tk.X, pady=(0, 10))
-        book_combo.set("The Great Gatsby (Available)")
+        book_picker.pack(fill=tk.X, pady=(0, 10))
+        if book is not None:
+            book_picker.pick_row(tuple(book[:5]))
+        member_picker.entry.focus_set()
 
-        # Loan duration
+        # Loan duration: the usual periods up to the max_borrow_days setting
         tk.Label(form_frame, text="Loan Duration:", font=("Helvetica", 10)).pack(anchor=tk.W, pady=(10, 5))
         duration_frame = tk.Frame(form_frame)
         duration_frame.pack(fill=tk.X, pady=(0, 10))
 
-        duration_var = tk.StringVar(value="14")
-        tk.Radiobutton(duration_frame, text="7 days", variable=duration_var, value="7").pack(side=tk.LEFT, padx=(0, 20))
-        tk.Radiobutton(duration_frame, text="14 days", variable=duration_var, value="14").pack(side=tk.LEFT,
-                                                                                               padx=(0, 20))
-        tk.Radiobutton(duration_frame, text="21 days", variable=duration_var, value="21").pack(side=tk.LEFT)
+        max_days = self.settings["max_borrow_days"]
+        duration_var = tk.StringVar(value=str(max_days))
+        for days in sorted({days for days in (7, 14, 21) if days < max_days} | {max_days}):
+            tk.Radiobutton(duration_frame, text=f"{days} days", variable=duration_var,
+                           value=str(days)).pack(side=tk.LEFT, padx=(0, 20))
 
         def issue_loan_action():
-            due_date = datetime.now() + timedelta(days=int(duration_var.get()))
-            messagebox.showinfo(
-                "Loan Issued",
-                f"Loan issued successfully!\nDue Date: {due_date.strftime('%Y-%m-%d')}"
-            )
-            dialog.destroy()
+            member, book = member_picker.selected, book_picker.selected
+            if member is None or book is None:
+                messagebox.showerror("Error", "Please pick a member and a book from the lists", parent=dialog)
+                return
+            if member[4] != "Active":
+                messagebox.showerror("Error", f"{member[1]}'s membership is {member[4].lower()}", parent=dialog)
+                return
+            days = int(duration_var.get())
+
+            def issued(borrow_id):
+                due_date = date.today() + timedelta(days=days)
+                messagebox.showinfo(
+                    "Loan Issued",
+                    f"Loan #{borrow_id} issued successfully!\n{book[1]} to {member[1]}\n"
+                    f"Due Date: {due_date.strftime('%Y-%m-%d')}"
+                )
+                dialog.destroy()
+
+            def failed(error):
+                if dialog.winfo_exists():
+                    messagebox.showerror("Loan Not Issued", str(error), parent=dialog)
+
+            self.fetcher.submit("writes", self.repo.issue_loan, issued, failed, book[0], member[0], days)
 
         button_frame = tk.Frame(form_frame)
         button_frame.pack(fill=tk.X, pady=(20, 0))
@@ -1994,10 +5577,10 @@ SUMMARY:
         cancel_btn.pack(side=tk.LEFT)
 
     def return_book(self):
-        """Open dialog to return a book"""
+        """Open dialog to check in one or many loans (book drop)"""
         dialog = tk.Toplevel(self.root)
-        dialog.title("Return Book")
-        dialog.geometry("400x300")
+        dialog.title("Return Books")
+        dialog.geometry("460x560")
         dialog.transient(self.root)
         dialog.grab_set()
 
@@ -2010,26 +5593,25 @@ SUMMARY:
         if HAS_TTKBOOTSTRAP:
             title_label = tb.Label(
                 form_frame,
-                text="Return Book",
+                text="Return Books",
                 font=("Helvetica", 18, "bold"),
                 bootstyle=PRIMARY
             )
         else:
             title_label = tk.Label(
                 form_frame,
-                text="Return Book",
+                text="Return Books",
                 font=("Helvetica", 18, "bold"),
                 fg="blue"
             )
         title_label.pack(anchor=tk.W, pady=(0, 20))
 
-        # Loan ID input
-        tk.Label(form_frame, text="Enter Loan ID:", font=("Helvetica", 10)).pack(anchor=tk.W, pady=(10, 5))
-        if HAS_TTKBOOTSTRAP:
-            loan_id_entry = tb.Entry(form_frame, width=30)
-        else:
-            loan_id_entry = tk.Entry(form_frame, width=30)
-        loan_id_entry.pack(fill=tk.X, pady=(0, 10))
+        # Loan IDs: scanned or pasted, one per line
+        tk.Label(form_frame, text="Loan IDs (scan or paste, one per line):",
+                 font=("Helvetica", 10)).pack(anchor=tk.W, pady=(10, 5))
+        loan_ids_text = scrolledtext.ScrolledText(form_frame, height=12, width=30, font=("Courier", 11))
+        loan_ids_text.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        loan_ids_text.focus_set()
 
         # Condition
         tk.Label(form_frame, text="Book Condition:", font=("Helvetica", 10)).pack(anchor=tk.W, pady=(10, 5))
@@ -2041,29 +5623,41 @@ SUMMARY:
         condition_combo.pack(fill=tk.X, pady=(0, 10))
         condition_combo.set("Good")
 
+        status_label = tk.Label(form_frame, text="", anchor=tk.W, justify=tk.LEFT)
+        status_label.pack(fill=tk.X)
+
         def return_book_action():
-            loan_id = loan_id_entry.get().strip()
-            if not loan_id:
-                messagebox.showerror("Error", "Please enter a Loan ID")
+            loan_ids = re.findall(r"\d+", loan_ids_text.get("1.0", tk.END))
+            if not loan_ids:
+                messagebox.showerror("Error", "Please enter at least one Loan ID", parent=dialog)
                 return
+            return_btn.config(state=tk.DISABLED)
+            status_label.config(text=f"Returning {len(loan_ids)} loan(s)...", fg="gray")
 
-            # Check for fines
-            if condition_combo.get() == "Damaged":
-                fine = 25.00
-                messagebox.showwarning(
-                    "Damage Fine",
-                    f"Book returned in damaged condition.\nFine applied: ${fine:.2f}"
-                )
-            elif condition_combo.get() == "Lost":
-                fine = 50.00
-                messagebox.showwarning(
-                    "Lost Book",
-                    f"Book marked as lost.\nReplacement fine: ${fine:.2f}"
+            def returned(results):
+                if not dialog.winfo_exists():
+                    return
+                return_btn.config(state=tk.NORMAL)
+                done = sum(ok for ok, _ in results.values())
+                fined = sum("fine" in message for ok, message in results.values() if ok)
+                status_label.config(
+                    text=f"Returned {done} of {len(results)} loan(s), {fined} with overdue fines",
+                    fg="green" if done == len(results) else "red"
                 )
-            else:
-                messagebox.showinfo("Success", "Book returned successfully!")
+                # Leave only the loans that need attention, with the reason
+                loan_ids_text.delete("1.0", tk.END)
+                for borrow_id, (ok, message) in results.items():
+                    if not ok:
+                        loan_ids_text.insert(tk.END, f"{borrow_id}  # {message}\n")
 
-            dialog.destroy()
+            def failed(error):
+                if dialog.winfo_exists():
+                    return_btn.config(state=tk.NORMAL)
+                    status_label.config(text="")
+                    messagebox.showerror("Return Failed", str(error), parent=dialog)
+
+            self.fetcher.submit("writes", self.repo.return_loans, returned, failed,
+                                loan_ids, condition_combo.get())
 
         button_frame = tk.Frame(form_frame)
         button_frame.pack(fill=tk.X, pady=(20, 0))
@@ -2101,28 +5695,98 @@ SUMMARY:
         return_btn.pack(side=tk.LEFT, padx=(0, 10))
         cancel_btn.pack(side=tk.LEFT)
 
+    def import_books(self):
+        """Bulk-import books from a CSV file, merging on ISBN"""
+        path = filedialog.askopenfilename(
+            parent=self.root,
+            title="Import Books",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Import Books")
+        dialog.geometry("520x180")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        tk.Label(dialog, text=f"Importing {os.path.basename(path)}",
+                 font=("Helvetica", 12, "bold")).pack(anchor=tk.W, padx=20, pady=(20, 10))
+        progress_bar = ttk.Progressbar(dialog, mode="indeterminate")
+        progress_bar.pack(fill=tk.X, padx=20)
+        progress_bar.start(10)
+        status_var = tk.StringVar(value="Reading file...")
+        tk.Label(dialog, textvariable=status_var).pack(anchor=tk.W, padx=20, pady=10)
+
+        # The importer reports from its worker thread; the dialog polls
+        latest = {}
+
+        def show_progress():
+            if not dialog.winfo_exists():
+                return
+            totals = latest.get("totals")
+            if totals:
+                status_var.set(
+                    f"{totals['read']:,} rows read, {totals['inserted']:,} inserted, "
+                    f"{totals['updated']:,} updated, {totals['rejected']:,} rejected "
+                    f"({totals['rate']:,.0f} rows/s)"
+                )
+            dialog.after(200, show_progress)
+
+        def run_import():
+            importer = BookImporter(self.repo.db, on_progress=lambda totals: latest.update(totals=totals))
+            with open(path, newline="", encoding="utf-8-sig") as lines:
+                return importer.run(lines)
+
+        def imported(totals):
+            dialog.destroy()
+            summary = (
+                f"{totals['read']:,} rows read\n{totals['inserted']:,} books added\n"
+                f"{totals['updated']:,} books updated\n{len(totals['rejected']):,} rows rejected\n"
+                f"({totals['rate']:,.0f} rows/s)"
+            )
+            if totals["rejected"]:
+                summary += "\n\n" + "\n".join(
+                    f"Line {line_number}: {reason}" for line_number, reason in totals["rejected"][:10]
+                )
+            messagebox.showinfo("Import Complete", summary)
+
+            # Too many rows changed for row events: reload the catalogue
+            self.reports.invalidate("books")
+            self.book_search_results = None
+            if self.catalogue_index is not None:
+                self.load_catalogue_index()
+            if self.books_table_visible():
+                self.search_books()
+
+        def failed(error):
+            dialog.destroy()
+            messagebox.showerror("Import Failed", str(error))
+
+        show_progress()
+        self.fetcher.submit("writes", run_import, imported, failed)
+
     def edit_book(self):
         """Edit selected book"""
-        selection = self.books_tree.selection()
-        if not selection:
+        book = self.books_table.selected_row()
+        if book is None:
             messagebox.showwarning("Warning", "Please select a book to edit")
             return
 
         # Get book details
-        item = self.books_tree.item(selection[0])
-        book_id = item['values'][0]
+        book_id = book[0]
 
         messagebox.showinfo("Edit Book", f"Edit book ID: {book_id}\n\nFeature under development.")
 
     def delete_book(self):
         """Delete selected book"""
-        selection = self.books_tree.selection()
-        if not selection:
+        book = self.books_table.selected_row()
+        if book is None:
             messagebox.showwarning("Warning", "Please select a book to delete")
             return
 
-        item = self.books_tree.item(selection[0])
-        book_title = item['values'][1]
+        book_id, book_title = book[0], book[1]
 
         confirm = messagebox.askyesno(
             "Confirm Delete",
@@ -2130,39 +5794,134 @@ SUMMARY:
         )
 
         if confirm:
-            # Delete from database (mock)
-            self.books_tree.delete(selection[0])
-            messagebox.showinfo("Success", "Book deleted successfully")
+            def deleted(rowcount):
+                messagebox.showinfo("Success", "Book deleted successfully")
+
+            self.fetcher.submit("writes", self.repo.delete_book, deleted, None, book_id)
 
     def borrow_book(self):
         """Borrow selected book"""
-        selection = self.books_tree.selection()
-        if not selection:
+        book = self.books_table.selected_row()
+        if book is None:
             messagebox.showwarning("Warning", "Please select a book to borrow")
             return
 
-        item = self.books_tree.item(selection[0])
-        book_title = item['values'][1]
-        available = item['values'][4]
+        book_title = book[1]
+        available = book[4]
 
         if available <= 0:
             messagebox.showerror("Not Available", f"'{book_title}' is not available for borrowing.")
             return
 
-        self.issue_loan()
+        self.issue_loan(book)
 
     def update_fine_status(self, status):
         """Update selected fine status"""
         messagebox.showinfo("Update Fine", f"Mark fine as {status}\n\nFeature under development.")
 
+    def show_report_text(self, text):
+        """Replace the report area with a message"""
+        if self.report_view.winfo_exists():
+            self.report_view.show_message(text)
+
+    def show_report(self, result):
+        """Show a generated report in the report area"""
+        if self.report_view.winfo_exists():
+            self.report_view.show(result)
+
     def generate_report(self):
-        """Generate report based on selection"""
-        report_type = self.report_type_var.get()
-        messagebox.showinfo("Generate Report", f"Generating {report_type}...\n\nFeature under development.")
+        """Generate the selected report for the chosen dates into the report area"""
+        report = REPORTS[self.report_type_var.get()]
+        dates = self.report_dates()
+        if dates is None:
+            return
+        self.show_report_text(f"Generating {report.title}...\n")
+
+        def failed(error):
+            self.show_report_text(f"{report.title} failed:\n{error}\n")
+
+        self.reports.run(report, *dates, self.show_report, failed)
+
+    def report_dates(self):
+        """Parse the report date range; returns (from, to) or None after warning"""
+        try:
+            date_from = date.fromisoformat(self.report_from_date.get().strip())
+            date_to = date.fromisoformat(self.report_to_date.get().strip())
+        except ValueError:
+            messagebox.showwarning("Invalid Dates", "Dates must be in YYYY-MM-DD format")
+            return None
+        if date_from > date_to:
+            messagebox.showwarning("Invalid Dates", "The From date must not be after the To date")
+            return None
+        return date_from, date_to
 
     def export_report(self, format):
-        """Export report in specified format"""
-        messagebox.showinfo("Export Report", f"Exporting report as {format.upper()}...\n\nFeature under development.")
+        """Stream the selected report to a file in the specified format"""
+        report = REPORTS[self.report_type_var.get()]
+        dates = self.report_dates()
+        if dates is None:
+            return
+        extension = ReportExporter.EXTENSIONS[format]
+        path = filedialog.asksaveasfilename(
+            parent=self.root,
+            title="Export Report",
+            defaultextension=extension,
+            initialfile=report.title.lower().replace(" ", "_") + extension,
+            filetypes=[(f"{format.upper()} files", "*" + extension), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Export Report")
+        dialog.geometry("480x170")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        tk.Label(dialog, text=f"Exporting {report.title}",
+                 font=("Helvetica", 12, "bold")).pack(anchor=tk.W, padx=20, pady=(20, 10))
+        # Indeterminate: counting the rows up front would run the report twice
+        progress_bar = ttk.Progressbar(dialog, mode="indeterminate")
+        progress_bar.pack(fill=tk.X, padx=20)
+        progress_bar.start(10)
+        status_var = tk.StringVar(value="Running query...")
+        tk.Label(dialog, textvariable=status_var).pack(anchor=tk.W, padx=20, pady=10)
+
+        cancel = QueryCancel()
+        ttk.Button(dialog, text="Cancel", command=cancel.cancel).pack(anchor=tk.E, padx=20)
+        dialog.protocol("WM_DELETE_WINDOW", cancel.cancel)
+
+        # The exporter reports from its worker thread; the dialog polls
+        latest = {}
+
+        def show_progress():
+            if not dialog.winfo_exists():
+                return
+            totals = latest.get("totals")
+            if totals:
+                status_var.set(f"{totals['rows']:,} rows written ({totals['rate']:,.0f} rows/s)")
+            dialog.after(200, show_progress)
+
+        def run_export():
+            exporter = ReportExporter(
+                self.repo, report, *dates, cancel=cancel,
+                on_progress=lambda totals: latest.update(totals=totals)
+            )
+            return exporter.run(path, format)
+
+        def exported(rows):
+            dialog.destroy()
+            messagebox.showinfo("Export Complete", f"{rows:,} rows written to\n{path}")
+
+        def failed(error):
+            dialog.destroy()
+            if cancel.cancelled:
+                messagebox.showinfo("Export Cancelled", "The export was cancelled; no file was written.")
+            else:
+                messagebox.showerror("Export Failed", str(error))
+
+        show_progress()
+        self.fetcher.submit("export", run_export, exported, failed)
 
     def print_report(self):
         """Print current report"""
@@ -2185,6 +5944,1590 @@ SUMMARY:
             self.show_login_screen()
 
 
+# ============================================================================
+# MAINTENANCE JOBS
+# ============================================================================
+
+class FineEngine:
+    """Prices overdue loans under the fine policy of each membership type
+
+    Policies are {membership_type: (rate_cents, grace_days, cap_cents)},
+    cap_cents None for no cap, loaded from view_fine_policies (so a type
+    without its own rate uses the fine_per_day setting). accrue() prices a
+    whole batch of loans from their due-date ordinals in one pass: a few
+    NumPy array operations when NumPy is installed, the same arithmetic in a
+    list comprehension otherwise. Amounts stay integer cents until they are
+    written, so no float rounding builds up over millions of loans.
+    """
+
+    NO_CAP = 2 ** 62
+    FETCH_SIZE = 50000
+
+    def __init__(self, db, policies=None):
+        self.db = db
+        self.policies = policies if policies is not None else self.load_policies()
+        if db.dialect == "postgresql":
+            self.due_ordinal = "(borrowed_books.due_date - DATE '0001-01-01' + 1)"
+        else:
+            self.due_ordinal = "CAST(JULIANDAY(borrowed_books.due_date) - 1721424.5 AS INTEGER)"
+
+    def load_policies(self):
+        with self.db.connection() as conn:
+            return self.read_policies(conn.cursor())
+
+    @staticmethod
+    def read_policies(cursor):
+        cursor.execute("SELECT membership_type, rate_per_day, grace_days, max_fine FROM view_fine_policies")
+        return {
+            membership_type: (to_cents(rate), int(grace_days), None if cap is None else to_cents(cap))
+            for membership_type, rate, grace_days, cap in cursor.fetchall()
+        }
+
+    def accrue(self, due_days, types, as_of, policies=None):
+        """Fine in cents of each loan, due on the ordinal due_days, as of the date as_of
+
+        types holds each loan's membership type; a type without a policy is
+        not fined. Returns an int64 array with NumPy, else a list.
+        """
+        policies = self.policies if policies is None else policies
+        index = {membership_type: i for i, membership_type in enumerate(policies)}
+        terms = list(policies.values()) + [(0, 0, None)]
+        rates = [rate for rate, _, _ in terms]
+        graces = [grace for _, grace, _ in terms]
+        caps = [self.NO_CAP if cap is None else cap for _, _, cap in terms]
+        codes = [index.get(membership_type, -1) for membership_type in types]
+        as_of = as_of.toordinal()
+
+        if HAS_NUMPY:
+            codes = np.asarray(codes, dtype=np.int64)
+            late = np.maximum(as_of - np.asarray(due_days, dtype=np.int64) - np.asarray(graces)[codes], 0)
+            return np.minimum(late * np.asarray(rates, dtype=np.int64)[codes], np.asarray(caps)[codes])
+        return [min(max(as_of - due - graces[code], 0) * rates[code], caps[code])
+                for due, code in zip(due_days, codes)]
+
+    def apply(self, cursor, loans, as_of, fine_due):
+        """Set the pending fine of each overdue loan, opening the missing ones
+
+        loans are (borrow_id, member_id, due_ordinal, membership_type) rows.
+        Each statement covers every loan: array parameters unnested on
+        PostgreSQL, executemany on SQLite. Returns the fines written.
+        """
+        if not loans:
+            return 0
+        borrow_ids, member_ids, due_days, types = (list(column) for column in zip(*loans))
+        cents = self.accrue(due_days, types, as_of)
+        cents = cents.tolist() if HAS_NUMPY else cents
+        days = [as_of.toordinal() - due for due in due_days]
+
+        if self.db.dialect == "postgresql":
+            cursor.execute(
+                "UPDATE fines SET amount = v.cents / 100.0, reason = 'Overdue fine: ' || v.days || ' days' "
+                "FROM unnest(%s::integer[], %s::integer[], %s::bigint[]) AS v(borrow_id, days, cents) "
+                "WHERE fines.borrow_id = v.borrow_id AND fines.status = 'Pending'",
+                (borrow_ids, days, cents)
+            )
+            written = cursor.rowcount
+            cursor.execute(
+                "INSERT INTO fines (borrow_id, member_id, amount, reason, fine_date, due_date) "
+                "SELECT v.borrow_id, v.member_id, v.cents / 100.0, 'Overdue fine: ' || v.days || ' days', "
+                "CAST(%s AS DATE), CAST(%s AS DATE) "
+                "FROM unnest(%s::integer[], %s::integer[], %s::integer[], %s::bigint[]) "
+                "AS v(borrow_id, member_id, days, cents) "
+                "WHERE v.cents > 0 AND NOT EXISTS (SELECT 1 FROM fines WHERE fines.borrow_id = v.borrow_id)",
+                (as_of.isoformat(), fine_due.isoformat(), borrow_ids, member_ids, days, cents)
+            )
+            return written + cursor.rowcount
+
+        cursor.executemany(
+            "UPDATE fines SET amount = ? / 100.0, reason = 'Overdue fine: ' || ? || ' days' "
+            "WHERE borrow_id = ? AND status = 'Pending'",
+            zip(cents, days, borrow_ids)
+        )
+        written = cursor.rowcount
+        cursor.executemany(
+            "INSERT INTO fines (borrow_id, member_id, amount, reason, fine_date, due_date) "
+            "SELECT ?, ?, ? / 100.0, 'Overdue fine: ' || ? || ' days', ?, ? "
+            "WHERE ? > 0 AND NOT EXISTS (SELECT 1 FROM fines WHERE borrow_id = ?)",
+            [(borrow_id, member_id, amount, late, as_of.isoformat(), fine_due.isoformat(), amount, borrow_id)
+             for borrow_id, member_id, amount, late in zip(borrow_ids, member_ids, cents, days)]
+        )
+        return written + cursor.rowcount
+
+    def simulate(self, policies, as_of=None):
+        """What-if: fines the open loans would have accrued by as_of under policies
+
+        policies replace the current terms of the types they name. Nothing
+        is written. Returns {membership_type: totals}, each with the loans
+        overdue, how many are fined and the current and simulated cents.
+        """
+        as_of = as_of or date.today()
+        simulated = dict(self.policies, **policies)
+        totals = {}
+        with self.db.connection() as conn:
+            if self.db.dialect == "postgresql":
+                cursor = conn.cursor(name="smartlibrary_fines")
+                cursor.itersize = self.FETCH_SIZE
+            else:
+                cursor = conn.cursor()
+            cursor.execute(self.db.adapt(
+                f"SELECT {self.due_ordinal}, members.membership_type FROM borrowed_books "
+                "JOIN members ON members.member_id = borrowed_books.member_id "
+                "WHERE borrowed_books.status IN ('Borrowed', 'Overdue') AND borrowed_books.due_date < %s"
+            ), (as_of.isoformat(),))
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                due_days, types = (list(column) for column in zip(*rows))
+                current = self.accrue(due_days, types, as_of)
+                what_if = self.accrue(due_days, types, as_of, simulated)
+                if HAS_NUMPY:
+                    labels = {label: i for i, label in enumerate(dict.fromkeys(types))}
+                    codes = np.asarray([labels[label] for label in types])
+                    for label, i in labels.items():
+                        rows_of = codes == i
+                        entry = totals.setdefault(label, {"loans": 0, "fined": 0, "current": 0, "simulated": 0})
+                        entry["loans"] += int(rows_of.sum())
+                        entry["fined"] += int((what_if[rows_of] > 0).sum())
+                        entry["current"] += int(current[rows_of].sum())
+                        entry["simulated"] += int(what_if[rows_of].sum())
+                    continue
+                for label, now, then in zip(types, current, what_if):
+                    entry = totals.setdefault(label, {"loans": 0, "fined": 0, "current": 0, "simulated": 0})
+                    entry["loans"] += 1
+                    entry["fined"] += then > 0
+                    entry["current"] += now
+                    entry["simulated"] += then
+            conn.rollback()
+        return totals
+
+
+class OverdueMaintenance:
+    """Set-based overdue processing: marks loans Overdue and accrues their fines
+
+    Open loans due before the as-of date are walked in (due_date, borrow_id)
+    order through idx_borrowed_books_open_due. Each chunk is one transaction
+    that flips the chunk's loans to Overdue, prices them with the FineEngine,
+    writes their pending fines in bulk and records the chunk's last key in
+    maintenance_runs, so an interrupted run resumes where it stopped and a
+    finished day is not processed twice.
+    """
+
+    JOB_NAME = "overdue_fines"
+
+    # Loans in the key range (after, last] of one chunk
+    CHUNK_RANGE = (
+        "borrowed_books.due_date >= %s AND (borrowed_books.due_date > %s OR borrowed_books.borrow_id > %s) "
+        "AND borrowed_books.due_date <= %s AND (borrowed_books.due_date < %s OR borrowed_books.borrow_id <= %s)"
+    )
+
+    def __init__(self, db, chunk_size=5000, on_progress=None, settings=None):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.settings = settings
+
+    def run(self, as_of=None, restart=False):
+        """Process every open loan due before as_of; returns the run totals"""
+        as_of = (as_of or date.today()).isoformat()
+        fine_due = date.fromisoformat(as_of) + timedelta(days=7)
+        fines = FineEngine(self.db, self.settings.fine_policies if self.settings is not None else None)
+
+        totals = self._start(as_of, restart)
+        if totals["completed"]:
+            return totals
+
+        started = time.monotonic()
+        after = totals["after"]
+        while True:
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self.db.adapt(
+                    "SELECT due_date, borrow_id FROM borrowed_books "
+                    "WHERE status IN ('Borrowed', 'Overdue') AND due_date < %s "
+                    "AND due_date >= %s AND (due_date > %s OR borrow_id > %s) "
+                    "ORDER BY due_date, borrow_id LIMIT %s"
+                ), (as_of, after[0], after[0], after[1], self.chunk_size))
+                keys = cursor.fetchall()
+                if not keys:
+                    totals["completed"] = True
+                    self._save(cursor, totals)
+                    self._log(cursor, totals)
+                    conn.commit()
+                    return totals
+
+                last = (str(keys[-1][0]), keys[-1][1])
+                in_chunk = [after[0], after[0], after[1], last[0], last[0], last[1]]
+
+                cursor.execute(self.db.adapt(
+                    "UPDATE borrowed_books SET status = 'Overdue' "
+                    f"WHERE status = 'Borrowed' AND {self.CHUNK_RANGE}"
+                ), in_chunk)
+                totals["marked"] += cursor.rowcount
+
+                # Accrue: refresh the pending fine of each overdue loan, or open one
+                cursor.execute(self.db.adapt(
+                    f"SELECT borrowed_books.borrow_id, borrowed_books.member_id, {fines.due_ordinal}, "
+                    "members.membership_type FROM borrowed_books "
+                    "JOIN members ON members.member_id = borrowed_books.member_id "
+                    f"WHERE borrowed_books.status = 'Overdue' AND {self.CHUNK_RANGE}"
+                ), in_chunk)
+                totals["fines"] += fines.apply(cursor, cursor.fetchall(), date.fromisoformat(as_of), fine_due)
+
+                totals["scanned"] += len(keys)
+                totals["after"] = after = last
+                self._save(cursor, totals)
+                conn.commit()
+
+            if self.on_progress is not None:
+                elapsed = time.monotonic() - started
+                self.on_progress(dict(totals, elapsed=elapsed,
+                                      rate=totals["scanned"] / elapsed if elapsed else 0.0))
+
+    def _start(self, as_of, restart):
+        """Load the checkpoint of an earlier run for as_of, or begin a fresh run"""
+        start = ("0001-01-01", 0)
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.db.adapt(
+                "SELECT as_of, last_due_date, last_borrow_id, loans_scanned, loans_marked, "
+                "fines_accrued, completed_at FROM maintenance_runs WHERE job_name = %s"
+            ), (self.JOB_NAME,))
+            row = cursor.fetchone()
+            if row is not None and str(row[0]) == as_of and not restart:
+                return {
+                    "as_of": as_of,
+                    "after": (str(row[1]), row[2]) if row[1] is not None else start,
+                    "scanned": row[3], "marked": row[4], "fines": row[5],
+                    "completed": row[6] is not None, "resumed": row[6] is None,
+                }
+
+            cursor.execute(self.db.adapt("DELETE FROM maintenance_runs WHERE job_name = %s"), (self.JOB_NAME,))
+            cursor.execute(self.db.adapt(
+                "INSERT INTO maintenance_runs (job_name, as_of) VALUES (%s, %s)"
+            ), (self.JOB_NAME, as_of))
+            conn.commit()
+        return {"as_of": as_of, "after": start, "scanned": 0, "marked": 0, "fines": 0,
+                "completed": False, "resumed": False}
+
+    def _save(self, cursor, totals):
+        """Checkpoint the run inside the chunk's transaction"""
+        last_due_date, last_borrow_id = totals["after"] if totals["scanned"] else (None, None)
+        completed = "CURRENT_TIMESTAMP" if totals["completed"] else "NULL"
+        cursor.execute(self.db.adapt(
+            "UPDATE maintenance_runs SET last_due_date = %s, last_borrow_id = %s, loans_scanned = %s, "
+            f"loans_marked = %s, fines_accrued = %s, completed_at = {completed} "
+            "WHERE job_name = %s"
+        ), (last_due_date, last_borrow_id, totals["scanned"], totals["marked"], totals["fines"], self.JOB_NAME))
+
+    def _log(self, cursor, totals):
+        cursor.execute(self.db.adapt(
+            "INSERT INTO activity_log (action_type, table_name, description) VALUES (%s, %s, %s)"
+        ), ("MAINTENANCE", "borrowed_books",
+            f"Daily Maintenance: Updated {totals['marked']} overdue loans, accrued {totals['fines']} fines"))
+
+
+class HistoryArchive:
+    """Moves old loan and activity history out of the live tables
+
+    On PostgreSQL borrowed_books and activity_log are range-partitioned, so
+    archiving detaches whole partitions that ended before the cut-off date
+    (archive_history in postgres.sql) and the run also creates the coming
+    year's partitions ahead of time. SQLite has no partitions, so returned
+    loans and log entries older than the cut-off are moved row by row into
+    the *_archive tables in one transaction. Either way the returned-loans
+    history keeps showing them through the loan_history view.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def run(self, before=None):
+        """Archive history older than before (a date); returns the loans moved"""
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            if self.db.dialect == "postgresql":
+                cursor.execute(
+                    "SELECT create_history_partitions(CURRENT_DATE, (CURRENT_DATE + INTERVAL '1 year')::date)"
+                )
+                moved = 0
+                if before is not None:
+                    cursor.execute("SELECT archive_history(%s)", (before,))
+                    moved = cursor.fetchone()[0]
+                conn.commit()
+                return moved
+
+            if before is None:
+                return 0
+            before = before.isoformat()
+            cursor.execute(
+                "INSERT INTO borrowed_books_archive SELECT * FROM borrowed_books "
+                "WHERE status = 'Returned' AND borrow_date < ?", (before,)
+            )
+            moved = cursor.rowcount
+            cursor.execute(
+                "DELETE FROM borrowed_books WHERE status = 'Returned' AND borrow_date < ?", (before,)
+            )
+            cursor.execute(
+                "INSERT INTO activity_log_archive SELECT * FROM activity_log WHERE created_at < ?", (before,)
+            )
+            cursor.execute("DELETE FROM activity_log WHERE created_at < ?", (before,))
+            conn.commit()
+            return moved
+
+
+# ============================================================================
+# BULK IMPORT
+# ============================================================================
+
+# CSV header names accepted for each books column
+BOOK_IMPORT_HEADERS = {
+    "isbn": "isbn",
+    "title": "title",
+    "author": "author",
+    "category": "category",
+    "genre": "category",
+    "publisher": "publisher",
+    "publication_year": "publication_year",
+    "year": "publication_year",
+    "total_copies": "total_copies",
+    "copies": "total_copies",
+    "location_code": "location_code",
+    "location": "location_code",
+    "description": "description",
+}
+
+# Column order of the staging table and of validated rows
+BOOK_IMPORT_COLUMNS = (
+    "isbn", "title", "author", "category", "publisher", "publication_year",
+    "total_copies", "location_code", "description",
+)
+
+# VARCHAR limits of the books columns
+BOOK_COLUMN_LIMITS = {
+    "isbn": 20, "title": 255, "author": 255, "category": 100,
+    "publisher": 255, "location_code": 50,
+}
+
+
+def read_book_csv(lines):
+    """Yield (line_number, record) for each data row of a books CSV file
+
+    Headers are matched case-insensitively against BOOK_IMPORT_HEADERS;
+    other columns are ignored.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [BOOK_IMPORT_HEADERS.get(name.strip().lower().replace(" ", "_")) for name in header]
+    missing = {"isbn", "title", "author", "total_copies"} - set(columns)
+    if missing:
+        raise ValueError(f"CSV header is missing: {', '.join(sorted(missing))}")
+    for values in reader:
+        if not any(value.strip() for value in values):
+            continue
+        record = {column: value.strip() for column, value in zip(columns, values) if column}
+        yield reader.line_num, record
+
+
+def validate_book_record(record):
+    """Return (row, None) for a valid record or (None, reason) for a rejected one
+
+    Applies the Add New Book form's rules: ISBN, title, author and total
+    copies are required, copies and publication year must be whole numbers.
+    """
+    record = {column: value or None for column, value in record.items()}
+    for column, label in (("isbn", "ISBN"), ("title", "Title"), ("author", "Author"),
+                          ("total_copies", "Total copies")):
+        if not record.get(column):
+            return None, f"{label} is required"
+    record["isbn"] = normalize_isbn(record["isbn"])
+    if not record["isbn"]:
+        return None, "ISBN must contain digits"
+    try:
+        copies = int(record["total_copies"])
+        year = int(record["publication_year"]) if record.get("publication_year") else None
+    except ValueError:
+        return None, "Total copies and publication year must be numbers"
+    if copies < 0:
+        return None, "Total copies cannot be negative"
+    for column, limit in BOOK_COLUMN_LIMITS.items():
+        if len(record.get(column) or "") > limit:
+            return None, f"{column} is longer than {limit} characters"
+
+    record.update(total_copies=copies, publication_year=year)
+    return tuple(record.get(column) for column in BOOK_IMPORT_COLUMNS), None
+
+
+class BookImporter:
+    """Streams a books CSV file into the catalogue in set-based batches
+
+    Rows are parsed and validated one at a time; valid rows are collected
+    into batches that are loaded into a temporary staging table (COPY on
+    PostgreSQL, executemany on SQLite) and merged into books with a single
+    INSERT ... ON CONFLICT (isbn) per batch. A known ISBN updates the
+    existing book: its metadata is replaced and its available copies move
+    by the change in total copies. An ISBN repeated within the file is
+    rejected after its first occurrence. Each batch is one transaction.
+    """
+
+    STAGING_TABLE = "book_import_staging"
+
+    def __init__(self, db, batch_size=5000, on_progress=None):
+        self.db = db
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        greatest = "GREATEST" if db.dialect == "postgresql" else "MAX"
+        columns = ", ".join(BOOK_IMPORT_COLUMNS)
+        self._merge = (
+            f"INSERT INTO books ({columns}, available_copies) "
+            f"SELECT {columns}, total_copies FROM {self.STAGING_TABLE} WHERE true "
+            "ON CONFLICT (isbn) DO UPDATE SET "
+            "title = EXCLUDED.title, author = EXCLUDED.author, "
+            "category = COALESCE(EXCLUDED.category, books.category), "
+            "publisher = COALESCE(EXCLUDED.publisher, books.publisher), "
+            "publication_year = COALESCE(EXCLUDED.publication_year, books.publication_year), "
+            "location_code = COALESCE(EXCLUDED.location_code, books.location_code), "
+            "description = COALESCE(EXCLUDED.description, books.description), "
+            f"available_copies = {greatest}(books.available_copies + EXCLUDED.total_copies - books.total_copies, 0), "
+            "total_copies = EXCLUDED.total_copies, "
+            "updated_at = CURRENT_TIMESTAMP"
+        )
+
+    def run(self, lines):
+        """Import the CSV lines (an open file or any iterable of lines)
+
+        Returns the totals: rows read, inserted, updated, the rejected rows
+        as (line_number, reason) pairs and the overall rows per second.
+        """
+        totals = {"read": 0, "inserted": 0, "updated": 0, "rejected": [], "rate": 0.0}
+        started = time.perf_counter()
+        seen = {}
+        batch = []
+
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            self._create_staging(cursor)
+            for line_number, record in read_book_csv(lines):
+                totals["read"] += 1
+                row, reason = validate_book_record(record)
+                if row is not None:
+                    isbn = row[0]
+                    if isbn in seen:
+                        row, reason = None, f"Duplicate ISBN {isbn} (first on line {seen[isbn]})"
+                    else:
+                        seen[isbn] = line_number
+                if row is None:
+                    totals["rejected"].append((line_number, reason))
+                    continue
+
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._load(conn, cursor, batch, totals, started)
+                    batch = []
+            if batch:
+                self._load(conn, cursor, batch, totals, started)
+
+        totals["rate"] = totals["read"] / max(time.perf_counter() - started, 1e-9)
+        return totals
+
+    def _create_staging(self, cursor):
+        definition = (
+            "isbn VARCHAR(20), title VARCHAR(255), author VARCHAR(255), category VARCHAR(100), "
+            "publisher VARCHAR(255), publication_year INTEGER, total_copies INTEGER, "
+            "location_code VARCHAR(50), description TEXT"
+        )
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {self.STAGING_TABLE} ({definition})")
+
+    def _load(self, conn, cursor, batch, totals, started):
+        """Stage one batch and merge it into books"""
+        try:
+            cursor.execute(f"DELETE FROM {self.STAGING_TABLE}")
+            if self.db.dialect == "postgresql":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {self.STAGING_TABLE} ({', '.join(BOOK_IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+            else:
+                cursor.executemany(
+                    f"INSERT INTO {self.STAGING_TABLE} VALUES ({', '.join('?' * len(BOOK_IMPORT_COLUMNS))})",
+                    batch
+                )
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {self.STAGING_TABLE} s JOIN books b ON b.isbn = s.isbn"
+            )
+            updated = cursor.fetchone()[0]
+            cursor.execute(self._merge)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        totals["updated"] += updated
+        totals["inserted"] += len(batch) - updated
+        totals["rate"] = totals["read"] / max(time.perf_counter() - started, 1e-9)
+        if self.on_progress:
+            self.on_progress(dict(totals, rejected=len(totals["rejected"])))
+
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+# Dialect-specific pieces of the report queries
+REPORT_SQL = {
+    "postgresql": {"month": "to_char(bb.borrow_date, 'YYYY-MM')"},
+    "sqlite": {"month": "strftime('%Y-%m', bb.borrow_date)"},
+}
+
+
+class Report:
+    """One report type: its column headings, the query for its rows and its totals
+
+    Query templates are filled with the REPORT_SQL pieces of the backend; a
+    dated query takes the from/to dates ``date_ranges`` times, once per date
+    range it filters on, and the totals query takes them the same number of
+    times. ``totals`` labels the single row the totals query aggregates to,
+    ``tables`` are the tables whose writes change the report and ``widths``
+    are relative column widths used by the PDF layout.
+    """
+
+    def __init__(self, title, columns, query, totals, totals_query, tables, date_ranges=1, widths=None):
+        self.title = title
+        self.columns = columns
+        self.query = query
+        self.totals = totals
+        self.totals_query = totals_query
+        self.tables = tables
+        self.date_ranges = date_ranges
+        self.widths = widths or [1] * len(columns)
+
+    def sql(self, dialect):
+        return self.query.format(**REPORT_SQL[dialect])
+
+    def totals_sql(self, dialect):
+        return self.totals_query.format(**REPORT_SQL[dialect])
+
+    def params(self, date_from, date_to):
+        return [str(date_from), str(date_to)] * self.date_ranges
+
+
+REPORTS = OrderedDict((report.title, report) for report in (
+    Report(
+        "Overdue Books Report",
+        ("Loan ID", "Member", "Membership #", "Book", "ISBN", "Due Date", "Days Overdue", "Fine"),
+        "SELECT borrow_id, member_name, membership_number, book_title, isbn, due_date, "
+        "days_overdue, calculated_fine "
+        "FROM view_active_loans "
+        "WHERE days_overdue > 0 AND due_date BETWEEN %s AND %s "
+        "ORDER BY due_date, borrow_id",
+        ("Total Overdue Books", "Total Fines Due", "Most Days Overdue", "Members With Overdue Books"),
+        "SELECT COUNT(*), COALESCE(SUM(calculated_fine), 0), COALESCE(MAX(days_overdue), 0), "
+        "COUNT(DISTINCT membership_number) "
+        "FROM view_active_loans "
+        "WHERE days_overdue > 0 AND due_date BETWEEN %s AND %s",
+        ("borrowed_books", "books", "members"),
+        widths=(2, 5, 3, 7, 4, 3, 2, 2),
+    ),
+    Report(
+        "Monthly Circulation",
+        ("Month", "Loans", "Returned", "Still Out", "Overdue"),
+        "SELECT {month}, COUNT(*), "
+        "SUM(CASE WHEN bb.status = 'Returned' THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN bb.status IN ('Borrowed', 'Overdue') THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN bb.status = 'Overdue' THEN 1 ELSE 0 END) "
+        "FROM loan_history bb "
+        "WHERE bb.borrow_date BETWEEN %s AND %s "
+        "GROUP BY {month} ORDER BY {month}",
+        ("Total Loans", "Returned", "Still Out", "Borrowing Members"),
+        "SELECT COUNT(*), "
+        "COALESCE(SUM(CASE WHEN bb.status = 'Returned' THEN 1 ELSE 0 END), 0), "
+        "COALESCE(SUM(CASE WHEN bb.status IN ('Borrowed', 'Overdue') THEN 1 ELSE 0 END), 0), "
+        "COUNT(DISTINCT bb.member_id) "
+        "FROM loan_history bb "
+        "WHERE bb.borrow_date BETWEEN %s AND %s",
+        ("borrowed_books",),
+    ),
+    Report(
+        "Member Activity",
+        ("Member ID", "Member", "Membership #", "Type", "Loans", "Returned", "Overdue", "Fines",
+         "Pending Fines"),
+        "SELECT s.member_id, s.member_name, s.membership_number, s.membership_type, "
+        "a.loans, a.returned, a.overdue, COALESCE(f.total, 0), s.pending_fines "
+        "FROM (SELECT bb.member_id, COUNT(*) AS loans, "
+        "      SUM(CASE WHEN bb.status = 'Returned' THEN 1 ELSE 0 END) AS returned, "
+        "      SUM(CASE WHEN bb.status = 'Overdue' THEN 1 ELSE 0 END) AS overdue "
+        "      FROM loan_history bb WHERE bb.borrow_date BETWEEN %s AND %s "
+        "      GROUP BY bb.member_id) a "
+        "JOIN view_member_stats s ON s.member_id = a.member_id "
+        "LEFT JOIN (SELECT member_id, SUM(amount) AS total FROM fines "
+        "           WHERE fine_date BETWEEN %s AND %s GROUP BY member_id) f "
+        "ON f.member_id = a.member_id "
+        "ORDER BY a.loans DESC, s.member_id",
+        ("Active Members", "Total Loans", "Overdue Loans", "Fines Issued"),
+        "SELECT COUNT(DISTINCT bb.member_id), COUNT(*), "
+        "COALESCE(SUM(CASE WHEN bb.status = 'Overdue' THEN 1 ELSE 0 END), 0), "
+        "(SELECT COALESCE(SUM(amount), 0) FROM fines WHERE fine_date BETWEEN %s AND %s) "
+        "FROM loan_history bb "
+        "WHERE bb.borrow_date BETWEEN %s AND %s",
+        ("borrowed_books", "members", "fines"),
+        date_ranges=2,
+        widths=(2, 5, 3, 2, 2, 2, 2, 2, 2),
+    ),
+    Report(
+        "Popular Genres",
+        ("Genre", "Loans", "Titles Borrowed", "Members"),
+        "SELECT COALESCE(b.category, 'Uncategorized'), COUNT(*), COUNT(DISTINCT bb.book_id), "
+        "COUNT(DISTINCT bb.member_id) "
+        "FROM loan_history bb JOIN books b ON bb.book_id = b.book_id "
+        "WHERE bb.borrow_date BETWEEN %s AND %s "
+        "GROUP BY COALESCE(b.category, 'Uncategorized') "
+        "ORDER BY COUNT(*) DESC",
+        ("Total Loans", "Genres Borrowed", "Titles Borrowed", "Borrowing Members"),
+        "SELECT COUNT(*), COUNT(DISTINCT COALESCE(b.category, 'Uncategorized')), "
+        "COUNT(DISTINCT bb.book_id), COUNT(DISTINCT bb.member_id) "
+        "FROM loan_history bb JOIN books b ON bb.book_id = b.book_id "
+        "WHERE bb.borrow_date BETWEEN %s AND %s",
+        ("borrowed_books", "books"),
+        widths=(4, 2, 2, 2),
+    ),
+    Report(
+        "Fine Collection",
+        ("Fine ID", "Member", "Membership #", "Book", "Amount", "Fine Date", "Status", "Paid On"),
+        "SELECT f.fine_id, m.first_name || ' ' || m.last_name, m.membership_number, "
+        "COALESCE((SELECT b.title FROM loan_history bb JOIN books b ON bb.book_id = b.book_id "
+        "          WHERE bb.borrow_id = f.borrow_id), ''), "
+        "f.amount, f.fine_date, f.status, f.payment_date "
+        "FROM fines f JOIN members m ON f.member_id = m.member_id "
+        "WHERE f.fine_date BETWEEN %s AND %s "
+        "ORDER BY f.fine_date, f.fine_id",
+        ("Fines Issued", "Total Amount", "Collected", "Outstanding"),
+        "SELECT COUNT(*), COALESCE(SUM(amount), 0), "
+        "COALESCE(SUM(CASE WHEN status = 'Paid' THEN amount ELSE 0 END), 0), "
+        "COALESCE(SUM(CASE WHEN status = 'Pending' THEN amount ELSE 0 END), 0) "
+        "FROM fines "
+        "WHERE fine_date BETWEEN %s AND %s",
+        ("fines", "members"),
+        widths=(2, 5, 3, 7, 2, 3, 2, 3),
+    ),
+    Report(
+        "Book Inventory",
+        ("Book ID", "Title", "Author", "Genre", "Total", "Available", "On Loan", "Overdue",
+         "Loans In Period", "Loans Ever"),
+        "SELECT s.book_id, s.title, s.author, s.category, s.total_copies, s.available_copies, "
+        "s.currently_borrowed + s.currently_overdue, s.currently_overdue, COALESCE(p.loans, 0), "
+        "s.times_borrowed "
+        "FROM view_book_stats s "
+        "LEFT JOIN (SELECT bb.book_id, COUNT(*) AS loans FROM loan_history bb "
+        "           WHERE bb.borrow_date BETWEEN %s AND %s GROUP BY bb.book_id) p "
+        "ON p.book_id = s.book_id "
+        "ORDER BY s.book_id",
+        ("Titles", "Copies", "Available Copies", "Loans In Period"),
+        "SELECT (SELECT COUNT(*) FROM books), (SELECT COALESCE(SUM(total_copies), 0) FROM books), "
+        "(SELECT COALESCE(SUM(available_copies), 0) FROM books), COUNT(*) "
+        "FROM loan_history bb "
+        "WHERE bb.borrow_date BETWEEN %s AND %s",
+        ("books", "borrowed_books"),
+        widths=(2, 7, 5, 3, 2, 2, 2, 2, 2, 2),
+    ),
+))
+
+
+def report_value(value):
+    """Plain text of a report cell"""
+    if value is None:
+        return ""
+    if isinstance(value, Decimal):
+        return f"{value:.2f}"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+class CsvReportWriter:
+    binary = False
+
+    def __init__(self, out, title, columns, widths):
+        self.writer = csv.writer(out)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows([report_value(value) for value in row] for row in rows)
+
+    def close(self):
+        pass
+
+
+class JsonLinesReportWriter:
+    """One JSON object per row, keyed by column heading"""
+
+    binary = False
+
+    def __init__(self, out, title, columns, widths):
+        self.out = out
+        self.columns = columns
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        return value
+
+    def write(self, rows):
+        self.out.writelines(
+            json.dumps(dict(zip(self.columns, map(self._value, row)))) + "\n" for row in rows
+        )
+
+    def close(self):
+        pass
+
+
+class PdfReportWriter:
+    """Minimal streaming PDF writer for tabular reports
+
+    Each page is written out as soon as it fills, set in Courier so the
+    columns line up without font metrics. Only the byte offsets of the
+    written objects are kept for the cross-reference table at the end, so
+    memory stays flat however many pages the report runs to.
+    """
+
+    binary = True
+    PAGE_WIDTH = 842   # A4 landscape, in points
+    PAGE_HEIGHT = 595
+    MARGIN = 36
+    FONT_SIZE = 7
+    LEADING = 9
+
+    def __init__(self, out, title, columns, widths):
+        self.out = out
+        self.title = title
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 5
+        self.lines = []
+
+        # Courier glyphs are 0.6 em wide
+        line_chars = int((self.PAGE_WIDTH - 2 * self.MARGIN) / (self.FONT_SIZE * 0.6))
+        total = sum(widths)
+        self.widths = [max(3, int(line_chars * width / total) - 1) for width in widths]
+        self.header = self._format_row(columns)
+        self.rows_per_page = int((self.PAGE_HEIGHT - 2 * self.MARGIN) / self.LEADING) - 4
+
+        self.out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        self._object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>")
+
+    def write(self, rows):
+        for row in rows:
+            self.lines.append(self._format_row(map(report_value, row)))
+            if len(self.lines) == self.rows_per_page:
+                self._flush_page()
+
+    def close(self):
+        if self.lines or not self.page_ids:
+            self._flush_page()
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in self.page_ids)
+        self._object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.page_ids)))
+
+        xref = self.out.tell()
+        self.out.write(b"xref\n0 %d\n0000000000 65535 f \n" % self.next_id)
+        for object_id in range(1, self.next_id):
+            self.out.write(b"%010d 00000 n \n" % self.offsets[object_id])
+        self.out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (self.next_id, xref))
+
+    def _format_row(self, values):
+        cells = []
+        for value, width in zip(values, self.widths):
+            text = str(value)
+            cells.append(text[:width - 1] + "~" if len(text) > width else text.ljust(width))
+        return " ".join(cells).rstrip()
+
+    @staticmethod
+    def _text(line):
+        data = line.encode("cp1252", errors="replace")
+        return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+    def _object(self, object_id, body):
+        self.offsets[object_id] = self.out.tell()
+        self.out.write(b"%d 0 obj\n%s\nendobj\n" % (object_id, body))
+
+    def _flush_page(self):
+        page_number = len(self.page_ids) + 1
+        top = self.PAGE_HEIGHT - self.MARGIN - self.FONT_SIZE
+        heading = f"{self.title}    page {page_number}"
+        content = [
+            b"BT /F2 %d Tf %d TL %d %d Td" % (self.FONT_SIZE + 2, self.LEADING, self.MARGIN, top),
+            self._text(heading) + b" Tj T* /F2 %d Tf" % self.FONT_SIZE,
+            self._text(self.header) + b" Tj T* /F1 %d Tf" % self.FONT_SIZE,
+            self._text("-" * len(self.header)) + b" Tj",
+        ]
+        content.extend(b"T* " + self._text(line) + b" Tj" for line in self.lines)
+        content.append(b"ET")
+        stream = b"\n".join(content)
+
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._object(content_id, b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        self._object(page_id, (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>"
+        ) % (self.PAGE_WIDTH, self.PAGE_HEIGHT, content_id))
+        self.page_ids.append(page_id)
+        self.lines = []
+
+
+class ReportExporter:
+    """Streams a report from the database straight into a CSV, JSON Lines or PDF file
+
+    Rows go from a server-side cursor to the writer a batch at a time, so
+    memory use does not grow with the report. The file is written under a
+    ``.part`` name and only renamed into place once complete; a cancelled or
+    failed export leaves nothing behind.
+    """
+
+    WRITERS = {"csv": CsvReportWriter, "jsonl": JsonLinesReportWriter, "pdf": PdfReportWriter}
+    EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "pdf": ".pdf"}
+
+    def __init__(self, repo, report, date_from=None, date_to=None, on_progress=None, cancel=None,
+                 batch_size=2000):
+        self.repo = repo
+        self.report = report
+        self.date_from = date_from
+        self.date_to = date_to
+        self.on_progress = on_progress
+        self.cancel = cancel
+        self.batch_size = batch_size
+
+    def run(self, path, fmt):
+        """Write the report to path in format fmt; returns the number of rows"""
+        writer_class = self.WRITERS[fmt]
+        title = self.report.title
+        if self.report.date_ranges:
+            title += f" ({self.date_from} to {self.date_to})"
+        started = time.perf_counter()
+        written = 0
+        partial_path = path + ".part"
+        try:
+            if writer_class.binary:
+                out = open(partial_path, "wb")
+            else:
+                out = open(partial_path, "w", newline="", encoding="utf-8")
+            with out:
+                writer = writer_class(out, title, self.report.columns, self.report.widths)
+                batches = self.repo.stream(
+                    self.report.sql(self.repo.db.dialect),
+                    self.report.params(self.date_from, self.date_to),
+                    self.batch_size, self.cancel
+                )
+                for rows in batches:
+                    writer.write(rows)
+                    written += len(rows)
+                    if self.on_progress:
+                        elapsed = max(time.perf_counter() - started, 1e-9)
+                        self.on_progress({"rows": written, "rate": written / elapsed})
+                writer.close()
+            os.replace(partial_path, path)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        return written
+
+
+class ReportResult:
+    """A generated report, spooled to a temporary text file
+
+    The totals and every detail row are written as fixed-width text lines
+    while the rows stream in, and the byte offset of each line is kept, so
+    any run of lines is a slice of the memory-mapped file and a search is a
+    scan of the mapping. Column widths are taken from the first batch of
+    rows; longer values further down are cut to fit.
+
+    A result is shared by the engine's cache and the viewer, so holders
+    ``acquire()`` and ``release()`` it and the file is removed when the
+    last one lets go.
+    """
+
+    MAX_COLUMN_WIDTH = 30
+
+    def __init__(self, report, date_from, date_to, totals):
+        self.report = report
+        self.date_from = date_from
+        self.date_to = date_to
+        self.totals = totals
+        self.row_count = 0
+        self.elapsed = None
+        self.generated = datetime.now()
+        self.loaded = time.monotonic()
+        self.offsets = array("q")
+        self._size = 0
+        self._widths = None
+        self._map = None
+        self._holders = 0
+
+        handle, self.path = tempfile.mkstemp(prefix="smartlibrary-report-", suffix=".txt")
+        self._file = os.fdopen(handle, "w+b")
+        self._write([
+            report.title.upper(),
+            f"Generated: {self.generated:%Y-%m-%d %H:%M:%S}",
+            f"Period: {date_from} to {date_to}",
+            "=" * 50,
+            "",
+        ])
+        self._write(
+            f"{label}: {value:,}" if isinstance(value, int) else f"{label}: {report_value(value)}"
+            for label, value in zip(report.totals, totals)
+        )
+        self._write(["", "DETAILED LIST:"])
+
+    def _write(self, lines):
+        chunk = []
+        for line in lines:
+            data = (line + "\n").encode("utf-8")
+            self.offsets.append(self._size)
+            self._size += len(data)
+            chunk.append(data)
+        self._file.write(b"".join(chunk))
+
+    def add_rows(self, rows):
+        """Append a batch of detail rows (worker thread)"""
+        cells = [[report_value(value) for value in row] for row in rows]
+        if self._widths is None:
+            self._widths = [
+                min(self.MAX_COLUMN_WIDTH, max(len(heading), *(len(row[i]) for row in cells)))
+                for i, heading in enumerate(self.report.columns)
+            ]
+            header = "  ".join(heading[:width].ljust(width)
+                               for heading, width in zip(self.report.columns, self._widths))
+            self._write([header.rstrip(), "-" * len(header)])
+        self._write(
+            "  ".join(cell[:width].ljust(width) for cell, width in zip(row, self._widths)).rstrip()
+            for row in cells
+        )
+        self.row_count += len(rows)
+
+    def finish(self, elapsed):
+        """Close the file for writing and map it"""
+        if not self.row_count:
+            self._write(["No rows in this period."])
+        self.elapsed = elapsed
+        self._file.flush()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @property
+    def line_count(self):
+        return len(self.offsets)
+
+    def lines(self, start, stop):
+        """Text of lines start to stop (exclusive)"""
+        stop = min(stop, len(self.offsets))
+        if start >= stop:
+            return ""
+        end = self.offsets[stop] if stop < len(self.offsets) else self._size
+        return self._map[self.offsets[start]:end].decode("utf-8")
+
+    def find(self, text, start=0):
+        """Index of the first line from start on containing text (ignoring case), or None"""
+        if start >= len(self.offsets):
+            return None
+        pattern = re.compile(re.escape(text.encode("utf-8")), re.IGNORECASE)
+        match = pattern.search(self._map, self.offsets[start])
+        if match is None:
+            return None
+        return bisect.bisect_right(self.offsets, match.start()) - 1
+
+    def acquire(self):
+        self._holders += 1
+        return self
+
+    def release(self):
+        self._holders -= 1
+        if self._holders <= 0:
+            self.discard()
+
+    def discard(self):
+        """Unmap and delete the spooled file"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if not self._file.closed:
+            self._file.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class ReportEngine:
+    """Generates reports off the UI thread and caches the results
+
+    The aggregation runs in the database: each report's totals query
+    collapses to a single row, and the detail rows stream from a cursor into
+    the result's spool file, so a report of any length is generated in flat
+    memory. Results are cached by (report, from, to). A change event for
+    any table a report reads drops its cached results; entries also expire
+    after CACHE_TTL seconds, since other clients' writes publish no events
+    here, and at midnight, since overdue days count from today.
+    """
+
+    CACHE_TTL = 300
+    MAX_ENTRIES = 8
+
+    def __init__(self, repo, fetcher):
+        self.repo = repo
+        self.fetcher = fetcher
+        self._cache = OrderedDict()
+        self._version = 0
+        self._request = None
+        self._cancel = None
+        for table in sorted({table for report in REPORTS.values() for table in report.tables}):
+            repo.changes.subscribe(table, partial(self._table_changed, table))
+
+    def _table_changed(self, table, action, key, row):
+        self.invalidate(table)
+
+    def invalidate(self, table=None):
+        """Drop the cached results that read table, or every result"""
+        self._version += 1
+        for cache_key in list(self._cache):
+            if table is None or table in REPORTS[cache_key[0]].tables:
+                self._cache.pop(cache_key).release()
+
+    def cached(self, report, date_from, date_to):
+        """The cached result for the report and range, or None"""
+        cache_key = (report.title, date_from, date_to)
+        result = self._cache.get(cache_key)
+        if result is None:
+            return None
+        if time.monotonic() - result.loaded > self.CACHE_TTL or result.generated.date() != date.today():
+            self._cache.pop(cache_key).release()
+            return None
+        self._cache.move_to_end(cache_key)
+        return result
+
+    def generate(self, report, date_from, date_to, cancel=None):
+        """Run the totals and detail queries of a report (worker thread)"""
+        started = time.perf_counter()
+        dialect = self.repo.db.dialect
+        params = report.params(date_from, date_to)
+        totals = self.repo.fetchall(report.totals_sql(dialect), params, cancel=cancel)[0]
+        result = ReportResult(report, date_from, date_to, totals)
+        try:
+            for rows in self.repo.stream(report.sql(dialect), params, cancel=cancel):
+                result.add_rows(rows)
+            result.finish(time.perf_counter() - started)
+        except BaseException:
+            result.discard()
+            raise
+        return result
+
+    def run(self, report, date_from, date_to, on_done, on_error=None):
+        """Deliver the report to on_done, from the cache or a worker
+
+        A newer request cancels an unfinished one, whose callbacks are then
+        skipped. on_done should acquire the result to keep it past the call.
+        """
+        if self._cancel is not None:
+            self._cancel.cancel()
+            self._cancel = None
+        request = self._request = object()
+
+        result = self.cached(report, date_from, date_to)
+        if result is not None:
+            on_done(result)
+            return
+        version = self._version
+        cancel = self._cancel = QueryCancel()
+
+        def generated(result):
+            result.acquire()
+            # A write while the queries ran may already be missing from it
+            if version == self._version:
+                self._cache[(report.title, date_from, date_to)] = result.acquire()
+                while len(self._cache) > self.MAX_ENTRIES:
+                    self._cache.popitem(last=False)[1].release()
+            if request is self._request:
+                self._cancel = None
+                on_done(result)
+            result.release()
+
+        def failed(error):
+            if request is self._request:
+                self._cancel = None
+                if on_error:
+                    on_error(error)
+
+        self.fetcher.submit("report", self.generate, generated, failed, report, date_from, date_to, cancel)
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+class SyntheticLibrary:
+    """Deterministic synthetic catalogue, membership, loan history and fines
+
+    Titles and authors are drawn from fixed word lists, so searches hit a
+    realistic mix of common and rare tokens. There are half as many loans as
+    books unless ``loans`` says otherwise; about a tenth of them are still
+    open and half of those are past due. Loans returned late carry a fine.
+    """
+
+    WORDS = (
+        "silent shadow river garden empire winter secret night golden house "
+        "ocean mountain little history stone fire lost city dream island "
+        "storm journey kingdom glass iron paper memory forest light dark "
+        "ancient modern science letters wild broken hidden northern crown "
+        "thousand song code patient habits mockingbird gatsby sapiens atlas"
+    ).split()
+    FIRST_NAMES = "John Jane Bob Alice Maria David Sarah Michael Laura James Emma Noah Olivia Liam Ava".split()
+    LAST_NAMES = "Doe Smith Johnson Brown Garcia Miller Davis Wilson Moore Taylor Anderson Thomas Lee".split()
+    MEMBERSHIP_TYPES = ("Standard", "Premium", "Student")
+    BATCH_SIZE = 10000
+
+    def __init__(self, books, members=None, seed=42, loans=None):
+        self.books = books
+        self.members = members or books
+        self.loans = loans or books // 2
+        self.seed = seed
+
+    def populate(self, db):
+        """Insert the synthetic rows; returns how many of each were written"""
+        rng = random.Random(self.seed)
+        available = {}
+
+        def book_rows():
+            for book_id in range(1, self.books + 1):
+                copies = rng.randint(1, 5)
+                available[book_id] = copies
+                title = " ".join(rng.choice(self.WORDS).capitalize() for _ in range(rng.randint(2, 4)))
+                author = f"{rng.choice(self.FIRST_NAMES)} {rng.choice(self.LAST_NAMES)}"
+                yield (book_id, title, author, f"978{book_id:010d}",
+                       rng.choice(SmartLibraryApp.BOOK_GENRES), copies, copies)
+
+        def member_rows():
+            for member_id in range(1, self.members + 1):
+                yield (member_id, rng.choice(self.FIRST_NAMES), rng.choice(self.LAST_NAMES),
+                       f"member{member_id}@example.org", rng.choice(self.MEMBERSHIP_TYPES),
+                       "Active" if rng.random() < 0.9 else "Inactive")
+
+        def loan_rows():
+            today = date.today()
+            open_pairs = set()
+            for _ in range(self.loans):
+                book_id, member_id = rng.randint(1, self.books), rng.randint(1, self.members)
+                borrowed = today - timedelta(days=rng.randint(0, 400))
+                due = borrowed + timedelta(days=14)
+                still_open = (rng.random() < 0.1 and available[book_id] > 0
+                              and (book_id, member_id) not in open_pairs)
+                if still_open:
+                    available[book_id] -= 1
+                    open_pairs.add((book_id, member_id))
+                    yield (book_id, member_id, borrowed.isoformat(), due.isoformat(), None, "Borrowed")
+                else:
+                    returned = min(today, borrowed + timedelta(days=rng.randint(1, 30)))
+                    yield (book_id, member_id, borrowed.isoformat(), due.isoformat(),
+                           returned.isoformat(), "Returned")
+
+        def fine_rows(late_loans):
+            for borrow_id, member_id, due, returned in late_loans:
+                returned = date.fromisoformat(str(returned))
+                days_late = (returned - date.fromisoformat(str(due))).days
+                yield (borrow_id, member_id, round(days_late * 0.5, 2), returned.isoformat(),
+                       (returned + timedelta(days=30)).isoformat(),
+                       "Pending" if rng.random() < 0.2 else "Paid")
+
+        counts = {}
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            for table, query, rows in (
+                ("books",
+                 "INSERT INTO books (book_id, title, author, isbn, category, total_copies, available_copies) "
+                 "VALUES (%s, %s, %s, %s, %s, %s, %s)", book_rows()),
+                ("members",
+                 "INSERT INTO members (member_id, first_name, last_name, email, membership_type, status) "
+                 "VALUES (%s, %s, %s, %s, %s, %s)", member_rows()),
+                ("borrowed_books",
+                 "INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, "
+                 "actual_return_date, status) VALUES (%s, %s, %s, %s, %s, %s)", loan_rows()),
+            ):
+                counts[table] = 0
+                while True:
+                    batch = list(itertools.islice(rows, self.BATCH_SIZE))
+                    if not batch:
+                        break
+                    cursor.executemany(db.adapt(query), batch)
+                    counts[table] += len(batch)
+                conn.commit()
+
+            cursor.execute(
+                "SELECT borrow_id, member_id, due_date, actual_return_date FROM borrowed_books "
+                "WHERE actual_return_date > due_date ORDER BY borrow_id"
+            )
+            rows = fine_rows(cursor.fetchall())
+            counts["fines"] = 0
+            while True:
+                batch = list(itertools.islice(rows, self.BATCH_SIZE))
+                if not batch:
+                    break
+                cursor.executemany(db.adapt(
+                    "INSERT INTO fines (borrow_id, member_id, amount, fine_date, due_date, status) "
+                    "VALUES (%s, %s, %s, %s, %s, %s)"
+                ), batch)
+                counts["fines"] += len(batch)
+            conn.commit()
+        return counts
+
+
+def timed(func, repeat):
+    """Latency summary (milliseconds) of repeat calls to func"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "runs": repeat,
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(repeat - 1, int(repeat * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def throughput(ops, seconds):
+    return {"ops": ops, "seconds": round(seconds, 3), "ops_per_sec": round(ops / seconds, 1) if seconds else None}
+
+
+class BenchmarkSuite:
+    """Hot-path benchmarks run against one synthetic library
+
+    Every ``bench_*`` method is a benchmark; it returns a JSON-serializable
+    dict of measurements. They run in definition order, so the write-heavy
+    loan and fine benchmarks come after the read-only ones.
+    """
+
+    # The statistics views as they were before loans and fines were
+    # aggregated separately, kept to measure against
+    FANOUT_MEMBER_STATS = """
+        SELECT m.member_id, m.first_name || ' ' || m.last_name AS member_name, m.membership_number,
+               m.membership_type, m.membership_date, m.status,
+               COUNT(DISTINCT bb.borrow_id) AS total_loans,
+               COUNT(DISTINCT CASE WHEN bb.status = 'Borrowed' THEN bb.borrow_id END) AS active_loans,
+               COUNT(DISTINCT CASE WHEN bb.status = 'Overdue' THEN bb.borrow_id END) AS overdue_loans,
+               COALESCE(SUM(f.amount), 0.00) AS total_fines,
+               COALESCE(SUM(CASE WHEN f.status = 'Pending' THEN f.amount ELSE 0 END), 0.00) AS pending_fines
+        FROM members m
+        LEFT JOIN borrowed_books bb ON m.member_id = bb.member_id
+        LEFT JOIN fines f ON m.member_id = f.member_id
+        GROUP BY m.member_id
+    """
+    FANOUT_BOOK_STATS = """
+        SELECT b.book_id, b.title, b.author, b.category, b.total_copies, b.available_copies,
+               COUNT(DISTINCT bb.borrow_id) AS times_borrowed,
+               COUNT(DISTINCT CASE WHEN bb.status = 'Borrowed' THEN bb.borrow_id END) AS currently_borrowed,
+               COUNT(DISTINCT CASE WHEN bb.status = 'Overdue' THEN bb.borrow_id END) AS currently_overdue
+        FROM books b
+        LEFT JOIN borrowed_books bb ON b.book_id = bb.book_id
+        GROUP BY b.book_id
+    """
+
+    def __init__(self, db, size, repeat=5, seed=42):
+        self.db = db
+        self.repo = LibraryRepository(db)
+        self.size = size
+        self.repeat = repeat
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def names(cls):
+        return [name[len("bench_"):] for name in vars(cls) if name.startswith("bench_")]
+
+    def run(self, only=None):
+        results = {}
+        for name in self.names():
+            if only and name not in only:
+                continue
+            started = time.perf_counter()
+            results[name] = getattr(self, "bench_" + name)()
+            results[name]["total_seconds"] = round(time.perf_counter() - started, 3)
+        return results
+
+    def bench_load_books(self):
+        middle = self.size // 2
+        return {
+            "count": timed(self.repo.count_books, self.repeat),
+            "first_page": timed(lambda: self.repo.page_books(None, 0, 100), self.repeat),
+            "keyset_page": timed(lambda: self.repo.page_books(middle, 0, 100), self.repeat),
+            "offset_jump": timed(lambda: self.repo.page_books(None, middle, 100), self.repeat),
+        }
+
+    def search_terms(self):
+        """Search terms by label, drawn from SyntheticLibrary.WORDS except no_match"""
+        return {
+            "common_word": "shadow",
+            "two_words": "silent garden",
+            "prefix": "shad",
+            "author": "garcia",
+            "isbn_prefix": f"978{self.size // 3:010d}"[:9],
+            "no_match": "zzzzzz",
+        }
+
+    def bench_search_books(self):
+        terms = self.search_terms()
+        results = {}
+        for label, term in terms.items():
+            results[label] = {
+                "count": timed(lambda: self.repo.count_search_books(term), self.repeat),
+                "first_page": timed(lambda: self.repo.search_books(term), self.repeat),
+            }
+
+        started = time.perf_counter()
+        index = CatalogueIndex(self.repo.iter_books())
+        results["local_index_build"] = throughput(len(index), time.perf_counter() - started)
+        results["local_index_search"] = timed(lambda: [index.search(term) for term in terms.values()],
+                                              self.repeat)
+        return results
+
+    def bench_filter_books(self):
+        filters = {
+            "available": lambda: BookFilter().status("available"),
+            "category": lambda: BookFilter().category("Fiction"),
+            "available_category": lambda: BookFilter().status("available").category("History"),
+            "overdue": lambda: BookFilter().status("overdue"),
+            "search_with_filter": lambda: BookFilter().status("available").category("Science"),
+        }
+        results = {}
+        for label, make in filters.items():
+            book_filter = make()
+            if label == "search_with_filter":
+                results[label] = timed(lambda: self.repo.search_books("shadow", filters=book_filter), self.repeat)
+                continue
+            results[label] = {
+                "count": timed(lambda: self.repo.count_books(book_filter), self.repeat),
+                "first_page": timed(lambda: self.repo.page_books(None, 0, 100, filters=book_filter), self.repeat),
+            }
+        return results
+
+    def bench_loans(self, operations=500):
+        candidates = self.repo.fetchall(
+            "SELECT book_id FROM books WHERE available_copies > 0 ORDER BY book_id LIMIT %s", [operations]
+        )
+        member_count = self.repo.count("members")
+        issued, failed = [], 0
+
+        started = time.perf_counter()
+        for (book_id,) in candidates:
+            try:
+                issued.append(self.repo.issue_loan(book_id, self.rng.randint(1, member_count)))
+            except LoanError:
+                failed += 1
+        issue = throughput(len(issued), time.perf_counter() - started)
+        issue["failed"] = failed
+
+        # Half back one at a time, half as one batch check-in
+        single, batch = issued[::2], issued[1::2]
+        started = time.perf_counter()
+        for borrow_id in single:
+            self.repo.return_loan(borrow_id)
+        returned = throughput(len(single), time.perf_counter() - started)
+
+        started = time.perf_counter()
+        self.repo.return_loans(batch)
+        return {"issue": issue, "return": returned,
+                "batch_return": throughput(len(batch), time.perf_counter() - started)}
+
+    def bench_fines(self):
+        started = time.perf_counter()
+        totals = OverdueMaintenance(self.db).run(restart=True)
+        result = throughput(totals["scanned"], time.perf_counter() - started)
+        result.update(marked_overdue=totals["marked"], fines_accrued=totals["fines"])
+
+        # What-if pass over every open loan: a grace period and a cap for everyone
+        engine = FineEngine(self.db)
+        what_if = {membership_type: (rate, 3, 1000) for membership_type, (rate, _, _) in engine.policies.items()}
+        started = time.perf_counter()
+        simulated = engine.simulate(what_if)
+        loans = sum(entry["loans"] for entry in simulated.values())
+        result["simulate"] = throughput(loans, time.perf_counter() - started)
+        result["simulate"]["numpy"] = HAS_NUMPY
+        return result
+
+    def bench_stats_views(self):
+        results = {}
+        for label, view, fanout, key, table in (
+            ("member_stats", "view_member_stats", self.FANOUT_MEMBER_STATS, "member_id", "members"),
+            ("book_stats", "view_book_stats", self.FANOUT_BOOK_STATS, "book_id", "books"),
+        ):
+            middle = [self.repo.count(table) // 2]
+            results[label] = {
+                "all_rows": timed(lambda: self.repo.fetchall(f"SELECT * FROM {view}"), self.repeat),
+                "all_rows_fanout": timed(lambda: self.repo.fetchall(fanout), self.repeat),
+                "one_row": timed(
+                    lambda: self.repo.fetchall(f"SELECT * FROM {view} WHERE {key} = %s", middle), self.repeat
+                ),
+                "one_row_fanout": timed(
+                    lambda: self.repo.fetchall(f"SELECT * FROM ({fanout}) s WHERE {key} = %s", middle),
+                    self.repeat
+                ),
+            }
+
+        # Every loan of a member repeats each of their fines in the old view
+        total_fines = "SELECT SUM(total_fines) FROM ({})"
+        results["member_stats"]["total_fines"] = float(
+            self.repo.fetchall(total_fines.format("SELECT * FROM view_member_stats"))[0][0] or 0
+        )
+        results["member_stats"]["total_fines_fanout"] = float(
+            self.repo.fetchall(total_fines.format(self.FANOUT_MEMBER_STATS))[0][0] or 0
+        )
+        return results
+
+    def bench_reports(self):
+        return {
+            "dashboard_stats": timed(self.repo.dashboard_stats, self.repeat),
+            "member_stats": timed(lambda: self.repo.fetchall("SELECT * FROM view_member_stats"), self.repeat),
+            "book_stats": timed(lambda: self.repo.fetchall("SELECT * FROM view_book_stats"), self.repeat),
+            "active_loans": timed(lambda: self.repo.page_loans("active"), self.repeat),
+        }
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1M' -> 1000000"""
+    text = text.strip().lower()
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def parse_fine_policy(text):
+    """'Student=0.25:3:10' -> ('Student', (25, 3, 1000)); grace and cap are optional"""
+    membership_type, _, terms = text.partition("=")
+    rate, grace_days, cap = (terms.split(":") + ["", ""])[:3]
+    return membership_type.strip(), (to_cents(rate), int(grace_days or 0), to_cents(cap) if cap else None)
+
+
+def import_main(argv=None):
+    """Command-line entry point for the bulk book import
+
+    Usage: python SmartlibraryLimkok.py import-books FILE.csv
+    [--batch-size N] [--rejects rejects.csv]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="SmartlibraryLimkok.py import-books",
+        description="Load a books CSV file into the catalogue, merging on ISBN."
+    )
+    parser.add_argument("file", help="CSV file with isbn, title, author and copies columns")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="rows per staged batch (default: 5000)")
+    parser.add_argument("--rejects", default=None,
+                        help="write rejected rows (line, reason) to this CSV file")
+    args = parser.parse_args(argv)
+
+    def progress(totals):
+        print(f"  {totals['read']:>10,} rows read  {totals['inserted']:>10,} inserted  "
+              f"{totals['updated']:>8,} updated  {totals['rejected']:>8,} rejected  "
+              f"{totals['rate']:>9,.0f} rows/s", flush=True)
+
+    db = get_database()
+    importer = BookImporter(db, batch_size=args.batch_size, on_progress=progress)
+    try:
+        with open(args.file, newline="", encoding="utf-8-sig") as lines:
+            totals = importer.run(lines)
+    except (OSError, ValueError) as error:
+        print(f"Import failed: {error}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+    if args.rejects and totals["rejected"]:
+        with open(args.rejects, "w", newline="", encoding="utf-8") as output:
+            writer = csv.writer(output)
+            writer.writerow(["line", "reason"])
+            writer.writerows(totals["rejected"])
+    print(f"Imported {args.file}: {totals['read']:,} rows read, {totals['inserted']:,} inserted, "
+          f"{totals['updated']:,} updated, {len(totals['rejected']):,} rejected "
+          f"({totals['rate']:,.0f} rows/s)")
+    for line_number, reason in totals["rejected"][:10]:
+        print(f"  line {line_number}: {reason}")
+    return 0
+
+
+def benchmark_main(argv=None):
+    """Command-line entry point for the benchmark harness
+
+    Usage: python SmartlibraryLimkok.py benchmark [--sizes 10k,100k,1M]
+    [--loans N] [--repeat N] [--only NAME ...] [--output results.json]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="SmartlibraryLimkok.py benchmark",
+        description="Benchmark catalogue, loan, fine and report hot paths on synthetic libraries."
+    )
+    parser.add_argument("--sizes", default="10k,100k,1M",
+                        help="comma-separated library sizes, books and members each (default: 10k,100k,1M)")
+    parser.add_argument("--loans", type=parse_size, default=None,
+                        help="loans in each library, e.g. 1M (default: half the library size)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per latency measurement (default: 5)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the synthetic data")
+    parser.add_argument("--only", nargs="+", choices=BenchmarkSuite.names(), help="run only these benchmarks")
+    parser.add_argument("--workdir", default=None, help="directory for the SQLite files (default: a temp dir)")
+    parser.add_argument("--output", default=None, help="write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "seed": args.seed,
+        "loans": args.loans,
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for size in (parse_size(text) for text in args.sizes.split(",")):
+            print(f"Generating synthetic library with {size:,} books and members...", file=sys.stderr, flush=True)
+            db = SQLiteDatabase(os.path.join(workdir, f"bench-{size}.db"), seed=False)
+            try:
+                started = time.perf_counter()
+                rows = SyntheticLibrary(size, seed=args.seed, loans=args.loans).populate(db)
+                db.pool.warm()
+                entry = {"rows": rows, "generate_seconds": round(time.perf_counter() - started, 3)}
+
+                print(f"Running benchmarks at {size:,}...", file=sys.stderr, flush=True)
+                entry["results"] = BenchmarkSuite(db, size, args.repeat, args.seed).run(args.only)
+                report["sizes"][str(size)] = entry
+            finally:
+                db.close()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
 # ============================================================================
 # MAIN FUNCTION AND APPLICATION LAUNCH
 # ============================================================================
@@ -2200,12 +7543,89 @@ def main():
     # Set window icon and title
     root.title(" Welcome to SmartLibrary Management System")
 
+    # Open the minimum number of pooled connections up front
+    db = get_database()
+    db.pool.warm()
+
     # Create and run application
     app = SmartLibraryApp(root)
 
     # Start main loop
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        app.fetcher.shutdown()
+        app.reports.invalidate()
+        app.settings.close()
+        db.close()
+
+
+def maintenance_main(argv=None):
+    """Command-line entry point for the overdue/fine maintenance job
+
+    Usage: python SmartlibraryLimkok.py maintenance [--as-of YYYY-MM-DD]
+    [--chunk-size N] [--restart] [--archive-before YYYY-MM-DD]
+    [--simulate TYPE=RATE[:GRACE[:CAP]] ...]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="SmartlibraryLimkok.py maintenance",
+        description="Mark overdue loans and accrue their fines in chunked batches, "
+                    "then archive old loan history."
+    )
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None,
+                        help="process loans due before this date (default: today)")
+    parser.add_argument("--chunk-size", type=int, default=5000,
+                        help="loans per transaction (default: 5000)")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore the checkpoint of an unfinished run for the same date")
+    parser.add_argument("--archive-before", type=date.fromisoformat, default=None,
+                        help="move returned loans and activity older than this date to the archive")
+    parser.add_argument("--simulate", nargs="+", type=parse_fine_policy, metavar="TYPE=RATE[:GRACE[:CAP]]",
+                        help="only report the fines open loans would accrue under these policies, "
+                             "e.g. Student=0.25:3:10 (nothing is written)")
+    args = parser.parse_args(argv)
+
+    db = get_database()
+    if args.simulate:
+        try:
+            totals = FineEngine(db).simulate(dict(args.simulate), as_of=args.as_of)
+        finally:
+            db.close()
+        print(f"{'Membership':<12}{'Overdue':>10}{'Fined':>10}{'Current':>14}{'Simulated':>14}{'Change':>14}")
+        for membership_type, entry in sorted(totals.items(), key=lambda item: str(item[0])):
+            change = entry["simulated"] - entry["current"]
+            print(f"{str(membership_type):<12}{entry['loans']:>10,}{entry['fined']:>10,}"
+                  f"{format_money(entry['current'] / 100):>14}{format_money(entry['simulated'] / 100):>14}"
+                  f"{('-' if change < 0 else '+') + format_money(abs(change) / 100):>14}")
+        return 0
+
+    def progress(totals):
+        print(f"  {totals['scanned']:>10,} loans scanned  {totals['marked']:>8,} marked overdue  "
+              f"{totals['fines']:>8,} fines  {totals['rate']:>9,.0f} loans/s", flush=True)
+
+    job = OverdueMaintenance(db, chunk_size=args.chunk_size, on_progress=progress)
+    try:
+        totals = job.run(as_of=args.as_of, restart=args.restart)
+        archived = HistoryArchive(db).run(args.archive_before)
+    finally:
+        db.close()
+
+    if totals["resumed"]:
+        print(f"Resumed the unfinished run for {totals['as_of']}")
+    print(f"Maintenance for {totals['as_of']} complete: {totals['scanned']:,} loans scanned, "
+          f"{totals['marked']:,} marked overdue, {totals['fines']:,} fines accrued")
+    if args.archive_before is not None:
+        print(f"Archived {archived:,} returned loans from before {args.archive_before}")
+    return 0
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "maintenance":
+        sys.exit(maintenance_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        sys.exit(benchmark_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "import-books":
+        sys.exit(import_main(sys.argv[2:]))
     main()
\ No newline at end of file
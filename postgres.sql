@@ -12,6 +12,9 @@
 -- Enable UUID extension (optional)
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
+-- Trigram matching for catalogue search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ============================================================================
 -- CORE TABLES
 -- ============================================================================
@@ -29,6 +32,9 @@ CREATE TABLE IF NOT EXISTS books (
     available_copies INTEGER DEFAULT 1,
     location_code VARCHAR(50),
     description TEXT,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('simple', COALESCE(title, '') || ' ' || COALESCE(author, ''))
+    ) STORED,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT positive_copies CHECK (total_copies >= 0 AND available_copies >= 0)
@@ -39,6 +45,34 @@ CREATE INDEX IF NOT EXISTS idx_books_title ON books(title);
 CREATE INDEX IF NOT EXISTS idx_books_author ON books(author);
 CREATE INDEX IF NOT EXISTS idx_books_category ON books(category);
 CREATE INDEX IF NOT EXISTS idx_books_isbn ON books(isbn);
+CREATE INDEX IF NOT EXISTS idx_books_available ON books(book_id) WHERE available_copies > 0;
+
+-- ISBNs are stored as digits and X only, the form scans and imports are
+-- matched in; rewrite ones entered with hyphens or spaces. A row whose
+-- normalized ISBN is already taken (or taken by an earlier row) is left as is
+UPDATE books b SET isbn = n.isbn
+FROM (
+    SELECT DISTINCT ON (regexp_replace(upper(isbn), '[^0-9X]', '', 'g'))
+           book_id, regexp_replace(upper(isbn), '[^0-9X]', '', 'g') AS isbn
+    FROM books
+    WHERE isbn ~ '[^0-9X]'
+    ORDER BY regexp_replace(upper(isbn), '[^0-9X]', '', 'g'), book_id
+) n
+WHERE b.book_id = n.book_id
+  AND n.isbn <> ''
+  AND NOT EXISTS (SELECT 1 FROM books o WHERE o.isbn = n.isbn);
+
+-- Search indexes: word/prefix matches on search_vector, substring and
+-- similarity matches on title/author through pg_trgm, ISBN prefix matches
+CREATE INDEX IF NOT EXISTS idx_books_search_vector ON books USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_books_title_trgm ON books USING GIN (title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_books_author_trgm ON books USING GIN (author gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_books_isbn_prefix ON books(isbn varchar_pattern_ops);
+-- Case-insensitive prefix indexes for the type-ahead book picker
+-- (lower(col) LIKE 'abc%'); they replace the case-sensitive title one
+DROP INDEX IF EXISTS idx_books_title_prefix;
+CREATE INDEX IF NOT EXISTS idx_books_isbn_lower ON books(lower(isbn) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_books_title_lower ON books(lower(title) text_pattern_ops);
 
 -- 2. Members Table
 CREATE TABLE IF NOT EXISTS members (
@@ -63,6 +97,18 @@ CREATE INDEX IF NOT EXISTS idx_members_name ON members(first_name, last_name);
 CREATE INDEX IF NOT EXISTS idx_members_email ON members(email);
 CREATE INDEX IF NOT EXISTS idx_members_membership_number ON members(membership_number);
 CREATE INDEX IF NOT EXISTS idx_members_status ON members(status);
+-- Case-insensitive prefix indexes for the type-ahead member picker
+-- (lower(col) LIKE 'abc%'); they replace the case-sensitive *_prefix ones
+DROP INDEX IF EXISTS idx_members_name_prefix;
+DROP INDEX IF EXISTS idx_members_last_name_prefix;
+DROP INDEX IF EXISTS idx_members_email_prefix;
+DROP INDEX IF EXISTS idx_members_membership_number_prefix;
+CREATE INDEX IF NOT EXISTS idx_members_name_lower
+    ON members(lower(first_name) text_pattern_ops, lower(last_name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_members_last_name_lower ON members(lower(last_name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_members_email_lower ON members(lower(email) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_members_membership_number_lower
+    ON members(lower(membership_number) text_pattern_ops);
 
 -- 3. Users Table (Library Staff/Admin)
 CREATE TABLE IF NOT EXISTS users (
@@ -82,9 +128,44 @@ CREATE TABLE IF NOT EXISTS users (
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
 
+-- Installations from before partitioning have plain borrowed_books and
+-- activity_log tables: move them aside, with their indexes and id sequences
+-- (the partitioned tables reuse those names). MIGRATE UNPARTITIONED HISTORY
+-- below copies their rows across and drops them.
+DO $$
+DECLARE
+    v_table TEXT;
+    v_index RECORD;
+    v_sequence TEXT;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['borrowed_books', 'activity_log'] LOOP
+        CONTINUE WHEN to_regclass(v_table) IS NULL OR EXISTS (
+            SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(v_table)
+        );
+        FOR v_index IN
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(v_table)
+        LOOP
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', v_index.relname, left('unpartitioned_' || v_index.relname, 63));
+        END LOOP;
+        v_sequence := pg_get_serial_sequence(v_table, CASE v_table WHEN 'borrowed_books' THEN 'borrow_id' ELSE 'log_id' END);
+        IF v_sequence IS NOT NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s RENAME TO %I', v_sequence, v_table || '_unpartitioned_id_seq');
+        END IF;
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', v_table, v_table || '_unpartitioned');
+    END LOOP;
+END;
+$$;
+
 -- 4. Borrowed Books Table
+-- Range-partitioned by borrow_date into yearly partitions (see
+-- create_history_partitions below), so loan history can be archived a year
+-- at a time and the open-loan indexes stay small. The partition key has to be
+-- part of the primary key.
 CREATE TABLE IF NOT EXISTS borrowed_books (
-    borrow_id SERIAL PRIMARY KEY,
+    borrow_id SERIAL,
     book_id INTEGER NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
     member_id INTEGER NOT NULL REFERENCES members(member_id) ON DELETE CASCADE,
     borrowed_by INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
@@ -98,22 +179,48 @@ CREATE TABLE IF NOT EXISTS borrowed_books (
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (borrow_id, borrow_date),
     CONSTRAINT valid_status_borrowed CHECK (status IN ('Borrowed', 'Returned', 'Overdue', 'Lost')),
-    CONSTRAINT dates_check CHECK (due_date >= borrow_date AND (return_date IS NULL OR return_date >= borrow_date)),
-    CONSTRAINT unique_active_borrow UNIQUE(book_id, member_id) WHERE status = 'Borrowed'
-);
+    CONSTRAINT dates_check CHECK (due_date >= borrow_date AND (return_date IS NULL OR return_date >= borrow_date))
+) PARTITION BY RANGE (borrow_date);
+
+-- Loans outside every yearly partition
+CREATE TABLE IF NOT EXISTS borrowed_books_default PARTITION OF borrowed_books DEFAULT;
 
 -- Create indexes for borrowed_books
-CREATE INDEX IF NOT EXISTS idx_borrowed_books_book_id ON borrowed_books(book_id);
-CREATE INDEX IF NOT EXISTS idx_borrowed_books_member_id ON borrowed_books(member_id);
+-- (unique indexes on a partitioned table must include borrow_date, so one
+-- active loan per book and member is enforced by borrow_book, which locks
+-- the book row before checking)
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_active_pair ON borrowed_books(book_id, member_id) WHERE status = 'Borrowed';
+-- Per-member and per-book counts by status for the statistics views
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_book_status ON borrowed_books(book_id, status);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_member_status ON borrowed_books(member_id, status);
 CREATE INDEX IF NOT EXISTS idx_borrowed_books_due_date ON borrowed_books(due_date);
+-- Open-loan slice of the due-date index, walked by the overdue maintenance job
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_open_due
+    ON borrowed_books(due_date, borrow_id) WHERE status IN ('Borrowed', 'Overdue');
 CREATE INDEX IF NOT EXISTS idx_borrowed_books_status ON borrowed_books(status);
 CREATE INDEX IF NOT EXISTS idx_borrowed_books_dates ON borrowed_books(borrow_date, due_date, return_date);
+-- Loan history by status, paged newest first by (borrow_date, borrow_id)
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_history
+    ON borrowed_books(status, borrow_date, borrow_id);
+
+-- Cold loan history: yearly partitions detached from borrowed_books by
+-- archive_history once they hold no open loans
+CREATE TABLE IF NOT EXISTS borrowed_books_archive (LIKE borrowed_books)
+    PARTITION BY RANGE (borrow_date);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_archive_history
+    ON borrowed_books_archive(status, borrow_date, borrow_id);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_archive_borrow_id ON borrowed_books_archive(borrow_id);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_archive_book_id ON borrowed_books_archive(book_id);
+CREATE INDEX IF NOT EXISTS idx_borrowed_books_archive_member_id ON borrowed_books_archive(member_id);
 
 -- 5. Fines Table
 CREATE TABLE IF NOT EXISTS fines (
     fine_id SERIAL PRIMARY KEY,
-    borrow_id INTEGER REFERENCES borrowed_books(borrow_id) ON DELETE SET NULL,
+    -- loan id, live or archived (no foreign key: borrowed_books is partitioned
+    -- and archived loans leave it)
+    borrow_id INTEGER,
     member_id INTEGER NOT NULL REFERENCES members(member_id) ON DELETE CASCADE,
     amount DECIMAL(10,2) NOT NULL DEFAULT 0.00,
     reason VARCHAR(255),
@@ -133,17 +240,21 @@ CREATE TABLE IF NOT EXISTS fines (
 );
 
 -- Create indexes for fines
-CREATE INDEX IF NOT EXISTS idx_fines_member_id ON fines(member_id);
+CREATE INDEX IF NOT EXISTS idx_fines_member_status ON fines(member_id, status) INCLUDE (amount);
+CREATE INDEX IF NOT EXISTS idx_fines_borrow_id ON fines(borrow_id);
 CREATE INDEX IF NOT EXISTS idx_fines_status ON fines(status);
 CREATE INDEX IF NOT EXISTS idx_fines_due_date ON fines(due_date);
+CREATE INDEX IF NOT EXISTS idx_fines_fine_date ON fines(fine_date, fine_id);
 
 -- ============================================================================
 -- AUDIT/LOG TABLES
 -- ============================================================================
 
 -- 6. Activity Log Table
+-- Range-partitioned by created_at into monthly partitions, archived the same
+-- way as borrowed_books
 CREATE TABLE IF NOT EXISTS activity_log (
-    log_id SERIAL PRIMARY KEY,
+    log_id SERIAL,
     user_id INTEGER REFERENCES users(user_id) ON DELETE SET NULL,
     member_id INTEGER REFERENCES members(member_id) ON DELETE SET NULL,
     action_type VARCHAR(50) NOT NULL,
@@ -152,14 +263,20 @@ CREATE TABLE IF NOT EXISTS activity_log (
     description TEXT,
     ip_address INET,
     user_agent TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (log_id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS activity_log_default PARTITION OF activity_log DEFAULT;
 
 -- Create indexes for activity_log
 CREATE INDEX IF NOT EXISTS idx_activity_log_user_id ON activity_log(user_id);
 CREATE INDEX IF NOT EXISTS idx_activity_log_created_at ON activity_log(created_at);
 CREATE INDEX IF NOT EXISTS idx_activity_log_action_type ON activity_log(action_type);
 
+CREATE TABLE IF NOT EXISTS activity_log_archive (LIKE activity_log)
+    PARTITION BY RANGE (created_at);
+
 -- 7. System Settings Table
 CREATE TABLE IF NOT EXISTS system_settings (
     setting_id SERIAL PRIMARY KEY,
@@ -171,6 +288,166 @@ CREATE TABLE IF NOT EXISTS system_settings (
     updated_by INTEGER REFERENCES users(user_id)
 );
 
+-- 8. Library Statistics Table
+-- Dashboard counters, kept current by the trg_*_stats triggers below so the
+-- dashboard reads six primary-key rows instead of aggregating the tables.
+CREATE TABLE IF NOT EXISTS library_stats (
+    stat_key VARCHAR(50) PRIMARY KEY,
+    stat_value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 9. Maintenance Runs Table
+-- Checkpoint of each batch job: the last (due_date, borrow_id) processed for
+-- the run's as-of date, so an interrupted run resumes instead of restarting.
+CREATE TABLE IF NOT EXISTS maintenance_runs (
+    job_name VARCHAR(50) PRIMARY KEY,
+    as_of DATE NOT NULL,
+    last_due_date DATE,
+    last_borrow_id INTEGER,
+    loans_scanned BIGINT DEFAULT 0,
+    loans_marked BIGINT DEFAULT 0,
+    fines_accrued BIGINT DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+
+-- 10. Fine Policies Table
+-- Overdue fine terms per membership type: a NULL rate_per_day means the
+-- fine_per_day setting, a NULL max_fine means no cap.
+CREATE TABLE IF NOT EXISTS fine_policies (
+    membership_type VARCHAR(20) PRIMARY KEY,
+    rate_per_day DECIMAL(10,2),
+    grace_days INTEGER NOT NULL DEFAULT 0,
+    max_fine DECIMAL(10,2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT valid_grace_days CHECK (grace_days >= 0)
+);
+
+INSERT INTO fine_policies (membership_type) VALUES ('Standard'), ('Premium'), ('Student')
+ON CONFLICT (membership_type) DO NOTHING;
+
+-- Fine policies with the fine_per_day fallback resolved
+CREATE OR REPLACE VIEW view_fine_policies AS
+SELECT
+    p.membership_type,
+    COALESCE(
+        p.rate_per_day,
+        (SELECT CAST(setting_value AS DECIMAL(10,2)) FROM system_settings WHERE setting_key = 'fine_per_day'),
+        0.50
+    ) AS rate_per_day,
+    p.grace_days,
+    p.max_fine
+FROM fine_policies p;
+
+-- Fine for a loan days_overdue days late under the membership type's policy
+CREATE OR REPLACE FUNCTION overdue_fine(p_membership_type VARCHAR, p_days_overdue INTEGER)
+RETURNS DECIMAL AS $$
+    SELECT COALESCE((
+        SELECT LEAST(GREATEST(0, p_days_overdue - p.grace_days) * p.rate_per_day, p.max_fine)
+        FROM view_fine_policies p
+        WHERE p.membership_type = p_membership_type
+    ), 0.00);
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- HISTORY PARTITIONS
+-- ============================================================================
+
+-- Function to create the yearly borrowed_books and monthly activity_log
+-- partitions covering p_from .. p_through. Run ahead of time (the
+-- maintenance job does so for the coming year): a partition cannot be
+-- created once the default partition holds rows in its range.
+CREATE OR REPLACE FUNCTION create_history_partitions(p_from DATE, p_through DATE)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_start DATE;
+BEGIN
+    v_start := date_trunc('year', p_from)::date;
+    WHILE v_start <= p_through LOOP
+        IF to_regclass('borrowed_books_y' || to_char(v_start, 'YYYY')) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF borrowed_books FOR VALUES FROM (%L) TO (%L)',
+                'borrowed_books_y' || to_char(v_start, 'YYYY'),
+                v_start, (v_start + INTERVAL '1 year')::date);
+        END IF;
+        v_start := (v_start + INTERVAL '1 year')::date;
+    END LOOP;
+
+    v_start := date_trunc('month', p_from)::date;
+    WHILE v_start <= p_through LOOP
+        IF to_regclass('activity_log_y' || to_char(v_start, 'YYYY"m"MM')) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF activity_log FOR VALUES FROM (%L) TO (%L)',
+                'activity_log_y' || to_char(v_start, 'YYYY"m"MM'),
+                v_start, (v_start + INTERVAL '1 month')::date);
+        END IF;
+        v_start := (v_start + INTERVAL '1 month')::date;
+    END LOOP;
+END;
+$$;
+
+-- ============================================================================
+-- MIGRATE UNPARTITIONED HISTORY
+-- ============================================================================
+
+-- Copy the rows of the tables moved aside above into the partitioned tables
+-- and drop the old tables. The partitions the rows fall in are created first:
+-- rows left in a default partition would stop them being created later. This
+-- runs before the triggers below exist, so copied loans do not change book
+-- availability again. CASCADE also drops the old fines foreign key (fines no
+-- longer has one) and the views on the old tables, which are recreated below.
+DO $$
+DECLARE
+    v_from DATE := CURRENT_DATE;
+    v_through DATE := CURRENT_DATE;
+BEGIN
+    IF to_regclass('borrowed_books_unpartitioned') IS NULL AND to_regclass('activity_log_unpartitioned') IS NULL THEN
+        RETURN;
+    END IF;
+
+    IF to_regclass('borrowed_books_unpartitioned') IS NOT NULL THEN
+        SELECT LEAST(v_from, MIN(borrow_date)), GREATEST(v_through, MAX(borrow_date))
+        INTO v_from, v_through
+        FROM borrowed_books_unpartitioned;
+    END IF;
+    IF to_regclass('activity_log_unpartitioned') IS NOT NULL THEN
+        SELECT LEAST(v_from, MIN(created_at)::date), GREATEST(v_through, MAX(created_at)::date)
+        INTO v_from, v_through
+        FROM activity_log_unpartitioned;
+    END IF;
+    PERFORM create_history_partitions(v_from, v_through);
+
+    IF to_regclass('borrowed_books_unpartitioned') IS NOT NULL THEN
+        INSERT INTO borrowed_books (
+            borrow_id, book_id, member_id, borrowed_by, borrow_date, due_date, return_date,
+            actual_return_date, condition_before, condition_after, status, notes, created_at, updated_at
+        )
+        SELECT borrow_id, book_id, member_id, borrowed_by, borrow_date, due_date, return_date,
+            actual_return_date, condition_before, condition_after, status, notes, created_at, updated_at
+        FROM borrowed_books_unpartitioned;
+        PERFORM setval(pg_get_serial_sequence('borrowed_books', 'borrow_id'),
+                       COALESCE((SELECT MAX(borrow_id) FROM borrowed_books), 0) + 1, false);
+        DROP TABLE borrowed_books_unpartitioned CASCADE;
+    END IF;
+
+    IF to_regclass('activity_log_unpartitioned') IS NOT NULL THEN
+        INSERT INTO activity_log (
+            log_id, user_id, member_id, action_type, table_name, record_id, description,
+            ip_address, user_agent, created_at
+        )
+        SELECT log_id, user_id, member_id, action_type, table_name, record_id, description,
+            ip_address, user_agent, COALESCE(created_at, CURRENT_TIMESTAMP)
+        FROM activity_log_unpartitioned;
+        PERFORM setval(pg_get_serial_sequence('activity_log', 'log_id'),
+                       COALESCE((SELECT MAX(log_id) FROM activity_log), 0) + 1, false);
+        DROP TABLE activity_log_unpartitioned CASCADE;
+    END IF;
+END;
+$$;
+
 -- ============================================================================
 -- VIEWS FOR REPORTING
 -- ============================================================================
@@ -191,7 +468,7 @@ SELECT
         ELSE 0
     END AS days_overdue,
     CASE 
-        WHEN bb.due_date < CURRENT_DATE THEN (CURRENT_DATE - bb.due_date) * 0.50
+        WHEN bb.due_date < CURRENT_DATE THEN overdue_fine(m.membership_type, CURRENT_DATE - bb.due_date)
         ELSE 0.00
     END AS calculated_fine
 FROM borrowed_books bb
@@ -199,7 +476,16 @@ JOIN books b ON bb.book_id = b.book_id
 JOIN members m ON bb.member_id = m.member_id
 WHERE bb.status IN ('Borrowed', 'Overdue');
 
--- View for member statistics
+-- View for loan history: live and archived loans. Ordered, limited scans
+-- over it merge the two history indexes instead of reading either table.
+CREATE OR REPLACE VIEW loan_history AS
+SELECT * FROM borrowed_books
+UNION ALL
+SELECT * FROM borrowed_books_archive;
+
+-- View for member statistics. Loans and fines are aggregated per member
+-- before the join, so neither multiplies the other's rows; a filter on
+-- member_id is pushed down into both aggregates.
 CREATE OR REPLACE VIEW view_member_stats AS
 SELECT 
     m.member_id,
@@ -208,17 +494,31 @@ SELECT
     m.membership_type,
     m.membership_date,
     m.status,
-    COUNT(DISTINCT bb.borrow_id) AS total_loans,
-    COUNT(DISTINCT CASE WHEN bb.status = 'Borrowed' THEN bb.borrow_id END) AS active_loans,
-    COUNT(DISTINCT CASE WHEN bb.status = 'Overdue' THEN bb.borrow_id END) AS overdue_loans,
-    COALESCE(SUM(f.amount), 0.00) AS total_fines,
-    COALESCE(SUM(CASE WHEN f.status = 'Pending' THEN f.amount ELSE 0 END), 0.00) AS pending_fines
+    COALESCE(l.total_loans, 0) AS total_loans,
+    COALESCE(l.active_loans, 0) AS active_loans,
+    COALESCE(l.overdue_loans, 0) AS overdue_loans,
+    COALESCE(f.total_fines, 0.00) AS total_fines,
+    COALESCE(f.pending_fines, 0.00) AS pending_fines
 FROM members m
-LEFT JOIN borrowed_books bb ON m.member_id = bb.member_id
-LEFT JOIN fines f ON m.member_id = f.member_id
-GROUP BY m.member_id;
+LEFT JOIN (
+    SELECT
+        member_id,
+        COUNT(*) AS total_loans,
+        COUNT(*) FILTER (WHERE status = 'Borrowed') AS active_loans,
+        COUNT(*) FILTER (WHERE status = 'Overdue') AS overdue_loans
+    FROM loan_history
+    GROUP BY member_id
+) l ON l.member_id = m.member_id
+LEFT JOIN (
+    SELECT
+        member_id,
+        SUM(amount) AS total_fines,
+        SUM(amount) FILTER (WHERE status = 'Pending') AS pending_fines
+    FROM fines
+    GROUP BY member_id
+) f ON f.member_id = m.member_id;
 
--- View for book statistics
+-- View for book statistics, aggregated the same way
 CREATE OR REPLACE VIEW view_book_stats AS
 SELECT 
     b.book_id,
@@ -227,12 +527,19 @@ SELECT
     b.category,
     b.total_copies,
     b.available_copies,
-    COUNT(DISTINCT bb.borrow_id) AS times_borrowed,
-    COUNT(DISTINCT CASE WHEN bb.status = 'Borrowed' THEN bb.borrow_id END) AS currently_borrowed,
-    COUNT(DISTINCT CASE WHEN bb.status = 'Overdue' THEN bb.borrow_id END) AS currently_overdue
+    COALESCE(l.times_borrowed, 0) AS times_borrowed,
+    COALESCE(l.currently_borrowed, 0) AS currently_borrowed,
+    COALESCE(l.currently_overdue, 0) AS currently_overdue
 FROM books b
-LEFT JOIN borrowed_books bb ON b.book_id = bb.book_id
-GROUP BY b.book_id;
+LEFT JOIN (
+    SELECT
+        book_id,
+        COUNT(*) AS times_borrowed,
+        COUNT(*) FILTER (WHERE status = 'Borrowed') AS currently_borrowed,
+        COUNT(*) FILTER (WHERE status = 'Overdue') AS currently_overdue
+    FROM loan_history
+    GROUP BY book_id
+) l ON l.book_id = b.book_id;
 
 -- ============================================================================
 -- FUNCTIONS AND TRIGGERS
@@ -247,7 +554,7 @@ BEGIN
         SET available_copies = available_copies - 1
         WHERE book_id = NEW.book_id;
     ELSIF TG_OP = 'UPDATE' THEN
-        IF OLD.status = 'Borrowed' AND NEW.status = 'Returned' THEN
+        IF OLD.status IN ('Borrowed', 'Overdue') AND NEW.status = 'Returned' THEN
             UPDATE books 
             SET available_copies = available_copies + 1
             WHERE book_id = NEW.book_id;
@@ -262,9 +569,11 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Trigger for book availability
+-- Skipped inside return_books, which adjusts the copies of a batch at once
 CREATE OR REPLACE TRIGGER trg_book_availability
 AFTER INSERT OR UPDATE ON borrowed_books
 FOR EACH ROW
+WHEN (current_setting('smartlibrary.set_based_return', true) IS DISTINCT FROM 'on')
 EXECUTE FUNCTION update_book_availability();
 
 -- Function to update overdue status
@@ -279,8 +588,10 @@ END;
 $$ LANGUAGE plpgsql;
 
 -- Trigger for overdue status
+-- Only new loans are checked here; loans falling due later are marked by the
+-- set-based overdue maintenance job (python SmartlibraryLimkok.py maintenance)
 CREATE OR REPLACE TRIGGER trg_overdue_status
-BEFORE INSERT OR UPDATE ON borrowed_books
+BEFORE INSERT ON borrowed_books
 FOR EACH ROW
 EXECUTE FUNCTION update_overdue_status();
 
@@ -293,23 +604,32 @@ DECLARE
 BEGIN
     IF NEW.status = 'Returned' AND OLD.status IN ('Borrowed', 'Overdue') THEN
         days_overdue := GREATEST(0, NEW.actual_return_date - OLD.due_date);
-        IF days_overdue > 0 THEN
-            fine_amount := days_overdue * 0.50; -- $0.50 per day
-            INSERT INTO fines (borrow_id, member_id, amount, reason, due_date)
-            VALUES (NEW.borrow_id, NEW.member_id, fine_amount, 
-                   'Overdue fine: ' || days_overdue || ' days', 
-                   CURRENT_DATE + INTERVAL '7 days');
+        fine_amount := overdue_fine(
+            (SELECT membership_type FROM members WHERE member_id = NEW.member_id), days_overdue
+        );
+        IF fine_amount > 0 THEN
+            -- Settle the fine the maintenance job has been accruing, if any
+            UPDATE fines
+            SET amount = fine_amount, reason = 'Overdue fine: ' || days_overdue || ' days'
+            WHERE borrow_id = NEW.borrow_id AND status = 'Pending';
+            IF NOT FOUND AND NOT EXISTS (SELECT 1 FROM fines WHERE borrow_id = NEW.borrow_id) THEN
+                INSERT INTO fines (borrow_id, member_id, amount, reason, due_date)
+                VALUES (NEW.borrow_id, NEW.member_id, fine_amount, 
+                       'Overdue fine: ' || days_overdue || ' days', 
+                       CURRENT_DATE + INTERVAL '7 days');
+            END IF;
         END IF;
     END IF;
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger for auto-generating fines
+-- Trigger for auto-generating fines (return_books fines its batch itself)
 CREATE OR REPLACE TRIGGER trg_generate_fines
 AFTER UPDATE ON borrowed_books
 FOR EACH ROW
-WHEN (OLD.status IN ('Borrowed', 'Overdue') AND NEW.status = 'Returned')
+WHEN (OLD.status IN ('Borrowed', 'Overdue') AND NEW.status = 'Returned'
+      AND current_setting('smartlibrary.set_based_return', true) IS DISTINCT FROM 'on')
 EXECUTE FUNCTION generate_overdue_fines();
 
 -- Function to update timestamps
@@ -347,6 +667,133 @@ BEFORE UPDATE ON fines
 FOR EACH ROW
 EXECUTE FUNCTION update_timestamp();
 
+-- Function to apply a delta to one library_stats counter
+CREATE OR REPLACE FUNCTION adjust_library_stat(p_stat_key VARCHAR, p_delta BIGINT)
+RETURNS VOID AS $$
+BEGIN
+    IF p_delta <> 0 THEN
+        UPDATE library_stats
+        SET stat_value = stat_value + p_delta, updated_at = CURRENT_TIMESTAMP
+        WHERE stat_key = p_stat_key;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Functions keeping library_stats in step with each table: every row change
+-- subtracts the old row's contribution and adds the new row's
+CREATE OR REPLACE FUNCTION update_book_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_total BIGINT := 0;
+    d_available BIGINT := 0;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        d_total := d_total - 1;
+        d_available := d_available - (OLD.available_copies > 0)::INTEGER;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        d_total := d_total + 1;
+        d_available := d_available + (NEW.available_copies > 0)::INTEGER;
+    END IF;
+    PERFORM adjust_library_stat('total_books', d_total);
+    PERFORM adjust_library_stat('available_books', d_available);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_loan_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_active BIGINT := 0;
+    d_overdue BIGINT := 0;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        d_active := d_active - (OLD.status = 'Borrowed')::INTEGER;
+        d_overdue := d_overdue - (OLD.status = 'Overdue')::INTEGER;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        d_active := d_active + (NEW.status = 'Borrowed')::INTEGER;
+        d_overdue := d_overdue + (NEW.status = 'Overdue')::INTEGER;
+    END IF;
+    PERFORM adjust_library_stat('active_loans', d_active);
+    PERFORM adjust_library_stat('overdue_loans', d_overdue);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_member_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_active BIGINT := 0;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        d_active := d_active - (OLD.status = 'Active')::INTEGER;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        d_active := d_active + (NEW.status = 'Active')::INTEGER;
+    END IF;
+    PERFORM adjust_library_stat('active_members', d_active);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_fine_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    d_pending BIGINT := 0;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        d_pending := d_pending - (OLD.status = 'Pending')::INTEGER;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        d_pending := d_pending + (NEW.status = 'Pending')::INTEGER;
+    END IF;
+    PERFORM adjust_library_stat('pending_fines', d_pending);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Triggers for library statistics
+CREATE OR REPLACE TRIGGER trg_books_stats
+AFTER INSERT OR DELETE OR UPDATE OF available_copies ON books
+FOR EACH ROW
+EXECUTE FUNCTION update_book_stats();
+
+CREATE OR REPLACE TRIGGER trg_borrowed_books_stats
+AFTER INSERT OR DELETE OR UPDATE OF status ON borrowed_books
+FOR EACH ROW
+EXECUTE FUNCTION update_loan_stats();
+
+CREATE OR REPLACE TRIGGER trg_members_stats
+AFTER INSERT OR DELETE OR UPDATE OF status ON members
+FOR EACH ROW
+EXECUTE FUNCTION update_member_stats();
+
+CREATE OR REPLACE TRIGGER trg_fines_stats
+AFTER INSERT OR DELETE OR UPDATE OF status ON fines
+FOR EACH ROW
+EXECUTE FUNCTION update_fine_stats();
+
+-- Settings changes are announced on the smartlibrary_settings channel; the
+-- application's settings cache LISTENs and reloads (delivered on commit)
+CREATE OR REPLACE FUNCTION notify_settings_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('smartlibrary_settings', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER trg_system_settings_notify
+AFTER INSERT OR UPDATE OR DELETE ON system_settings
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_settings_changed();
+
+CREATE OR REPLACE TRIGGER trg_fine_policies_notify
+AFTER INSERT OR UPDATE OR DELETE ON fine_policies
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_settings_changed();
+
 -- ============================================================================
 -- STORED PROCEDURES
 -- ============================================================================
@@ -363,9 +810,11 @@ AS $$
 DECLARE
     v_available_copies INTEGER;
 BEGIN
-    -- Check book availability
+    -- Check book availability (locking the book serialises concurrent
+    -- borrows of it, which keeps the duplicate-loan check below race free)
     SELECT available_copies INTO v_available_copies
-    FROM books WHERE book_id = p_book_id;
+    FROM books WHERE book_id = p_book_id
+    FOR UPDATE;
     
     IF v_available_copies <= 0 THEN
         RAISE EXCEPTION 'Book is not available for borrowing';
@@ -426,7 +875,12 @@ BEGIN
         actual_return_date = CURRENT_DATE,
         condition_after = p_condition_after,
         notes = COALESCE(p_notes, notes)
-    WHERE borrow_id = p_borrow_id;
+    WHERE borrow_id = p_borrow_id
+    AND status IN ('Borrowed', 'Overdue');
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Book is not on loan';
+    END IF;
     
     -- Log activity
     INSERT INTO activity_log (user_id, member_id, action_type, table_name, record_id, description)
@@ -435,6 +889,68 @@ BEGIN
 END;
 $$;
 
+-- Procedure to return many books at once (book drop, circulation desk)
+-- One statement returns every open loan in p_borrow_ids, puts the copies
+-- back with one grouped UPDATE of books, settles or opens the overdue fines
+-- as trg_generate_fines would and logs the returns; the per-row availability
+-- and fine triggers stand down meanwhile. p_returned gets the IDs returned.
+CREATE OR REPLACE PROCEDURE return_books(
+    p_borrow_ids INTEGER[],
+    p_returned_by INTEGER,
+    p_condition_after VARCHAR DEFAULT 'Good',
+    INOUT p_returned INTEGER[] DEFAULT NULL
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM set_config('smartlibrary.set_based_return', 'on', true);
+
+    WITH returned AS (
+        UPDATE borrowed_books
+        SET status = 'Returned',
+            return_date = CURRENT_DATE,
+            actual_return_date = CURRENT_DATE,
+            condition_after = p_condition_after
+        WHERE borrow_id = ANY(p_borrow_ids)
+        AND status IN ('Borrowed', 'Overdue')
+        RETURNING borrow_id, book_id, member_id, GREATEST(0, CURRENT_DATE - due_date) AS days_overdue
+    ), fined AS (
+        SELECT r.borrow_id, r.member_id, r.days_overdue, overdue_fine(m.membership_type, r.days_overdue) AS amount
+        FROM returned r
+        JOIN members m ON m.member_id = r.member_id
+    ), copies AS (
+        UPDATE books
+        SET available_copies = books.available_copies + r.copies
+        FROM (SELECT book_id, COUNT(*) AS copies FROM returned GROUP BY book_id) r
+        WHERE books.book_id = r.book_id
+    ), settled AS (
+        UPDATE fines
+        SET amount = f.amount,
+            reason = 'Overdue fine: ' || f.days_overdue || ' days'
+        FROM fined f
+        WHERE fines.borrow_id = f.borrow_id
+        AND fines.status = 'Pending'
+        AND f.amount > 0
+    ), opened AS (
+        INSERT INTO fines (borrow_id, member_id, amount, reason, due_date)
+        SELECT r.borrow_id, r.member_id, r.amount,
+               'Overdue fine: ' || r.days_overdue || ' days',
+               CURRENT_DATE + INTERVAL '7 days'
+        FROM fined r
+        WHERE r.amount > 0
+        AND NOT EXISTS (SELECT 1 FROM fines WHERE fines.borrow_id = r.borrow_id)
+    ), logged AS (
+        INSERT INTO activity_log (user_id, member_id, action_type, table_name, record_id, description)
+        SELECT p_returned_by, r.member_id, 'RETURN_BOOK', 'borrowed_books',
+               r.borrow_id, 'Book returned with condition: ' || p_condition_after
+        FROM returned r
+    )
+    SELECT array_agg(borrow_id ORDER BY borrow_id) INTO p_returned FROM returned;
+
+    PERFORM set_config('smartlibrary.set_based_return', 'off', true);
+END;
+$$;
+
 -- Procedure to calculate member fines
 CREATE OR REPLACE PROCEDURE calculate_member_fines(
     p_member_id INTEGER,
@@ -455,6 +971,95 @@ BEGIN
 END;
 $$;
 
+-- Procedure to recompute library_stats from the base tables (initial load,
+-- or after bulk changes made with triggers disabled)
+CREATE OR REPLACE PROCEDURE refresh_library_stats()
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO library_stats (stat_key, stat_value)
+    SELECT 'total_books', COUNT(*) FROM books
+    UNION ALL SELECT 'available_books', COUNT(*) FROM books WHERE available_copies > 0
+    UNION ALL SELECT 'active_loans', COUNT(*) FROM borrowed_books WHERE status = 'Borrowed'
+    UNION ALL SELECT 'overdue_loans', COUNT(*) FROM borrowed_books WHERE status = 'Overdue'
+    UNION ALL SELECT 'active_members', COUNT(*) FROM members WHERE status = 'Active'
+    UNION ALL SELECT 'pending_fines', COUNT(*) FROM fines WHERE status = 'Pending'
+    ON CONFLICT (stat_key) DO UPDATE
+    SET stat_value = EXCLUDED.stat_value, updated_at = CURRENT_TIMESTAMP;
+END;
+$$;
+
+CALL refresh_library_stats();
+
+-- ============================================================================
+-- HISTORY ARCHIVE
+-- ============================================================================
+
+-- Function to move history older than p_before to the archive tables:
+-- yearly loan partitions that ended by then and hold no open loans, and
+-- monthly activity partitions that ended by then, are detached and
+-- re-attached under the *_archive parents. Returns the number of loans moved.
+CREATE OR REPLACE FUNCTION archive_history(p_before DATE)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_part RECORD;
+    v_start DATE;
+    v_end DATE;
+    v_open BOOLEAN;
+    v_rows BIGINT;
+    v_moved BIGINT := 0;
+BEGIN
+    FOR v_part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'borrowed_books'::regclass
+        AND c.relname ~ '^borrowed_books_y[0-9]{4}$'
+        ORDER BY c.relname
+    LOOP
+        v_start := to_date(right(v_part.relname, 4), 'YYYY');
+        v_end := (v_start + INTERVAL '1 year')::date;
+        CONTINUE WHEN v_end > p_before;
+
+        EXECUTE format(
+            'SELECT EXISTS (SELECT 1 FROM %I WHERE status IN (''Borrowed'', ''Overdue''))',
+            v_part.relname) INTO v_open;
+        CONTINUE WHEN v_open;
+
+        EXECUTE format('SELECT COUNT(*) FROM %I', v_part.relname) INTO v_rows;
+        EXECUTE format('ALTER TABLE borrowed_books DETACH PARTITION %I', v_part.relname);
+        EXECUTE format(
+            'ALTER TABLE borrowed_books_archive ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            v_part.relname, v_start, v_end);
+        v_moved := v_moved + v_rows;
+    END LOOP;
+
+    FOR v_part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'activity_log'::regclass
+        AND c.relname ~ '^activity_log_y[0-9]{4}m[0-9]{2}$'
+        ORDER BY c.relname
+    LOOP
+        v_start := to_date(right(v_part.relname, 7), 'YYYY"m"MM');
+        v_end := (v_start + INTERVAL '1 month')::date;
+        CONTINUE WHEN v_end > p_before;
+
+        EXECUTE format('ALTER TABLE activity_log DETACH PARTITION %I', v_part.relname);
+        EXECUTE format(
+            'ALTER TABLE activity_log_archive ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            v_part.relname, v_start, v_end);
+    END LOOP;
+
+    RETURN v_moved;
+END;
+$$;
+
+SELECT create_history_partitions(DATE '2020-01-01', (CURRENT_DATE + INTERVAL '1 year')::date);
+
 -- ============================================================================
 -- SAMPLE DATA INSERTION
 -- ============================================================================
@@ -523,7 +1128,7 @@ SELECT
     bb.borrow_date,
     bb.due_date,
     CURRENT_DATE - bb.due_date AS days_overdue,
-    (CURRENT_DATE - bb.due_date) * 0.50 AS fine_amount
+    overdue_fine(m.membership_type, CURRENT_DATE - bb.due_date) AS fine_amount
 FROM borrowed_books bb
 JOIN books b ON bb.book_id = b.book_id
 JOIN members m ON bb.member_id = m.member_id
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SmartlibraryLimkok import LibraryRepository, SQLiteDatabase  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """An empty file-backed SQLite library (schema, no sample data)"""
+    database = SQLiteDatabase(str(tmp_path / "library.db"), seed=False)
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def repo(db):
+    repository = LibraryRepository(db)
+    yield repository
+    repository.settings.close()
+
+
+@pytest.fixture
+def add_member(db):
+    """Insert a member and return (member_id, membership_number)"""
+    def add(first_name="Ada", last_name="Lovelace", membership_type="Standard"):
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO members (first_name, last_name, email, membership_type) VALUES (?, ?, ?, ?)",
+                (first_name, last_name, f"{first_name}.{last_name}@example.org".lower(), membership_type)
+            )
+            member_id = cursor.lastrowid
+            cursor.execute("SELECT membership_number FROM members WHERE member_id = ?", (member_id,))
+            number = cursor.fetchone()[0]
+            conn.commit()
+        return member_id, number
+    return add
+
+
+def loan_status(db, borrow_id):
+    with db.connection() as conn:
+        return conn.execute("SELECT status FROM borrowed_books WHERE borrow_id = ?", (borrow_id,)).fetchone()[0]
+
+
+def available_copies(db, book_id):
+    with db.connection() as conn:
+        return conn.execute("SELECT available_copies FROM books WHERE book_id = ?", (book_id,)).fetchone()[0]
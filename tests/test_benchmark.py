@@ -0,0 +1,28 @@
+from SmartlibraryLimkok import BenchmarkSuite, LibraryRepository, SyntheticLibrary
+
+
+def test_synthetic_library_keeps_copies_consistent(db):
+    counts = SyntheticLibrary(300, members=40, seed=3).populate(db)
+    assert (counts["books"], counts["members"], counts["borrowed_books"]) == (300, 40, 150)
+    with db.connection() as conn:
+        mismatched = conn.execute(
+            "SELECT COUNT(*) FROM books b WHERE b.available_copies != b.total_copies - "
+            "(SELECT COUNT(*) FROM borrowed_books bb WHERE bb.book_id = b.book_id "
+            " AND bb.status IN ('Borrowed', 'Overdue'))"
+        ).fetchone()[0]
+    assert mismatched == 0
+
+
+def test_benchmarks_run_against_a_small_library(db):
+    SyntheticLibrary(200, members=20).populate(db)
+    results = BenchmarkSuite(db, 200, repeat=1).run()
+    assert list(results) == BenchmarkSuite.names()
+    assert all("total_seconds" in result for result in results.values())
+
+
+def test_benchmark_prefix_term_matches_the_synthetic_library(db):
+    SyntheticLibrary(200, members=20).populate(db)
+    terms = BenchmarkSuite(db, 200).search_terms()
+    repo = LibraryRepository(db)
+    assert repo.count_search_books(terms["prefix"]) > 0
+    assert repo.count_search_books(terms["no_match"]) == 0
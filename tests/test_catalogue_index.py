@@ -0,0 +1,57 @@
+import pytest
+
+from SmartlibraryLimkok import CatalogueIndex
+
+
+def book(book_id, title, author, isbn):
+    return (book_id, title, author, isbn, 1, 1, "Available", "Fiction")
+
+
+BOOKS = [
+    book(1, "Animal Farm", "George Orwell", "978-0-451-52634-2"),
+    book(2, "1984", "George Orwell", "9780451524935"),
+    book(3, "The Da Vinci Code", "Dan Brown", "9780307474278"),
+    book(4, "Brave New World", "Aldous Huxley", "9780060850524"),
+]
+
+
+@pytest.fixture
+def index():
+    return CatalogueIndex(BOOKS)
+
+
+def ids(rows):
+    return [row[0] for row in rows]
+
+
+def test_exact_words_rank_above_prefixes(index):
+    assert ids(index.search("orwell farm")) == [1, 2]
+    assert ids(index.search("brav")) == [4]
+
+
+def test_misspelt_words_match_near_words(index):
+    assert ids(index.search("Georgy Orwel")) == [1, 2]
+    assert ids(index.search("The Vinci Cod")) == [3]
+
+
+def test_isbn_prefix_matches_with_or_without_hyphens(index):
+    assert ids(index.search("9780451")) == [1, 2]
+    assert ids(index.search("978-0-451-52634")) == [1]
+
+
+def test_add_and_remove_keep_the_index_current(index):
+    index.add(book(5, "Farm Animals", "Someone", "9781111111111"))
+    assert ids(index.search("farm")) == [1, 5]
+    index.remove(1)
+    assert ids(index.search("farm")) == [5]
+    assert ids(index.search("9780451")) == [2]
+    index.add(book(2, "Nineteen Eighty-Four", "George Orwell", "9780451524935"))
+    assert ids(index.search("eighty")) == [2]
+    assert len(index) == 4
+
+
+def test_index_from_repository_matches_added_books(repo):
+    added = [repo.add_book(f"97800000001{i:02d}", f"Volume {i}", "Author") for i in range(3)]
+    index = CatalogueIndex(repo.iter_books(batch_size=2))
+    assert len(index) == 3
+    assert index.search("volume") == added
@@ -0,0 +1,63 @@
+from SmartlibraryLimkok import ChangeFeed
+
+
+class FakeWidget:
+    def __init__(self):
+        self.bindings = []
+
+    def bind(self, sequence, func, add=None):
+        self.bindings.append((sequence, func))
+
+    def destroy(self):
+        for sequence, func in self.bindings:
+            if sequence == "<Destroy>":
+                func(type("Event", (), {"widget": self})())
+
+
+def recorder(feed, table, owner=None):
+    events = []
+    feed.subscribe(table, lambda *event: events.append(event), owner)
+    return events
+
+
+def test_events_wait_for_deliver():
+    feed = ChangeFeed()
+    events = recorder(feed, "books")
+    feed.publish("books", "update", 1, ("row",))
+    assert events == []
+    feed.deliver()
+    assert events == [("update", 1, ("row",))]
+
+
+def test_unwatched_tables_queue_nothing():
+    feed = ChangeFeed()
+    feed.publish("members", "insert", 1)
+    events = recorder(feed, "members")
+    feed.deliver()
+    assert events == []
+    assert not feed.watched("fines")
+
+
+def test_subscription_ends_with_its_owner():
+    feed, owner = ChangeFeed(), FakeWidget()
+    events = recorder(feed, "books", owner)
+    owner.destroy()
+    assert not feed.watched("books")
+    feed.publish("books", "delete", 1)
+    feed.deliver()
+    assert events == []
+
+
+def test_writes_publish_their_changes(repo, add_member):
+    books, loans = recorder(repo.changes, "books"), recorder(repo.changes, "borrowed_books")
+    book = repo.add_book("9780000000001", "Book", "Author", copies=2)
+    member_id, _ = add_member()
+    borrow_id = repo.issue_loan(book[0], member_id)
+    repo.return_loan(borrow_id)
+    repo.delete_book(book[0])
+    repo.changes.deliver()
+
+    assert books[0] == ("insert", book[0], book)
+    assert [event[:2] for event in books[1:]] == [("update", book[0])] * 2 + [("delete", book[0])]
+    assert books[1][2][4] == 1 and books[2][2][4] == 2
+    assert loans == [("insert", borrow_id, None), ("update", borrow_id, None)]
@@ -0,0 +1,120 @@
+import pytest
+
+from SmartlibraryLimkok import CirculationQueue
+
+from conftest import available_copies, loan_status
+
+
+@pytest.fixture
+def book(repo):
+    return repo.add_book("978-0-06-231609-7", "Sapiens", "Yuval Noah Harari", copies=2)
+
+
+def test_circulate_checkout_and_checkin(db, repo, book, add_member):
+    member_id, number = add_member()
+    results = repo.circulate([
+        ("member", number.lower(), None),
+        ("checkout", number, "978-0-06-231609-7"),
+    ])
+    assert [ok for ok, _, _ in results] == [True, True]
+    borrow_id = results[1][2]
+    assert loan_status(db, borrow_id) == "Borrowed"
+    assert available_copies(db, book[0]) == 1
+
+    results = repo.circulate([("checkin", None, "9780062316097")])
+    assert results[0][0], results[0][1]
+    assert loan_status(db, borrow_id) == "Returned"
+    assert available_copies(db, book[0]) == 2
+
+
+def test_circulate_reports_failures_without_affecting_other_scans(repo, book, add_member):
+    _, number = add_member()
+    results = repo.circulate([
+        ("member", "MEM9999", None),
+        ("checkout", number, "9789999999999"),
+        ("checkout", number, book[3]),
+        ("checkout", number, book[3]),
+        ("checkin", None, "9789999999999"),
+    ])
+    assert [ok for ok, _, _ in results] == [False, False, True, False, False]
+    assert "Unknown member card" in results[0][1]
+    assert "already has" in results[3][1]
+
+
+def test_circulate_checkin_of_book_not_on_loan(repo, book):
+    ok, message, _ = repo.circulate([("checkin", None, book[3])])[0]
+    assert not ok
+    assert "not on loan" in message
+
+
+def test_circulate_checks_in_the_members_own_loan(db, repo, book, add_member):
+    _, first = add_member("Ada", "Lovelace")
+    _, second = add_member("Alan", "Turing")
+    results = repo.circulate([("checkout", first, book[3]), ("checkout", second, book[3])])
+    assert available_copies(db, book[0]) == 0
+
+    ok, _, borrow_id = repo.circulate([("checkin", second, book[3])])[0]
+    assert ok and borrow_id == results[1][2]
+    assert loan_status(db, results[0][2]) == "Borrowed"
+
+
+def test_circulate_enforces_loan_limit(repo, add_member):
+    _, number = add_member()
+    limit = repo.settings["max_books_per_member"]
+    books = [repo.add_book(f"97800000004{i:02d}", f"Book {i}", "Author", copies=1) for i in range(limit + 1)]
+    results = repo.circulate([("checkout", number, book[3]) for book in books])
+    assert [ok for ok, _, _ in results] == [True] * limit + [False]
+
+
+class ImmediateFetcher:
+    """Runs submitted work at once, like a DataFetcher whose results were just polled"""
+
+    def __init__(self):
+        self.batches = []
+
+    def submit(self, channel, func, on_success, on_error=None, *args):
+        self.batches.append(args[0])
+        try:
+            result = func(*args)
+        except Exception as error:
+            on_error(error)
+        else:
+            on_success(result)
+
+
+def test_circulation_queue_splits_batches_at_repeated_items(repo, book, add_member):
+    _, number = add_member()
+    fetcher = ImmediateFetcher()
+    results = {}
+    queue = CirculationQueue(fetcher, repo.circulate, lambda ticket, ok, *_: results.update({ticket: ok}))
+    queue._in_flight = []  # hold the scans back as if a batch were in flight
+    tickets = [queue.add("member", number), queue.add("checkout", number, book[3]),
+               queue.add("checkin", None, "978-0-06-231609-7")]
+    queue._in_flight = None
+    queue._send()
+
+    assert [len(batch) for batch in fetcher.batches] == [2, 1]
+    assert [results[ticket] for ticket in tickets] == [True, True, True]
+    assert queue.pending == 0
+
+
+def test_circulation_queue_keeps_sending_when_a_result_callback_fails(repo, book, add_member):
+    _, number = add_member()
+    fetcher = ImmediateFetcher()
+    seen = []
+
+    def on_result(ticket, ok, message, detail):
+        seen.append(ticket)
+        if ticket == 1:
+            raise RuntimeError("screen was destroyed")
+
+    queue = CirculationQueue(fetcher, repo.circulate, on_result)
+    queue._in_flight = []
+    queue.add("member", number)
+    queue.add("checkout", number, book[3])
+    queue.add("checkin", None, book[3])
+    queue._in_flight = None
+    with pytest.raises(RuntimeError):
+        queue._send()
+    assert seen == [1, 3]
+    assert queue.pending == 0
@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+
+from SmartlibraryLimkok import LibraryRepository, SampleData, SQLiteDatabase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def count(db, table):
+    with db.connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_seeded_database_loads_sample_data():
+    db = SQLiteDatabase()
+    try:
+        with db.connection() as conn:
+            title = conn.execute("SELECT title FROM books WHERE book_id = 1").fetchone()[0]
+        assert title == SampleData.SAMPLE_BOOKS[0][1]
+        assert count(db, "members") > 0 and count(db, "borrowed_books") > 0
+    finally:
+        db.close()
+
+
+def test_in_memory_databases_are_separate():
+    first, second = SQLiteDatabase(seed=False), SQLiteDatabase(seed=False)
+    try:
+        with first.connection() as conn:
+            conn.execute("INSERT INTO books (title, author, isbn) VALUES ('Only Here', 'Someone', '1')")
+            conn.commit()
+        assert count(first, "books") == 1
+        assert count(second, "books") == 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_pooled_connections_share_the_in_memory_database():
+    db = SQLiteDatabase(seed=False, min_size=0, max_size=2)
+    try:
+        writer, reader = db.get_connection(), db.get_connection()
+        writer.execute("INSERT INTO books (title, author, isbn) VALUES ('Shared', 'Someone', '1')")
+        writer.commit()
+        assert reader.execute("SELECT title FROM books").fetchall() == [("Shared",)]
+        db.return_connection(writer)
+        db.return_connection(reader)
+    finally:
+        db.close()
+
+
+def test_file_database_is_not_seeded_twice(tmp_path):
+    path = str(tmp_path / "library.db")
+    first = SQLiteDatabase(path)
+    seeded = count(first, "books")
+    first.close()
+    db = SQLiteDatabase(path)
+    try:
+        assert count(db, "books") == seeded > 0
+    finally:
+        db.close()
+
+
+def test_repository_adapts_placeholders(db, add_member):
+    member_id, number = add_member("Ada", "Lovelace")
+    rows = LibraryRepository(db).fetchall(
+        "SELECT membership_number FROM members WHERE member_id = %s", (member_id,)
+    )
+    assert rows == [(number,)]
+    assert number == f"MEM{member_id:04d}"
+
+
+def test_import_does_not_open_a_database(tmp_path):
+    path = tmp_path / "library.db"
+    for backend in ("sqlite", "postgresql"):
+        env = dict(os.environ, SMARTLIBRARY_BACKEND=backend, SMARTLIBRARY_SQLITE_PATH=str(path))
+        result = subprocess.run(
+            [sys.executable, "-c", "import SmartlibraryLimkok as m; assert m.DatabaseConnection is None"],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        assert result.returncode == 0, result.stderr
+    assert not path.exists()
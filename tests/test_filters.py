@@ -0,0 +1,58 @@
+import pytest
+
+from SmartlibraryLimkok import BookFilter
+
+BOOKS = [
+    ("Animal Farm", "George Orwell", "9780451526342", "Fiction", 2),
+    ("1984", "George Orwell", "9780451524935", "Fiction", 1),
+    ("Homage to Catalonia", "George Orwell", "9780156421171", "History", 1),
+    ("Sapiens", "Yuval Noah Harari", "9780062316097", "History", 1),
+]
+
+
+@pytest.fixture
+def catalogue(db, add_member):
+    member_id, _ = add_member()
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO books (title, author, isbn, category, total_copies, available_copies) "
+            "VALUES (?, ?, ?, ?, 2, ?)", BOOKS
+        )
+        # Lend the last copies of 1984 (already overdue) and Sapiens (not yet due)
+        conn.execute("INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, status) "
+                     "VALUES (2, ?, DATE('now', '-30 days'), DATE('now', '-16 days'), 'Borrowed')", (member_id,))
+        conn.execute("INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, status) "
+                     "VALUES (4, ?, DATE('now'), DATE('now', '+14 days'), 'Borrowed')", (member_id,))
+        conn.commit()
+
+
+def ids(rows):
+    return sorted(row[0] for row in rows)
+
+
+@pytest.mark.parametrize("status, category, expected", [
+    ("all", "all", [1, 2, 3, 4]),
+    ("available", "all", [1, 3]),
+    ("borrowed", "all", [2, 4]),
+    ("overdue", "all", [2]),
+    ("all", "History", [3, 4]),
+    ("borrowed", "History", [4]),
+    ("overdue", "History", []),
+])
+def test_filter_books(repo, catalogue, status, category, expected):
+    filters = BookFilter().status(status).category(category)
+    assert ids(repo.page_books(filters=filters)) == expected
+    assert repo.count_books(filters) == len(expected)
+
+
+def test_filters_combine_with_search(repo, catalogue):
+    filters = BookFilter().category("Fiction")
+    assert ids(repo.search_books("orwell", filters=filters)) == [1, 2]
+    assert repo.count_search_books("orwell", filters) == 2
+    assert ids(repo.search_books("orwell", filters=filters.status("available"))) == [1]
+
+
+def test_filter_key_identifies_conditions():
+    assert not BookFilter().status("all").category("all")
+    assert BookFilter().category("History").key() == BookFilter().category("History").key()
+    assert BookFilter().category("History").key() != BookFilter().category("Fiction").key()
@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+
+import pytest
+
+import SmartlibraryLimkok
+from SmartlibraryLimkok import FineEngine, OverdueMaintenance, maintenance_main, parse_fine_policy
+
+AS_OF = date(2024, 3, 31)
+POLICIES = {
+    "Standard": (50, 0, None),
+    "Premium": (25, 3, 500),
+    "Student": (10, 0, 100),
+}
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def has_numpy(request, monkeypatch):
+    if request.param and not SmartlibraryLimkok.HAS_NUMPY:
+        pytest.skip("NumPy is not installed")
+    monkeypatch.setattr(SmartlibraryLimkok, "HAS_NUMPY", request.param)
+    return request.param
+
+
+def days_late(*days):
+    return [(AS_OF - timedelta(days=n)).toordinal() for n in days]
+
+
+def test_accrue_applies_rate_grace_and_cap(db, has_numpy):
+    engine = FineEngine(db, POLICIES)
+    cents = engine.accrue(
+        days_late(10, 0, -5, 2, 10, 100, 30, 30),
+        ["Standard", "Standard", "Standard", "Premium", "Premium", "Premium", "Student", "Unknown"],
+        AS_OF,
+    )
+    assert list(map(int, cents)) == [500, 0, 0, 0, 175, 500, 100, 0]
+
+
+def test_accrue_with_other_policies(db, has_numpy):
+    engine = FineEngine(db, POLICIES)
+    cents = engine.accrue(days_late(10), ["Standard"], AS_OF, {"Standard": (100, 5, 300)})
+    assert list(map(int, cents)) == [300]
+
+
+def test_policies_fall_back_to_fine_per_day(db):
+    with db.connection() as conn:
+        conn.execute("INSERT INTO system_settings (setting_key, setting_value, setting_type) "
+                     "VALUES ('fine_per_day', '0.75', 'decimal')")
+        conn.execute("UPDATE fine_policies SET rate_per_day = 1.25, grace_days = 2, max_fine = 20 "
+                     "WHERE membership_type = 'Premium'")
+        conn.commit()
+    policies = FineEngine(db).policies
+    assert policies["Standard"] == (75, 0, None)
+    assert policies["Premium"] == (125, 2, 2000)
+
+
+def test_parse_fine_policy():
+    assert parse_fine_policy("Student=0.25:2:10") == ("Student", (25, 2, 1000))
+
+
+def add_loan(db, member_id, book_id, due):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, status) "
+            "VALUES (?, ?, ?, ?, 'Borrowed')",
+            (book_id, member_id, (due - timedelta(days=14)).isoformat(), due.isoformat())
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+
+def fine_of(db, borrow_id):
+    with db.connection() as conn:
+        rows = conn.execute("SELECT amount, status FROM fines WHERE borrow_id = ?", (borrow_id,)).fetchall()
+    return rows
+
+
+def test_maintenance_prices_fines_by_membership_type(db, repo, add_member):
+    standard, _ = add_member("Ada", "Lovelace", "Standard")
+    premium, _ = add_member("Alan", "Turing", "Premium")
+    book = repo.add_book("9780000000001", "Book", "Author", copies=5)
+    late = add_loan(db, standard, book[0], AS_OF - timedelta(days=4))
+    in_grace = add_loan(db, premium, book[0], AS_OF - timedelta(days=1))
+    past_grace = add_loan(db, premium, book[0], AS_OF - timedelta(days=40))
+    with db.connection() as conn:
+        conn.execute("UPDATE fine_policies SET rate_per_day = 0.25, grace_days = 3, max_fine = 5 "
+                     "WHERE membership_type = 'Premium'")
+        conn.commit()
+
+    totals = OverdueMaintenance(db, chunk_size=2).run(as_of=AS_OF)
+    assert totals["completed"] and totals["scanned"] == 3
+    assert fine_of(db, late) == [(2.0, "Pending")]
+    assert fine_of(db, in_grace) == []
+    assert fine_of(db, past_grace) == [(5.0, "Pending")]
+
+
+def test_simulate_compares_policies(db, repo, add_member):
+    standard, _ = add_member("Ada", "Lovelace", "Standard")
+    book = repo.add_book("9780000000001", "Book", "Author", copies=5)
+    add_loan(db, standard, book[0], AS_OF - timedelta(days=10))
+
+    totals = FineEngine(db, POLICIES).simulate({"Standard": (100, 5, None)}, as_of=AS_OF)
+    assert totals == {"Standard": {"loans": 1, "fined": 1, "current": 500, "simulated": 500}}
+
+
+def test_simulate_command_prints_the_signed_change(db, repo, add_member, monkeypatch, capsys):
+    standard, _ = add_member("Ada", "Lovelace", "Standard")
+    book = repo.add_book("9780000000001", "Book", "Author", copies=5)
+    add_loan(db, standard, book[0], AS_OF - timedelta(days=10))
+    monkeypatch.setattr(SmartlibraryLimkok, "get_database", lambda: db)
+
+    assert maintenance_main(["--as-of", AS_OF.isoformat(), "--simulate", "Standard=0.25"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].startswith("Standard") and lines[1].endswith("        -$2.50")
+    assert len(lines[1]) == len(lines[0])
@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+
+import pytest
+
+from SmartlibraryLimkok import HistoryArchive
+
+CUTOFF = date(2023, 1, 1)
+
+
+@pytest.fixture
+def history(db, add_member):
+    """Returned loans either side of CUTOFF, one old open loan and old and new log entries"""
+    member_id, _ = add_member()
+    with db.connection() as conn:
+        conn.execute("INSERT INTO books (book_id, title, author, isbn, total_copies, available_copies) "
+                     "VALUES (1, 'Book', 'Author', '9780000000001', 10, 10)")
+        for days in range(-300, 300, 50):
+            borrowed = CUTOFF + timedelta(days=days)
+            conn.execute(
+                "INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, return_date, "
+                "actual_return_date, status) VALUES (1, ?, ?, ?, ?, ?, 'Returned')",
+                (member_id, borrowed.isoformat(), (borrowed + timedelta(days=14)).isoformat(),
+                 (borrowed + timedelta(days=7)).isoformat(), (borrowed + timedelta(days=7)).isoformat())
+            )
+        conn.execute("INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, status) "
+                     "VALUES (1, ?, '2022-06-01', '2022-06-15', 'Borrowed')", (member_id,))
+        conn.executemany(
+            "INSERT INTO activity_log (action_type, table_name, description, created_at) VALUES (?, ?, ?, ?)",
+            [("OLD", "borrowed_books", "old entry", "2022-05-01 10:00:00"),
+             ("NEW", "borrowed_books", "new entry", "2023-05-01 10:00:00")]
+        )
+        conn.commit()
+
+
+def table_count(db, table, where="1 = 1"):
+    with db.connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}").fetchone()[0]
+
+
+def test_archive_moves_old_returned_loans_and_activity(db, repo, history):
+    returned = repo.count_loans("returned")
+    shown = repo.page_history(limit=100)
+
+    assert HistoryArchive(db).run(before=CUTOFF) == 6
+    assert table_count(db, "borrowed_books_archive") == 6
+    assert table_count(db, "borrowed_books", "borrow_date < '2023-01-01'") == 1  # the open loan stays
+    assert table_count(db, "activity_log_archive", "action_type = 'OLD'") == 1
+    assert table_count(db, "activity_log", "action_type = 'OLD'") == 0
+    assert table_count(db, "activity_log", "action_type = 'NEW'") == 1
+
+    # The returned-loans history still shows the archived loans
+    assert repo.count_loans("returned") == returned
+    assert repo.page_history(limit=100) == shown
+
+
+def test_archive_without_cutoff_moves_nothing(db, history):
+    assert HistoryArchive(db).run() == 0
+    assert table_count(db, "borrowed_books_archive") == 0
+
+
+def test_history_pages_newest_first_by_keyset(db, repo, history):
+    HistoryArchive(db).run(before=CUTOFF)
+    expected = repo.page_history(limit=100)
+    assert [row[3] for row in expected] == sorted((row[3] for row in expected), reverse=True)
+
+    seen, after = [], None
+    while True:
+        page = repo.page_history(after=after, limit=5)
+        if not page:
+            break
+        seen.extend(page)
+        after = repo.history_key(page[-1])
+    assert seen == expected
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+from SmartlibraryLimkok import BookImporter, read_book_csv, validate_book_record
+
+
+def books(db):
+    with db.connection() as conn:
+        return {row[0]: row[1:] for row in conn.execute(
+            "SELECT isbn, title, category, total_copies, available_copies FROM books"
+        )}
+
+
+def test_import_inserts_and_rejects(db):
+    csv_text = (
+        "ISBN,Title,Author,Genre,Copies,Year\n"
+        "978-0-7432-7356-5,The Great Gatsby,F. Scott Fitzgerald,Fiction,5,1925\n"
+        "9780451524935,1984,George Orwell,Fiction,3,\n"
+        "\n"
+        ",No ISBN,Someone,,1,\n"
+        "9780446310789,Mockingbird,Harper Lee,,many,\n"
+        "9780062316097,Sapiens,Yuval Noah Harari,History,-1,\n"
+        "978 0451 524935,1984 again,George Orwell,,1,\n"
+        "---,Dashes,Nobody,,1,\n"
+    )
+    progress = []
+    totals = BookImporter(db, batch_size=1, on_progress=progress.append).run(io.StringIO(csv_text))
+
+    assert totals["read"] == 7
+    assert totals["inserted"] == 2 and totals["updated"] == 0
+    assert [line for line, _ in totals["rejected"]] == [5, 6, 7, 8, 9]
+    assert "Duplicate ISBN 9780451524935" in totals["rejected"][3][1]
+    assert len(progress) == 2
+
+    stored = books(db)
+    assert stored["9780743273565"] == ("The Great Gatsby", "Fiction", 5, 5)
+    assert set(stored) == {"9780743273565", "9780451524935"}
+
+
+def test_import_updates_known_isbn(db, repo, add_member):
+    book = repo.add_book("9780743273565", "Gatsby", "Fitzgerald", category="Classics", copies=3)
+    member_id, _ = add_member()
+    repo.issue_loan(book[0], member_id)
+
+    totals = BookImporter(db).run(io.StringIO(
+        "isbn,title,author,total_copies\n978-0-7432-7356-5,The Great Gatsby,F. Scott Fitzgerald,5\n"
+    ))
+    assert (totals["inserted"], totals["updated"]) == (0, 1)
+    # Metadata replaced, category kept, available copies moved by the change in total
+    assert books(db)["9780743273565"] == ("The Great Gatsby", "Classics", 5, 4)
+
+
+def test_import_requires_header_columns(db):
+    with pytest.raises(ValueError, match="total_copies"):
+        BookImporter(db).run(io.StringIO("isbn,title,author\n1,a,b\n"))
+
+
+def test_read_book_csv_maps_headers():
+    records = list(read_book_csv(io.StringIO("Publication Year,ISBN,Title,Author,Copies,Extra\n2001,1,a,b,2,x\n")))
+    assert records == [(2, {"publication_year": "2001", "isbn": "1", "title": "a",
+                            "author": "b", "total_copies": "2"})]
+
+
+def test_validate_book_record_normalizes_isbn():
+    row, reason = validate_book_record({"isbn": "978-1-4028-9462-x", "title": "t", "author": "a",
+                                        "total_copies": "2"})
+    assert reason is None
+    assert row[0] == "978140289462X"
@@ -0,0 +1,54 @@
+import pytest
+
+from SmartlibraryLimkok import LIBRARY_STATS_QUERY, LibraryRepository, SQLiteDatabase
+
+
+@pytest.fixture
+def seeded():
+    db = SQLiteDatabase()
+    yield LibraryRepository(db)
+    db.close()
+
+
+def recomputed(repo):
+    return dict(repo.fetchall(LIBRARY_STATS_QUERY))
+
+
+WRITES = [
+    "INSERT INTO books (book_id, title, author, isbn, total_copies, available_copies) "
+    "VALUES (900, 'Stats', 'Someone', '9789000000001', 1, 1)",
+    "INSERT INTO members (member_id, first_name, last_name, email) "
+    "VALUES (900, 'Ada', 'Lovelace', 'ada@example.org')",
+    "INSERT INTO borrowed_books (borrow_id, book_id, member_id, borrow_date, due_date, status) "
+    "VALUES (900, 900, 900, DATE('now'), DATE('now', '+14 days'), 'Borrowed')",
+    "UPDATE borrowed_books SET status = 'Overdue' WHERE borrow_id = 900",
+    "INSERT INTO fines (fine_id, borrow_id, member_id, amount, reason, fine_date, due_date, status) "
+    "VALUES (900, 900, 900, 1.50, 'Overdue fine', DATE('now'), DATE('now', '+30 days'), 'Pending')",
+    "UPDATE borrowed_books SET status = 'Returned', return_date = DATE('now') WHERE borrow_id = 900",
+    "UPDATE fines SET status = 'Paid' WHERE fine_id = 900",
+    "UPDATE members SET status = 'Suspended' WHERE member_id = 900",
+    "DELETE FROM fines WHERE fine_id = 900",
+    "DELETE FROM borrowed_books WHERE borrow_id = 900",
+    "DELETE FROM members WHERE member_id = 900",
+    "DELETE FROM books WHERE book_id = 900",
+]
+
+
+def test_seeded_stats_match_the_base_tables(seeded):
+    assert seeded.dashboard_stats() == recomputed(seeded)
+
+
+@pytest.mark.parametrize("count", range(1, len(WRITES) + 1))
+def test_triggers_keep_stats_current(seeded, count):
+    before = seeded.dashboard_stats()
+    for statement in WRITES[:count]:
+        seeded.execute(statement)
+    assert seeded.dashboard_stats() == recomputed(seeded)
+    if count == len(WRITES):
+        assert seeded.dashboard_stats() == before
+
+
+def test_refresh_repairs_drift(seeded):
+    seeded.execute("UPDATE library_stats SET stat_value = 999")
+    seeded.refresh_stats()
+    assert seeded.dashboard_stats() == recomputed(seeded)
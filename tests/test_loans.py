@@ -0,0 +1,109 @@
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from SmartlibraryLimkok import LoanError
+
+from conftest import available_copies, loan_status
+
+
+@pytest.fixture
+def book(repo):
+    return repo.add_book("978-0-06-231609-7", "Sapiens", "Yuval Noah Harari", copies=2)
+
+
+def test_add_book_stores_normalized_isbn(book):
+    assert book[3] == "9780062316097"
+
+
+def test_issue_and_return_loan(db, repo, book, add_member):
+    member_id, _ = add_member()
+    borrow_id = repo.issue_loan(book[0], member_id)
+    assert loan_status(db, borrow_id) == "Borrowed"
+    assert available_copies(db, book[0]) == 1
+
+    repo.return_loan(borrow_id)
+    assert loan_status(db, borrow_id) == "Returned"
+    assert available_copies(db, book[0]) == 2
+
+
+def test_return_loan_twice_is_refused(db, repo, book, add_member):
+    member_id, _ = add_member()
+    borrow_id = repo.issue_loan(book[0], member_id)
+    repo.return_loan(borrow_id)
+    with pytest.raises(LoanError):
+        repo.return_loan(borrow_id)
+    assert available_copies(db, book[0]) == 2
+    returns = repo.fetchall(
+        "SELECT COUNT(*) FROM activity_log WHERE action_type = 'RETURN_BOOK' AND record_id = %s", (borrow_id,)
+    )
+    assert returns == [(1,)]
+
+
+def test_issue_loan_refuses_unavailable_book(repo, add_member):
+    book = repo.add_book("9780000000001", "Only Copy", "Someone", copies=1)
+    first, _ = add_member("Ada", "Lovelace")
+    second, _ = add_member("Alan", "Turing")
+    repo.issue_loan(book[0], first)
+    with pytest.raises(LoanError):
+        repo.issue_loan(book[0], second)
+
+
+def test_issue_loan_refuses_a_second_copy_to_the_same_member(repo, book, add_member):
+    member_id, _ = add_member()
+    repo.issue_loan(book[0], member_id)
+    with pytest.raises(LoanError, match="already has this book"):
+        repo.issue_loan(book[0], member_id)
+
+
+def test_issue_loan_reports_other_integrity_errors_as_they_are(repo, book):
+    with pytest.raises(sqlite3.IntegrityError, match="FOREIGN KEY"):
+        repo.issue_loan(book[0], 999999)
+
+
+def test_issue_loan_enforces_loan_limit(db, repo, add_member):
+    member_id, _ = add_member()
+    limit = repo.settings["max_books_per_member"]
+    books = [repo.add_book(f"97800000001{i:02d}", f"Book {i}", "Author", copies=1) for i in range(limit + 1)]
+    for book in books[:limit]:
+        repo.issue_loan(book[0], member_id)
+    with pytest.raises(LoanError):
+        repo.issue_loan(books[limit][0], member_id)
+
+
+def test_issue_loan_defaults_to_max_borrow_days(repo, book, add_member):
+    member_id, _ = add_member()
+    borrow_id = repo.issue_loan(book[0], member_id)
+    due = repo.fetchall("SELECT due_date FROM borrowed_books WHERE borrow_id = %s", (borrow_id,))[0][0]
+    assert date.fromisoformat(str(due)) == date.today() + timedelta(days=repo.settings["max_borrow_days"])
+
+
+def test_return_loan_of_unknown_loan(repo):
+    with pytest.raises(LoanError):
+        repo.return_loan(999999)
+
+
+def test_return_loans_reports_each_loan(db, repo, add_member):
+    member_id, _ = add_member()
+    books = [repo.add_book(f"97800000002{i:02d}", f"Book {i}", "Author", copies=1) for i in range(3)]
+    borrow_ids = [repo.issue_loan(book[0], member_id) for book in books]
+    repo.return_loan(borrow_ids[0])
+
+    results = repo.return_loans(borrow_ids + [999999])
+    assert list(results) == borrow_ids + [999999]
+    assert results[borrow_ids[0]] == (False, "Already returned")
+    assert results[borrow_ids[1]][0] and results[borrow_ids[2]][0]
+    assert results[999999] == (False, "Loan not found")
+    assert all(loan_status(db, borrow_id) == "Returned" for borrow_id in borrow_ids)
+    assert all(available_copies(db, book[0]) == 1 for book in books)
+
+
+def test_return_loans_spans_chunks(db, repo, add_member, monkeypatch):
+    monkeypatch.setattr(repo, "RETURN_CHUNK", 2)
+    member_id, _ = add_member()
+    books = [repo.add_book(f"97800000003{i:02d}", f"Book {i}", "Author", copies=1) for i in range(5)]
+    borrow_ids = [repo.issue_loan(book[0], member_id) for book in books]
+    results = repo.return_loans(borrow_ids)
+    assert all(ok for ok, _ in results.values())
+    assert all(available_copies(db, book[0]) == 1 for book in books)
@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.fixture
+def catalogue(repo):
+    for isbn, title in (("9780446310789", "Kill a Mockingbird"), ("978140289462X", "Killing Time"),
+                        ("9780062316097", "Sapiens")):
+        repo.add_book(isbn, title, "Author")
+
+
+@pytest.mark.parametrize("term", ["Kill a Mockingbird", "kill a mock", "Kill a mock", "KILL A", "  kill   a "])
+def test_lookup_books_ignores_case(repo, catalogue, term):
+    assert [row[1] for row in repo.lookup_books(term)] == ["Kill a Mockingbird"]
+
+
+def test_lookup_books_by_isbn(repo, catalogue):
+    assert [row[1] for row in repo.lookup_books("978-0-06")] == ["Sapiens"]
+    assert [row[1] for row in repo.lookup_books("978140289462x")] == ["Killing Time"]
+
+
+def test_lookup_books_matches_literal_wildcards(repo, catalogue):
+    repo.add_book("9780000000001", "100% Pure_Code", "Author")
+    assert [row[1] for row in repo.lookup_books("100% pure_")] == ["100% Pure_Code"]
+    assert repo.lookup_books("100_") == []
+
+
+def test_lookup_members_ignores_case(repo, add_member):
+    _, number = add_member("Ada", "Lovelace")
+    add_member("Alan", "Turing")
+    assert [row[1] for row in repo.lookup_members("ada lov")] == ["Ada Lovelace"]
+    assert [row[1] for row in repo.lookup_members("TURING")] == ["Alan Turing"]
+    assert [row[1] for row in repo.lookup_members(number.lower())] == ["Ada Lovelace"]
+    assert [row[1] for row in repo.lookup_members("ALAN.T")] == ["Alan Turing"]
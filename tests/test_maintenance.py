@@ -0,0 +1,77 @@
+from datetime import date, timedelta
+
+import pytest
+
+from SmartlibraryLimkok import OverdueMaintenance
+
+AS_OF = date(2024, 3, 31)
+
+
+@pytest.fixture
+def lend(db, add_member):
+    """Insert a Borrowed loan due on the given date and return its borrow_id"""
+    member_id, _ = add_member()
+    with db.connection() as conn:
+        conn.execute("INSERT INTO books (book_id, title, author, isbn, total_copies, available_copies) "
+                     "VALUES (1, 'Book', 'Author', '9780000000001', 100, 100)")
+        conn.commit()
+
+    def add(due):
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, status) "
+                "VALUES (1, ?, ?, ?, 'Borrowed')",
+                (member_id, (due - timedelta(days=14)).isoformat(), due.isoformat())
+            )
+            conn.commit()
+            return cursor.lastrowid
+    return add
+
+
+def fines(db, borrow_id=None):
+    with db.connection() as conn:
+        if borrow_id is None:
+            return conn.execute("SELECT borrow_id, COUNT(*) FROM fines GROUP BY borrow_id").fetchall()
+        return conn.execute("SELECT amount, status FROM fines WHERE borrow_id = ?", (borrow_id,)).fetchall()
+
+
+def test_maintenance_accrues_fines_for_overdue_loans(db, lend):
+    late, just_late, not_due = (lend(AS_OF - timedelta(days=4)), lend(AS_OF - timedelta(days=1)),
+                                lend(AS_OF + timedelta(days=3)))
+
+    totals = OverdueMaintenance(db, chunk_size=1).run(as_of=AS_OF)
+    assert totals["completed"] and totals["scanned"] == 2 and totals["fines"] == 2
+    assert fines(db, late) == [(2.0, "Pending")]
+    assert fines(db, just_late) == [(0.5, "Pending")]
+    assert fines(db, not_due) == []
+
+    # A later day refreshes the pending fine instead of opening another one
+    OverdueMaintenance(db).run(as_of=AS_OF + timedelta(days=2))
+    assert fines(db, late) == [(3.0, "Pending")]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_interrupted_run_resumes_where_it_stopped(db, lend):
+    loans = [lend(AS_OF - timedelta(days=day % 4 + 1)) for day in range(10)]
+
+    def stop_after_first_chunk(progress):
+        raise Interrupted
+
+    with pytest.raises(Interrupted):
+        OverdueMaintenance(db, chunk_size=3, on_progress=stop_after_first_chunk).run(as_of=AS_OF)
+    assert len(fines(db)) == 3
+
+    totals = OverdueMaintenance(db, chunk_size=3).run(as_of=AS_OF)
+    assert totals["resumed"] and totals["completed"] and totals["scanned"] == 10
+    assert sorted(fines(db)) == [(borrow_id, 1) for borrow_id in loans]
+
+    # A finished day is not processed again unless restarted
+    again = OverdueMaintenance(db, chunk_size=3).run(as_of=AS_OF)
+    assert again["completed"] and not again["resumed"] and again["scanned"] == 10
+    restarted = OverdueMaintenance(db, chunk_size=3).run(as_of=AS_OF, restart=True)
+    assert restarted["completed"] and restarted["fines"] == 10
+    assert sorted(fines(db)) == [(borrow_id, 1) for borrow_id in loans]
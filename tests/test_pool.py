@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from SmartlibraryLimkok import ConnectionPool, PoolError, PoolTimeoutError
+
+
+class Factory:
+    """Connection factory that remembers every connection it opened"""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.opened.append(conn)
+        return conn
+
+
+def test_checkout_times_out_when_exhausted():
+    pool = ConnectionPool(Factory(), min_size=0, max_size=1, timeout=0.05)
+    conn = pool.get_connection()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.get_connection()
+    assert time.monotonic() - started >= 0.05
+    pool.return_connection(conn)
+    assert pool.get_connection() is conn
+
+
+def test_waiting_checkout_gets_returned_connection():
+    pool = ConnectionPool(Factory(), min_size=0, max_size=1, timeout=5.0)
+    conn = pool.get_connection()
+    threading.Timer(0.05, pool.return_connection, (conn,)).start()
+    assert pool.get_connection() is conn
+
+
+def test_connections_are_reused_lifo():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=0, max_size=2)
+    first, second = pool.get_connection(), pool.get_connection()
+    pool.return_connection(first)
+    pool.return_connection(second)
+    assert pool.get_connection() is second
+    assert len(factory.opened) == 2
+
+
+def test_broken_idle_connection_is_replaced():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=0, max_size=1, health_check_after=0.0)
+    conn = pool.get_connection()
+    pool.return_connection(conn)
+    conn.close()
+
+    replacement = pool.get_connection()
+    assert replacement is not conn
+    assert replacement.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats()["size"] == 1
+
+
+def test_recently_used_connection_skips_health_check():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=0, max_size=1, health_check_after=60.0)
+    conn = pool.get_connection()
+    pool.return_connection(conn)
+    conn.close()
+    assert pool.get_connection() is conn
+
+
+def test_idle_connections_are_reaped_down_to_min_size():
+    pool = ConnectionPool(Factory(), min_size=1, max_size=3, max_idle=0.01)
+    connections = [pool.get_connection() for _ in range(3)]
+    for conn in connections:
+        pool.return_connection(conn)
+    time.sleep(0.02)
+
+    assert pool.reap_idle() == 2
+    assert pool.stats() == {"size": 1, "idle": 1, "in_use": 0, "max_size": 3}
+
+
+def test_warm_opens_min_size():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=2, max_size=4)
+    pool.warm()
+    assert len(factory.opened) == 2
+    assert pool.stats()["idle"] == 2
+
+
+def test_closed_pool_refuses_checkout():
+    pool = ConnectionPool(Factory(), min_size=0, max_size=1)
+    pool.close_all()
+    with pytest.raises(PoolError):
+        pool.get_connection()
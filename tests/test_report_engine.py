@@ -0,0 +1,90 @@
+import time
+from datetime import date
+
+import pytest
+
+from SmartlibraryLimkok import REPORTS, ReportEngine, SyntheticLibrary
+
+FROM, TO = date(2000, 1, 1), date.today()
+
+
+class ImmediateFetcher:
+    """Runs submitted work at once, like a DataFetcher whose results were just polled"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, channel, func, on_success, on_error=None, *args):
+        self.submitted += 1
+        on_success(func(*args))
+
+    def cancel(self, channel):
+        pass
+
+
+class DeferredFetcher(ImmediateFetcher):
+    """Holds submitted work until run() is called"""
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = []
+
+    def submit(self, channel, func, on_success, on_error=None, *args):
+        self.jobs.append(lambda: ImmediateFetcher.submit(self, channel, func, on_success, on_error, *args))
+
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        for job in jobs:
+            job()
+
+
+@pytest.fixture
+def engine(db, repo):
+    SyntheticLibrary(200, members=20).populate(db)
+    return ReportEngine(repo, ImmediateFetcher())
+
+
+def run(engine, title):
+    results = []
+    engine.run(REPORTS[title], FROM, TO, results.append)
+    return results[0]
+
+
+def test_totals_aggregate_in_the_database(engine):
+    result = run(engine, "Book Inventory")
+    assert result.totals[0] == 200
+    assert result.totals[3] == 100
+
+
+def test_repeated_request_is_served_from_the_cache(engine):
+    first = run(engine, "Book Inventory")
+    assert run(engine, "Book Inventory") is first
+    assert engine.fetcher.submitted == 1
+
+
+def test_change_events_drop_the_reports_reading_the_table(engine, repo):
+    inventory, fines = run(engine, "Book Inventory"), run(engine, "Fine Collection")
+    repo.add_book("9789999999999", "New Arrival", "Someone")
+    repo.changes.deliver()
+
+    assert engine.cached(REPORTS["Book Inventory"], FROM, TO) is None
+    assert engine.cached(REPORTS["Fine Collection"], FROM, TO) is fines
+    refreshed = run(engine, "Book Inventory")
+    assert refreshed is not inventory and refreshed.totals[0] == 201
+
+
+def test_cached_results_expire(engine):
+    first = run(engine, "Book Inventory")
+    first.loaded = time.monotonic() - engine.CACHE_TTL - 1
+    assert engine.cached(REPORTS["Book Inventory"], FROM, TO) is None
+    assert run(engine, "Book Inventory") is not first
+
+
+def test_result_of_a_run_overtaken_by_a_write_is_not_cached(db, repo):
+    engine = ReportEngine(repo, DeferredFetcher())
+    results = []
+    engine.run(REPORTS["Book Inventory"], FROM, TO, results.append)
+    engine.invalidate("books")
+    engine.fetcher.run()
+    assert len(results) == 1
+    assert engine.cached(REPORTS["Book Inventory"], FROM, TO) is None
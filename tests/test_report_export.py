@@ -0,0 +1,72 @@
+import csv
+import json
+import os
+from datetime import date
+
+import pytest
+
+from SmartlibraryLimkok import REPORTS, QueryCancel, QueryCancelledError, ReportExporter, SyntheticLibrary
+
+FROM, TO = date(2000, 1, 1), date.today()
+
+
+@pytest.fixture
+def library(db):
+    SyntheticLibrary(300, members=30).populate(db)
+
+
+@pytest.fixture
+def exports(tmp_path):
+    path = tmp_path / "exports"
+    path.mkdir()
+    return path
+
+
+def test_csv_export_streams_every_row(repo, library, exports):
+    path = str(exports / "inventory.csv")
+    progress = []
+    written = ReportExporter(repo, REPORTS["Book Inventory"], FROM, TO, on_progress=progress.append,
+                             batch_size=100).run(path, "csv")
+
+    assert written == 300
+    assert [update["rows"] for update in progress] == [100, 200, 300]
+    with open(path, newline="", encoding="utf-8") as exported:
+        rows = list(csv.reader(exported))
+    assert rows[0] == list(REPORTS["Book Inventory"].columns)
+    assert len(rows) == 301 and rows[1][0] == "1"
+    assert os.listdir(exports) == ["inventory.csv"]
+
+
+def test_jsonl_export_keys_rows_by_column(repo, library, exports):
+    path = str(exports / "circulation.jsonl")
+    report = REPORTS["Monthly Circulation"]
+    written = ReportExporter(repo, report, FROM, TO).run(path, "jsonl")
+
+    with open(path, encoding="utf-8") as exported:
+        rows = [json.loads(line) for line in exported]
+    assert len(rows) == written > 0
+    assert set(rows[0]) == set(report.columns)
+    assert sum(row["Loans"] for row in rows) == 150
+
+
+def test_cancelled_export_leaves_nothing_behind(repo, library, exports):
+    path = str(exports / "inventory.csv")
+    cancel = QueryCancel()
+    exporter = ReportExporter(repo, REPORTS["Book Inventory"], FROM, TO,
+                              on_progress=lambda update: cancel.cancel(), cancel=cancel, batch_size=50)
+    with pytest.raises(QueryCancelledError):
+        exporter.run(path, "csv")
+    assert os.listdir(exports) == []
+
+
+def test_failed_export_keeps_the_previous_file(repo, library, exports):
+    path = exports / "inventory.csv"
+    path.write_text("previous export")
+
+    def fail(update):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        ReportExporter(repo, REPORTS["Book Inventory"], FROM, TO, on_progress=fail).run(str(path), "csv")
+    assert path.read_text() == "previous export"
+    assert os.listdir(exports) == ["inventory.csv"]
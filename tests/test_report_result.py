@@ -0,0 +1,63 @@
+import os
+from datetime import date
+
+import pytest
+
+from SmartlibraryLimkok import REPORTS, ReportResult
+
+REPORT = REPORTS["Fine Collection"]
+HEADER_LINES = 5 + len(REPORT.totals) + 2  # title block, totals, "DETAILED LIST:"
+
+
+@pytest.fixture
+def result():
+    result = ReportResult(REPORT, date(2024, 1, 1), date(2024, 12, 31), (3, 4.5, 1.5, 3.0))
+    result.acquire()
+    yield result
+    result.discard()
+
+
+def fine(fine_id, member):
+    return (fine_id, member, f"MEM{fine_id:04d}", "Some Book", 1.5, "2024-03-01", "Pending", None)
+
+
+def test_lines_slice_the_spooled_rows(result):
+    result.add_rows([fine(1, "Ada Lovelace"), fine(2, "Alan Turing")])
+    result.add_rows([fine(3, "Grace Brewster Murray Hopper")])
+    result.finish(0.01)
+
+    assert result.row_count == 3
+    assert result.line_count == HEADER_LINES + 2 + 3  # column header and rule
+    assert result.lines(0, 1) == "FINE COLLECTION\n"
+    rows = result.lines(HEADER_LINES + 2, result.line_count).splitlines()
+    assert len(rows) == 3
+    assert "Ada Lovelace" in rows[0] and "Alan Turing" in rows[1]
+    # Widths come from the first batch, so the longer name is cut to fit
+    assert "Grace Brewst " in rows[2] and "Hopper" not in rows[2]
+    assert result.lines(result.line_count, result.line_count + 10) == ""
+
+
+def test_find_returns_the_line_ignoring_case(result):
+    result.add_rows([fine(fine_id, f"Member {fine_id}") for fine_id in range(1, 1001)])
+    result.finish(0.01)
+
+    line = result.find("member 500")
+    assert "Member 500" in result.lines(line, line + 1)
+    assert result.find("MEMBER 5", line) == line
+    assert result.find("Member 5", line + 1) > line
+    assert result.find("Nobody") is None
+
+
+def test_empty_result_says_so(result):
+    result.finish(0.01)
+    assert result.row_count == 0
+    assert "No rows in this period." in result.lines(0, result.line_count)
+
+
+def test_file_is_removed_when_the_last_holder_releases(result):
+    result.finish(0.01)
+    result.acquire()
+    result.release()
+    assert os.path.exists(result.path)
+    result.release()
+    assert not os.path.exists(result.path)
@@ -0,0 +1,140 @@
+import sqlite3
+import threading
+
+import pytest
+
+from SmartlibraryLimkok import QueryCancel, QueryCancelledError
+
+BOOKS = [
+    ("Animal Farm", "George Orwell", "9780451526342"),
+    ("1984", "George Orwell", "9780451524935"),
+    ("Brave New World", "Aldous Huxley", "9780060850524"),
+    ("The Orwell Reader", "Various", "9780156701761"),
+    ("100% Pure_Code", "Someone", "9780000000001"),
+]
+
+
+@pytest.fixture(params=["fts", "like"])
+def mode(request, db, monkeypatch):
+    if request.param == "fts" and not db.has_fts:
+        pytest.skip("SQLite has no FTS5 trigram tokenizer")
+    if request.param == "like":
+        monkeypatch.setattr(db, "has_fts", False)
+    return request.param
+
+
+def add_books(db, books):
+    with db.connection() as conn:
+        conn.executemany("INSERT INTO books (title, author, isbn) VALUES (?, ?, ?)", books)
+        conn.commit()
+
+
+@pytest.fixture
+def catalogue(db):
+    add_books(db, BOOKS)
+
+
+def ids(rows):
+    return sorted(row[0] for row in rows)
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("orwell", [1, 2, 4]),
+    ("Brave", [3]),
+    ("huxley", [3]),
+    ("978006", [3]),
+    ("tolstoy", []),
+])
+def test_search_matches_title_author_and_isbn(repo, catalogue, mode, term, expected):
+    assert ids(repo.search_books(term)) == expected
+    assert repo.count_search_books(term) == len(expected)
+
+
+def test_fts_search_needs_every_token(db, repo, catalogue):
+    if not db.has_fts:
+        pytest.skip("SQLite has no FTS5 trigram tokenizer")
+    assert ids(repo.search_books("george farm")) == [1]
+
+
+def test_like_search_matches_wildcards_literally(db, repo, catalogue, monkeypatch):
+    monkeypatch.setattr(db, "has_fts", False)
+    assert ids(repo.search_books("100% pure_")) == [5]
+    assert repo.search_books("100_") == []
+
+
+def test_like_search_ranks_isbn_prefix_first(db, repo, catalogue, monkeypatch):
+    monkeypatch.setattr(db, "has_fts", False)
+    add_books(db, [("Notes on 9780451", "Someone", "1111111111111")])
+    assert [row[0] for row in repo.search_books("9780451")][:2] == [1, 2]
+
+
+def test_keyset_pages_cover_every_match_once(db, repo, mode):
+    add_books(db, [(f"Shadow {i}", "Author", f"97800000001{i:02d}") for i in range(7)])
+    expected = [row[0] for row in repo.search_books("shadow")]
+    seen, after = [], None
+    while True:
+        page = repo.search_books("shadow", after=after, limit=3)
+        if not page:
+            break
+        seen.extend(row[0] for row in page)
+        after = (page[-1][-1], page[-1][0])
+    assert seen == expected
+    assert len(expected) == 7
+
+
+def test_cancelled_search_does_not_start(repo, catalogue):
+    cancel = QueryCancel()
+    cancel.cancel()
+    with pytest.raises(QueryCancelledError):
+        repo.search_books("orwell", cancel=cancel)
+
+
+SLOW_QUERY = (
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) "
+    "SELECT COUNT(*) FROM n"
+)
+
+
+def test_cancel_interrupts_a_running_query(db, repo):
+    cancel = QueryCancel()
+    errors = []
+
+    def run():
+        try:
+            repo.fetchall(SLOW_QUERY, cancel=cancel)
+        except sqlite3.OperationalError as error:
+            errors.append(error)
+
+    worker = threading.Thread(target=run)
+    worker.start()
+    while cancel._running is None and worker.is_alive():
+        worker.join(0.01)
+    cancel.cancel()
+    worker.join(10)
+    assert not worker.is_alive()
+    assert len(errors) == 1 and "interrupt" in str(errors[0])
+    # The interrupted connection went back to the pool in working order
+    assert repo.fetchall("SELECT 1") == [(1,)]
+
+
+@pytest.mark.parametrize("previous_term, term", [
+    ("ats", "atsb"),
+    ("Orwel", "Orwell 1984"),
+    ("orw", "Orwell"),
+    ("George", "George Orwell"),
+    ("978045", "9780451524"),
+    ("100%", "100% Pure"),
+])
+def test_narrowed_search_matches_a_fresh_search(repo, catalogue, mode, previous_term, term):
+    previous = repo.search_books(previous_term, limit=10000)
+    narrowed = repo.narrow_search_books(previous, previous_term, term)
+    assert narrowed is not None
+    assert ids(narrowed) == ids(repo.search_books(term, limit=10000))
+
+
+def test_narrowing_refuses_terms_matched_differently(repo, catalogue, mode):
+    rows = repo.search_books("Orwell", limit=10000)
+    assert repo.narrow_search_books(rows, "Orwell", "Huxley") is None
+    if mode == "fts":
+        # Two letters fall back to LIKE; three use the trigram index
+        assert repo.narrow_search_books(repo.search_books("or", limit=10000), "or", "orw") is None
@@ -0,0 +1,93 @@
+import time
+from decimal import Decimal
+
+import pytest
+
+from SmartlibraryLimkok import ChangeFeed, SettingsService
+
+
+@pytest.fixture
+def changes():
+    return ChangeFeed()
+
+
+@pytest.fixture
+def settings(db, changes):
+    service = SettingsService(db, changes)
+    yield service
+    service.close()
+
+
+def write(db, statement, *params):
+    with db.connection() as conn:
+        conn.execute(statement, params)
+        conn.commit()
+
+
+def test_missing_settings_fall_back_to_defaults(settings):
+    assert settings["max_borrow_days"] == 14
+    assert settings["fine_per_day"] == Decimal("0.50")
+    assert settings.get("no_such_setting", "fallback") == "fallback"
+
+
+def test_values_are_typed_by_setting_type(db, settings):
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO system_settings (setting_key, setting_value, setting_type) VALUES (?, ?, ?)",
+            [("max_borrow_days", "21", "integer"), ("fine_per_day", "0.75", "decimal"),
+             ("kiosk_mode", "yes", "boolean"), ("library_name", "Town Library", "string"),
+             ("max_books_per_member", "many", "integer")]
+        )
+        conn.commit()
+    assert settings["max_borrow_days"] == 21
+    assert settings["fine_per_day"] == Decimal("0.75")
+    assert settings["kiosk_mode"] is True
+    assert settings["library_name"] == "Town Library"
+    assert settings["max_books_per_member"] is None
+
+
+def test_changes_are_picked_up_by_the_version_check(db, settings, changes):
+    events = []
+    changes.subscribe("system_settings", lambda *event: events.append(event))
+    assert settings["max_borrow_days"] == 14
+    write(db, "INSERT INTO system_settings (setting_key, setting_value, setting_type) "
+              "VALUES ('max_borrow_days', '28', 'integer')")
+
+    # Until the next version check the cached value stands
+    assert settings["max_borrow_days"] == 14
+    assert settings.check_version() is True
+    assert settings["max_borrow_days"] == 28
+    assert settings.check_version() is False
+    changes.deliver()
+    assert len(events) == 2  # the first load and the reload
+
+
+def test_version_is_checked_in_the_background(db, changes, monkeypatch):
+    monkeypatch.setattr(SettingsService, "VERSION_CHECK_SECONDS", 0.01)
+    settings = SettingsService(db, changes)
+    try:
+        assert settings["max_borrow_days"] == 14
+        write(db, "INSERT INTO system_settings (setting_key, setting_value, setting_type) "
+                  "VALUES ('max_borrow_days', '28', 'integer')")
+        deadline = time.monotonic() + 5
+        while settings["max_borrow_days"] != 28 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert settings["max_borrow_days"] == 28
+    finally:
+        settings.close()
+
+
+def test_fine_policy_changes_reload_the_policies(db, settings):
+    before = settings.fine_policies["Premium"]
+    write(db, "UPDATE fine_policies SET rate_per_day = 2.00 WHERE membership_type = 'Premium'")
+    settings.check_version()
+    assert settings.fine_policies["Premium"] == (200,) + before[1:]
+
+
+def test_lookups_do_not_query(db, settings, monkeypatch):
+    settings["library_name"]
+    queries = []
+    monkeypatch.setattr(settings, "_read_version", lambda *args: queries.append(args))
+    for _ in range(100):
+        settings["max_borrow_days"]
+    assert queries == []
@@ -0,0 +1,140 @@
+import itertools
+
+from SmartlibraryLimkok import TreeLoader
+
+
+class FakeTree:
+    """The Treeview and after() calls TreeLoader makes, run synchronously by run()"""
+
+    def __init__(self):
+        self.children = []
+        self.items = {}
+        self.selected = ()
+        self.calls = {"insert": 0, "item": 0, "move": 0, "delete": 0}
+        self._jobs = {}
+        self._ids = itertools.count(1)
+
+    def after_idle(self, func, *args):
+        return self.after(0, func, *args)
+
+    def after(self, ms, func, *args):
+        job = f"after#{next(self._ids)}"
+        self._jobs[job] = (func, args)
+        return job
+
+    def after_cancel(self, job):
+        self._jobs.pop(job, None)
+
+    def run(self):
+        while self._jobs:
+            job = next(iter(self._jobs))
+            func, args = self._jobs.pop(job)
+            func(*args)
+
+    def winfo_exists(self):
+        return True
+
+    def insert(self, parent, index, values=(), tags=()):
+        self.calls["insert"] += 1
+        item = f"I{next(self._ids)}"
+        self.items[item] = (values, tags)
+        self.children.insert(index, item)
+        return item
+
+    def item(self, item, values=(), tags=()):
+        self.calls["item"] += 1
+        self.items[item] = (values, tags)
+
+    def move(self, item, parent, index):
+        self.calls["move"] += 1
+        self.children.remove(item)
+        self.children.insert(index, item)
+
+    def delete(self, *items):
+        self.calls["delete"] += len(items)
+        for item in items:
+            self.children.remove(item)
+            del self.items[item]
+
+    def get_children(self):
+        return tuple(self.children)
+
+    def selection(self):
+        return self.selected
+
+    def shown(self):
+        return [self.items[item][0] for item in self.children]
+
+    def reset_calls(self):
+        self.calls = dict.fromkeys(self.calls, 0)
+
+
+def load(loader, tree, rows):
+    loader.load(rows)
+    tree.run()
+
+
+def test_load_shows_rows_in_order_with_tags():
+    tree, done = FakeTree(), []
+    loader = TreeLoader(tree, row_tags=lambda row: ("low",) if row[2] < 2 else (),
+                        on_done=lambda: done.append(True))
+    load(loader, tree, [(1, "a", 5), (2, "b", 1), (3, None, 3)])
+    assert tree.shown() == [(1, "a", 5), (2, "b", 1), (3, "", 3)]
+    assert tree.items[loader.item(2)][1] == ("low",)
+    assert done == [True]
+
+
+def test_reload_touches_only_the_differences():
+    tree = FakeTree()
+    loader = TreeLoader(tree)
+    rows = [(key, f"row {key}") for key in range(1, 201)]
+    load(loader, tree, rows)
+    item_of_5 = loader.item(5)
+    tree.reset_calls()
+
+    changed = [row for row in rows if row[0] != 3]
+    changed[10] = (12, "changed")
+    changed.append((500, "new"))
+    load(loader, tree, changed)
+
+    assert tree.shown() == changed
+    assert tree.calls == {"insert": 1, "item": 1, "move": 0, "delete": 1}
+    assert loader.item(5) == item_of_5
+    assert loader.item(3) is None
+
+
+def test_reorder_moves_only_displaced_rows():
+    tree = FakeTree()
+    loader = TreeLoader(tree)
+    rows = [(key,) for key in range(10)]
+    load(loader, tree, rows)
+    tree.reset_calls()
+
+    reordered = rows[-1:] + rows[:-1]
+    load(loader, tree, reordered)
+    assert tree.shown() == reordered
+    assert tree.calls["move"] == 1 and tree.calls["insert"] == 0
+
+
+def test_newer_load_cancels_the_unfinished_one():
+    tree = FakeTree()
+    loader = TreeLoader(tree)
+    loader.CHECK_EVERY = 1
+    loader.SLICE_MS = 0
+    loader.load([(key,) for key in range(100)])
+    first_step = next(iter(tree._jobs.values()))
+    first_step[0](*first_step[1])  # one slice of the first load runs
+    tree._jobs.clear()
+    assert 0 < len(tree.children) < 100
+
+    load(loader, tree, [(key,) for key in range(50, 60)])
+    assert tree.shown() == [(key,) for key in range(50, 60)]
+
+
+def test_selected_rows_maps_items_back_to_rows():
+    tree = FakeTree()
+    loader = TreeLoader(tree)
+    rows = [(1, "a"), (2, "b"), (3, "c")]
+    load(loader, tree, rows)
+    tree.selected = (loader.item(3), loader.item(1))
+    assert loader.selected_rows() == [(3, "c"), (1, "a")]